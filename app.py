@@ -1,220 +1,254 @@
 # the great wall of imports
-import os,io,base64,json,zipfile,tempfile,pickle,statistics,ee,folium
+import os,math,base64
 from pathlib import Path
 from datetime import datetime,timezone
 import streamlit as sl
 import streamlit.components.v1 as components
-from dotenv import load_dotenv
+from atlas import DirWorkspace,ZipWorkspace,RunCatalog,HeatmapStore,trace
+from atlas.maps import MAP_MODES,DEFAULT_MAX_POINTS,build_map
 
 # setup & loading styles from assets directory
 sl.set_page_config(page_title='ATLAS v2 Landslide Risk Viewer',layout='wide')
-if Path('assets/style.css').exists():
-    with open('assets/style.css') as f:sl.markdown(f'<style>{f.read()}</style>',unsafe_allow_html=True)
+# stages below are traced when tracing is on (ATLAS_TRACE=1, see atlas/trace.py), each rerun is one request (see the bottom)
+PAGE_SIZE=200 # runs per selector page
 
 # the great wall of helper functions
-def extract_zip(uploaded_bytes:bytes):
-    # unzipping samples to  to temp dir and keep it alive
-    td=tempfile.TemporaryDirectory()
-    with zipfile.ZipFile(io.BytesIO(uploaded_bytes),'r') as zf:zf.extractall(td.name)
-    if 'zip_tmpdirs' not in sl.session_state:
-        sl.session_state.zip_tmpdirs=[]
-    sl.session_state.zip_tmpdirs.append(td)
-    return td.name
-
-def load_risk(pkl_path:Path):
-    # grab risk value from various pickle formats
-    with open(pkl_path,'rb') as f:obj=pickle.load(f)
-    
-    # try direct number first, then list/tuple
-    # this bit exists mostly because i originally used tuples for risk (lambda + risk) before switching to just risk values for viz
-    if isinstance(obj,(int,float)):val=float(obj)
-    elif isinstance(obj,(list,tuple)) and obj and isinstance(obj[0],(int,float)):val=float(obj[0])
-    else:return None
-    return val
-
-def load_fc(json_path:Path):
-    # load geojson as ee featurecollection (original format)
-    with open(json_path,'r') as f:return ee.FeatureCollection(json.load(f))
-
-def fc_to_geojson(fc:ee.FeatureCollection):
-    # convert to fc to geojson dict
-    info=fc.getInfo() # get info from ee fc
-    if info.get('type')=='FeatureCollection':return info
-    if 'features' in info:return {'type':'FeatureCollection','features':info['features']}
-    if info.get('type')=='Feature':return {'type':'FeatureCollection','features':[info]}
-    return {'type':'FeatureCollection','features':[]}
-
-def get_bounds(geo:dict):
-    # find min/max coords for map bounds
-    coords=[(ft['geometry']['coordinates'][0],ft['geometry']['coordinates'][1]) for ft in geo.get('features',[]) if ft.get('geometry',{}).get('type')=='Point' and ft.get('geometry',{}).get('coordinates')]
-    if not coords:return None
-    xs,ys=zip(*coords)
-    return [(min(ys),min(xs)),(max(ys),max(xs))]
-
-def mean_coord(geo:dict):
-    # average lat/lon of all points
-    coords=[ft['geometry']['coordinates'] for ft in geo.get('features',[]) if ft.get('geometry',{}).get('type')=='Point' and ft.get('geometry',{}).get('coordinates')]
-    if not coords:return None
-    xs,ys=zip(*coords)
-    return (statistics.fmean(ys),statistics.fmean(xs)) # lat,lon
-
-def extract_date(geo:dict):
-    # hunt for date in feature properties
-    keys_guess=('timestamp','time','date','time_start') # this also exists because of some inconsistencies in earlier versions. old inferences should still pass well through this
-    
-    def _fmt(v):
-        # handle ee dates,epochs,strings
-        if isinstance(v,dict) and v.get('type')=='Date' and isinstance(v.get('value'),(int,float)):
-            return datetime.fromtimestamp(v['value']/1000,timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
-        if isinstance(v,(int,float)):
-            # milliseconds or seconds since epoch
-            ts=v/1000 if v>10_000_000_000 else v
-            if ts>10_000_000: return datetime.fromtimestamp(ts,timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
-        if isinstance(v,str):return v
-        return '—'
-    
-    # check first few features
-    for ft in geo.get('features',[])[:12]:
-        props=ft.get('properties',{}) or {}
-        # try known keys first
-        for k in keys_guess:
-            if k in props:return _fmt(props[k])
-        # then any value that looks like a date
-        for v in props.values():
-            if _fmt(v)!='—':return _fmt(v)
-    return '—'
-
-def img_to_uri(path:Path):
-    # convert images to data uris
-    if not path.exists():return None
+# everything a rerun would otherwise redo (assets, run decoding, summaries, map html) is memoized per server process, keyed by file path + mtime
+# (runs by catalog path + mtime), so a rerun that changes nothing is a few cache lookups; caches are bounded by max_entries and dropped by 'Clear caches'
+def file_stamp(path):
+    # (mtime_ns,size) of a file as a cache key, None if missing
+    try:st=os.stat(path)
+    except OSError:return None
+    return st.st_mtime_ns,st.st_size
+
+@sl.cache_data(show_spinner=False,max_entries=8)
+@trace.traced('app.assets')
+def read_text(path:str,stamp):return Path(path).read_text()
+
+@sl.cache_data(show_spinner=False,max_entries=8)
+@trace.traced('app.assets')
+def img_to_uri(path:str,stamp):
+    # convert images to data uris (stamp=file_stamp(path), None when the file is missing)
+    if stamp is None:return None
+    path=Path(path)
     ext=path.suffix.lower().lstrip('.')
     mime='image/png' if ext=='png' else ('image/jpeg' if ext in ('jpg','jpeg') else f'image/{ext}')
     b64=base64.b64encode(path.read_bytes()).decode('ascii')
     return f'data:{mime};base64,{b64}'
 
-# constructing sidebar
-with sl.sidebar:
-    # intwari logo
-    logo_uri=img_to_uri(Path('assets/intwari_logo.png'))
-    if logo_uri:sl.markdown(f'<img class="sidebar-logo" alt="Intwari Technologies" src="{logo_uri}">',unsafe_allow_html=True)
-    sl.header('Data Source') # data upload interface
-    upzip=sl.file_uploader('Upload a .zip (optional)',type=['zip'],help="Zip with subfolders containing 'tuple.pkl' and 'featurecollection.json'")
-    root_dir=sl.text_input('Or local folder',value='database/outputs/examples',help="Folder with subfolders containing 'tuple.pkl' and 'featurecollection.json'")
-    sl.caption('If both are provided, the uploaded .zip takes precedence.')
-    sl.markdown('<a class="link-chip" href="https://github.com/shyagehike/atlas-v2-demo" target="_blank">GitHub</a>''<a class="link-chip" href="https://intwari.org" target="_blank">Website</a>',unsafe_allow_html=True)
-
-# constructing header
-hdr=sl.container()
-with hdr:
-    sl.markdown('<div class="panel-anchor"></div>',unsafe_allow_html=True)
-    logo_col,title_col=sl.columns([2,6]) # this is unintuitive but essentially im breaking up the container into columns to size the logo & text properly because it just wouldnt work otherwise
-    with logo_col:
-        atlas_uri=img_to_uri(Path('assets/atlas_logo.png')) # atlas logo
-        if atlas_uri:sl.markdown(f'<img src="{atlas_uri}" style="max-width:100%;height:auto;">',unsafe_allow_html=True)
-    with title_col:sl.markdown('<h1 style="margin:20;padding:10;">Landslide Risk Viewer</h1>',unsafe_allow_html=True)
-
-# auth & initializing earth engine
-load_dotenv()
-project=os.getenv('projectkey')
-ee.Authenticate()
-ee.Initialize(project=project)
-
-# workspace determination, if unable just stop streamlit
-workspace=None
-if upzip is not None:
-    # use uploaded zip
-    if 'zip_workspace' not in sl.session_state:sl.session_state.zip_workspace=extract_zip(upzip.read())
-    workspace=sl.session_state.zip_workspace
-elif root_dir.strip():workspace=root_dir.strip()
-if not workspace:
-    sl.markdown('<div class="footer">© shyagehike, Intwari — All rights reserved.</div>',unsafe_allow_html=True)
-    sl.stop()
-
-# finding loaded runs
-root=Path(workspace)
-runs=[]
-if root.exists():
-    # find all dirs with required files
-    runs=sorted([p for p in root.rglob('*') if p.is_dir() and (p/'tuple.pkl').exists() and (p/'featurecollection.json').exists()])
-if not runs:
-    sl.warning("No valid subfolders found. Each run must contain 'tuple.pkl' and 'featurecollection.json'.")
-    sl.markdown('<div class="footer">© shyagehike, Intwari Technologies — All rights reserved. <a href="https://github.com/shyagehike/atlas-v2-demo/blob/main/LICENSE" target="_blank" style="color:#c8d7e1;text-decoration:underline;">License</a></div>',unsafe_allow_html=True)
-    sl.stop()
-
-# constructing selector
-sel_panel=sl.container()
-with sel_panel:
-    sl.markdown('<div class="panel-anchor"></div>',unsafe_allow_html=True)
-    sl.markdown('### Select Run',unsafe_allow_html=True)
-    labels=[str(p.relative_to(root)) if root in p.parents else str(p) for p in runs]
-    choice=sl.selectbox('Run/Subfolder',options=labels,index=0)
-sel=runs[labels.index(choice)]
-
-# loading data & formatting display values
-risk=load_risk(sel/'tuple.pkl')
-fc=load_fc(sel/'featurecollection.json')
-geo=fc_to_geojson(fc)
-n_pts=len(geo.get('features',[]))
-avg=mean_coord(geo)
-date_val=extract_date(geo)
-coord_str='—' if not avg else f'{avg[0]:.5f}, {avg[1]:.5f}'
-risk_str='—' if risk is None else f'{round(risk*100,1)}%'
-
-# main panel w/ metrics & map
-main_panel=sl.container()
-with main_panel:
-    sl.markdown('<div class="panel-anchor"></div>',unsafe_allow_html=True)
-    left,right=sl.columns([1,3],gap='large')
-    with left:
-        # metrics stack
-        sl.markdown(f'''
-        <div class="metric risk">
-          <div class="label">Current Landslide Risk</div>
-          <div class="value">{risk_str}</div>
-        </div>
-        <div class="metric count">
-          <div class="label">Subsamples</div>
-          <div class="value">{n_pts:d}</div>
-        </div>
-        <div class="spacer-sm"></div>
-        <div class="metric coords">
-          <div class="label">Coordinates</div>
-          <div class="value">{coord_str}</div>
-        </div>
-        <div class="metric date">
-          <div class="label">Date</div>
-          <div class="value">{date_val}</div>
-        </div>
-        ''',unsafe_allow_html=True)
-    with right:
-        # setup map w/ folium
-        fmap=folium.Map(location=[0,0],zoom_start=2,control_scale=True,tiles='CartoDB dark_matter')
-        # add subsample points if we have any
-        if n_pts>0:
-            for ft in geo['features']:
-                g=ft.get('geometry',{})
-                if g.get('type')=='Point' and g.get('coordinates'):
-                    x,y=g['coordinates']
-                    folium.CircleMarker([y,x],radius=3,color='#1a4e9a',fill=True,fill_opacity=0.9).add_to(fmap)
-            # zoom to bounds
-            bounds=get_bounds(geo)
-            if bounds:fmap.fit_bounds(bounds,padding=(20,20))
-        # add to map & render
-        folium.LayerControl().add_to(fmap)
-        components.html(fmap.get_root().render(),height=650,scrolling=False)
-
-# technical details readout at bottom + footer w/ copyright notice
-details_panel=sl.container()
-with details_panel:
-    sl.markdown('<div class="panel-anchor"></div>',unsafe_allow_html=True)
-    sl.markdown('### Details')
-    sl.write('**Folder:**',f'`{sel}`')
-    
-    # show first feature props as sample
-    if n_pts>0:
-        props=geo['features'][0].get('properties',{}) or {}
-        if props:
+def asset_uri(path:str):return img_to_uri(path,file_stamp(path))
+
+@sl.cache_resource(show_spinner=False,max_entries=8)
+def get_catalog(root:str):
+    # one persisted run manifest per workspace root, shared across reruns & sessions
+    return RunCatalog(DirWorkspace(root))
+
+def get_zip_catalog(upzip):
+    # one in-memory manifest per uploaded zip, read straight from the archive (nothing extracted)
+    # uploading a different zip closes the previous one so a long session doesnt accumulate archives
+    key=f'zip:{getattr(upzip,"file_id",None) or (upzip.name,upzip.size)}'
+    if sl.session_state.get('zip_key')!=key:
+        if sl.session_state.get('zip_catalog') is not None:sl.session_state.zip_catalog.close()
+        sl.session_state.zip_catalog=RunCatalog(ZipWorkspace(upzip,name=upzip.name))
+        sl.session_state.zip_key=key
+    return key,sl.session_state.zip_catalog
+
+@sl.cache_resource(show_spinner=False,max_entries=16)
+def load_run(ws_key:str,path:str,mtime,_catalog):
+    # decoded run, shared across reruns & sessions; a rescan that picks up a new mtime is a new key
+    with trace.span('app.load_run') as sp:
+        run=_catalog.workspace.decode(path)
+        sp.rows=len(run.xy)
+    return run
+
+@sl.cache_data(show_spinner=False,max_entries=64)
+def run_summary(ws_key:str,row:dict,_catalog):
+    # display values of one run: metrics (from the catalog row) + the bundle params & first subsample shown under details
+    run=load_run(ws_key,row['path'],row['mtime'],_catalog)
+    avg=None if row['lat'] is None else (row['lat'],row['lon'])
+    props=run.sample_properties(0) if row['n_pts']>0 else None
+    return {'risk_str':'—' if row['risk'] is None else f"{round(row['risk']*100,1)}%",'n_pts':row['n_pts'],'date':row['date'],
+            'coord_str':'—' if not avg else f'{avg[0]:.5f}, {avg[1]:.5f}','label':_catalog.workspace.label(row['path']),
+            'meta':{k:v for k,v in run.meta.items() if v is not None and k not in ('risk','ts','date')},
+            'props':{k:props[k] for k in list(props.keys())[:12]} if props else None} # just the first 12 keys
+
+def dir_stamp(root:str):
+    # mtimes of a heatmap folder and its grid subfolders (a new surface touches one of them)
+    try:return tuple((e.name,e.stat().st_mtime_ns) for e in os.scandir(root) if e.is_dir())+((root,os.stat(root).st_mtime_ns),)
+    except OSError:return None
+
+@sl.cache_data(show_spinner=False,max_entries=4)
+def list_surfaces(heat_dir:str,stamp):return HeatmapStore(heat_dir).surfaces() if stamp is not None else []
+
+@sl.cache_data(show_spinner=False,max_entries=8)
+def load_tiles(heat_dir:str,key:str,ts:int,stamp):return HeatmapStore(heat_dir).tiles(key,ts)
+
+@sl.cache_data(show_spinner=False,max_entries=16)
+def map_html(ws_key:str,layers:tuple,map_mode:str,max_points:int,heat:tuple,heat_opacity:float,_catalog):
+    # rendered folium html; layers: ((path,mtime,risk),...), heat: (label,heat_dir,key,ts,stamp) or None
+    runs=[(p,load_run(ws_key,p,mt,_catalog).xy,r) for p,mt,r in layers]
+    heatmaps=[(heat[0],load_tiles(*heat[1:]))] if heat else []
+    with trace.span('app.build_map',rows=sum(len(l[1]) for l in runs)):fmap=build_map(runs,map_mode,max_points,heatmaps,heat_opacity)
+    with trace.span('app.render_map'):return fmap.get_root().render()
+
+CACHES=(read_text,img_to_uri,load_run,run_summary,list_surfaces,load_tiles,map_html)
+
+def clear_caches():
+    # explicit invalidation: drop every memoized asset/run/map and resync the catalog on this rerun
+    for fn in CACHES:fn.clear()
+    sl.session_state.pop('catalog_synced',None)
+
+def parse_bbox(text:str):
+    # 'min_lon,min_lat,max_lon,max_lat' -> tuple, None if empty/invalid
+    try:vals=[float(v) for v in text.split(',')]
+    except ValueError:return None
+    return tuple(vals) if len(vals)==4 else None
+
+# the page, rebuilt top to bottom on every rerun
+def main():
+    if sl.session_state.get('clear_caches'):clear_caches() # button state from the previous run, before anything cached is read
+    css=read_text('assets/style.css',stamp) if (stamp:=file_stamp('assets/style.css')) else None
+    if css:sl.markdown(f'<style>{css}</style>',unsafe_allow_html=True)
+
+    # constructing sidebar
+    with sl.sidebar:
+        # intwari logo
+        logo_uri=asset_uri('assets/intwari_logo.png')
+        if logo_uri:sl.markdown(f'<img class="sidebar-logo" alt="Intwari Technologies" src="{logo_uri}">',unsafe_allow_html=True)
+        sl.header('Data Source') # data upload interface
+        upzip=sl.file_uploader('Upload a .zip (optional)',type=['zip'],help="Zip with subfolders containing 'run.atlas' (or legacy 'tuple.pkl' + 'featurecollection.json')")
+        root_dir=sl.text_input('Or local folder',value='database/outputs/examples',help="Folder with subfolders containing 'run.atlas' (or legacy 'tuple.pkl' + 'featurecollection.json')")
+        sl.caption('If both are provided, the uploaded .zip takes precedence.')
+        rescan=sl.button('Rescan runs',help='Pick up runs added or changed since the catalog was last synced')
+        sl.button('Clear caches',key='clear_caches',help='Drop memoized assets, runs & rendered maps (they are otherwise reused across reruns)')
+        sl.header('Map') # rendering controls
+        map_mode=sl.selectbox('Rendering',options=MAP_MODES,index=0,help='auto draws raw points under the point budget and aggregates to a grid above it')
+        max_points=int(sl.number_input('Point budget',min_value=100,max_value=200_000,value=DEFAULT_MAX_POINTS,step=500,help='Max markers embedded in the map, shared across overlaid runs'))
+        # regional risk surfaces (tiles written by atlas.heatmap.regional_risk), drawn under the runs
+        heat_dir=sl.text_input('Heatmap folder',value='database/outputs/heatmaps',help='Folder of regional risk tiles (see atlas/heatmap.py)').strip()
+        surfaces=list_surfaces(heat_dir,dir_stamp(heat_dir)) if heat_dir else []
+        heat_labels=[f"{datetime.fromtimestamp(r['ts']/1000,tz=timezone.utc):%Y-%m-%d %H:%M} UTC, {r['cell_km']:g} km ({r['key']})" for r in surfaces]
+        heat_choice=sl.selectbox('Heatmap layer',options=['None']+heat_labels,index=0) if surfaces else 'None'
+        heat_opacity=sl.slider('Heatmap opacity',0.1,1.0,0.6,0.05) if surfaces else 0.6
+        sl.markdown('<a class="link-chip" href="https://github.com/shyagehike/atlas-v2-demo" target="_blank">GitHub</a>''<a class="link-chip" href="https://intwari.org" target="_blank">Website</a>',unsafe_allow_html=True)
+
+    # constructing header
+    hdr=sl.container()
+    with hdr:
+        sl.markdown('<div class="panel-anchor"></div>',unsafe_allow_html=True)
+        logo_col,title_col=sl.columns([2,6]) # this is unintuitive but essentially im breaking up the container into columns to size the logo & text properly because it just wouldnt work otherwise
+        with logo_col:
+            atlas_uri=asset_uri('assets/atlas_logo.png') # atlas logo
+            if atlas_uri:sl.markdown(f'<img src="{atlas_uri}" style="max-width:100%;height:auto;">',unsafe_allow_html=True)
+        with title_col:sl.markdown('<h1 style="margin:20;padding:10;">Landslide Risk Viewer</h1>',unsafe_allow_html=True)
+
+    # workspace determination, if unable just stop streamlit
+    if upzip is not None:ws_key,catalog=get_zip_catalog(upzip) # use uploaded zip
+    elif root_dir.strip():ws_key,catalog=root_dir.strip(),get_catalog(root_dir.strip())
+    else:
+        sl.markdown('<div class="footer">© shyagehike, Intwari — All rights reserved.</div>',unsafe_allow_html=True)
+        sl.stop()
+
+    # finding loaded runs through the persisted catalog (only new/changed runs get opened)
+    if rescan or sl.session_state.get('catalog_synced')!=ws_key:
+        with trace.span('app.discover') as sp:
+            catalog.refresh()
+            sp.rows=catalog.count()
+        sl.session_state.catalog_synced=ws_key
+    if not catalog.count():
+        sl.warning("No valid subfolders found. Each run must contain 'run.atlas' or 'tuple.pkl' and 'featurecollection.json'.")
+        sl.markdown('<div class="footer">© shyagehike, Intwari Technologies — All rights reserved. <a href="https://github.com/shyagehike/atlas-v2-demo/blob/main/LICENSE" target="_blank" style="color:#c8d7e1;text-decoration:underline;">License</a></div>',unsafe_allow_html=True)
+        sl.stop()
+
+    # constructing selector (filters + paging are answered by the catalog, not by opening folders)
+    sel_panel=sl.container()
+    with sel_panel:
+        sl.markdown('<div class="panel-anchor"></div>',unsafe_allow_html=True)
+        sl.markdown('### Select Run',unsafe_allow_html=True)
+        with sl.expander('Filter runs'):
+            f_risk,f_bbox,f_date=sl.columns(3)
+            min_risk=f_risk.slider('Minimum risk (%)',0,100,0)
+            bbox=parse_bbox(f_bbox.text_input('Bounding box',placeholder='min_lon,min_lat,max_lon,max_lat'))
+            date_rng=f_date.date_input('Date range',value=())
+        t0=t1=None
+        if len(date_rng)==2:
+            t0=datetime(*date_rng[0].timetuple()[:3],tzinfo=timezone.utc).timestamp()*1000
+            t1=(datetime(*date_rng[1].timetuple()[:3],tzinfo=timezone.utc).timestamp()+86400)*1000
+        filters=dict(bbox=bbox,t0=t0,t1=t1,min_risk=(min_risk/100) if min_risk>0 else None)
+        n_match=catalog.count(**filters)
+        if not n_match:
+            sl.info('No runs match the current filters.')
+            sl.stop()
+        n_pages=math.ceil(n_match/PAGE_SIZE)
+        page=sl.number_input(f'Page (of {n_pages}, {n_match} runs)',min_value=1,max_value=n_pages,value=1) if n_pages>1 else 1
+        rows=catalog.query(**filters,limit=PAGE_SIZE,offset=(page-1)*PAGE_SIZE)
+        labels=[r['path'] for r in rows]
+        choice=sl.selectbox('Run/Subfolder',options=labels,index=0)
+        overlay=sl.multiselect('Overlay runs',options=[l for l in labels if l!=choice],help='Drawn on the same map, colored by risk')
+    row=rows[labels.index(choice)]
+
+    # display values (metrics come straight from the catalog row, only the selected run gets decoded, once per mtime)
+    summary=run_summary(ws_key,row,catalog)
+
+    # main panel w/ metrics & map
+    main_panel=sl.container()
+    with main_panel:
+        sl.markdown('<div class="panel-anchor"></div>',unsafe_allow_html=True)
+        left,right=sl.columns([1,3],gap='large')
+        with left:
+            # metrics stack
+            sl.markdown(f'''
+            <div class="metric risk">
+              <div class="label">Current Landslide Risk</div>
+              <div class="value">{summary['risk_str']}</div>
+            </div>
+            <div class="metric count">
+              <div class="label">Subsamples</div>
+              <div class="value">{summary['n_pts']:d}</div>
+            </div>
+            <div class="spacer-sm"></div>
+            <div class="metric coords">
+              <div class="label">Coordinates</div>
+              <div class="value">{summary['coord_str']}</div>
+            </div>
+            <div class="metric date">
+              <div class="label">Date</div>
+              <div class="value">{summary['date']}</div>
+            </div>
+            ''',unsafe_allow_html=True)
+        with right:
+            # setup map w/ folium; every run is one layer (single geojson/cluster/grid) so the payload stays bounded
+            # the rendered html is reused until a run (mtime), the heatmap tiles or a map setting change
+            layers=((choice,row['mtime'],row['risk']),)+tuple((r['path'],r['mtime'],r['risk']) for r in rows if r['path'] in overlay)
+            heat=None
+            if heat_choice!='None':
+                surf=surfaces[heat_labels.index(heat_choice)]
+                heat=(heat_choice,heat_dir,surf['key'],surf['ts'],file_stamp(HeatmapStore(heat_dir).path(surf['key'],surf['ts'])))
+            components.html(map_html(ws_key,layers,map_mode,max_points,heat,heat_opacity,catalog),height=650,scrolling=False)
+
+    # technical details readout at bottom + footer w/ copyright notice
+    details_panel=sl.container()
+    with details_panel:
+        sl.markdown('<div class="panel-anchor"></div>',unsafe_allow_html=True)
+        sl.markdown('### Details')
+        sl.write('**Folder:**',f"`{summary['label']}`")
+
+        # run-level values stored in the bundle (Lambda, window params, ...) beyond what the metrics show
+        if summary['meta']:
+            sl.markdown('#### Run Parameters')
+            sl.json(summary['meta'])
+
+        # show first feature props as sample
+        if summary['props']:
             sl.markdown('#### First Subsample Properties (Sample)')
-            # just show first 12 keys
-            sl.json({k:props[k] for k in list(props.keys())[:12]})
-sl.markdown('<div class="footer">© shyagehike, Intwari Technologies — All rights reserved. <a href="https://github.com/shyagehike/atlas-v2-demo/blob/main/LICENSE" target="_blank" style="color:#c8d7e1;text-decoration:underline;">License</a></div>',unsafe_allow_html=True)
\ No newline at end of file
+            sl.json(summary['props'])
+
+        # per stage timings of this server process (only when tracing is on)
+        if trace.tracer() is not None:
+            with sl.expander('Tracing'):
+                sl.dataframe(trace.tracer().summary())
+                sl.code(trace.tracer().prometheus(),language='text')
+    sl.markdown('<div class="footer">© shyagehike, Intwari Technologies — All rights reserved. <a href="https://github.com/shyagehike/atlas-v2-demo/blob/main/LICENSE" target="_blank" style="color:#c8d7e1;text-decoration:underline;">License</a></div>',unsafe_allow_html=True)
+
+# each rerun is one traced request; sl.stop, a superseding rerun or an error unwinds through the with, so the span tree is still recorded (w/ the exception name in 'error')
+with trace.request('app.rerun'):main()
@@ -0,0 +1,157 @@
+# run bundle format (notebook writes, viewer reads)
+from .bundle import (
+    BUNDLE_NAME,
+    write_bundle,
+    read_bundle,
+    RunBundle,
+)
+
+# run discovery, loading & cataloging (viewer side)
+from .runs import (
+    load_risk,
+    as_geojson,
+    load_geojson,
+    get_bounds,
+    mean_coord,
+    extract_date,
+    extract_timestamp,
+    bundle_from_geojson,
+    summarize,
+    read_run,
+    summarize_run,
+    iter_run_dirs,
+    convert_run_dir,
+    convert_tree,
+    Workspace,
+    DirWorkspace,
+    ZipWorkspace,
+    RunCatalog,
+)
+
+# tensorflow-free inference
+from .inference import (
+    AtlasEngine,
+    EnsembleEngine,
+    load_rff_weights,
+    load_logit,
+    load_mu_clip,
+    poisson_rescale,
+    window_risk,
+)
+
+# validation metrics (exact weighted threshold sweep)
+from .metrics import (
+    threshold_curve,
+)
+
+# memory-mapped pca feature store (generation.ipynb)
+from .featurestore import (
+    FeatureStore,
+)
+
+# regional risk surfaces (heatmap mode) + raster tiles for the viewer
+from .heatmap import (
+    RegionGrid,
+    RiskSurface,
+    HeatmapStore,
+    regional_risk,
+)
+
+# incremental window aggregation of the dynamic features (hourly nowcasts)
+from .windows import (
+    WindowEngine,
+)
+
+# warm scoring service w/ request micro-batching (http / unix socket)
+from .service import (
+    ScoringService,
+    ServiceClient,
+)
+
+# opt-in stage tracing (spans aggregated per request, json lines / prometheus export)
+from . import trace
+from .trace import (
+    Tracer,
+    span,
+    traced,
+)
+
+# on-disk phi cache (generation.ipynb)
+from .phicache import (
+    PhiCache,
+    digest,
+    file_digest,
+)
+
+# local raster backend for phi (offline runs) + synthetic data
+from .rasters import (
+    RasterStore,
+    LocalBackend,
+    make_synthetic_store,
+    finish_features,
+    local_phi,
+)
+
+__all__ = [
+    # bundle
+    "BUNDLE_NAME",
+    "write_bundle",
+    "read_bundle",
+    "RunBundle",
+    # runs
+    "load_risk",
+    "as_geojson",
+    "load_geojson",
+    "get_bounds",
+    "mean_coord",
+    "extract_date",
+    "extract_timestamp",
+    "bundle_from_geojson",
+    "summarize",
+    "read_run",
+    "summarize_run",
+    "iter_run_dirs",
+    "convert_run_dir",
+    "convert_tree",
+    "Workspace",
+    "DirWorkspace",
+    "ZipWorkspace",
+    "RunCatalog",
+    # inference
+    "AtlasEngine",
+    "EnsembleEngine",
+    "load_rff_weights",
+    "load_logit",
+    "load_mu_clip",
+    "poisson_rescale",
+    "window_risk",
+    # metrics
+    "threshold_curve",
+    # feature store
+    "FeatureStore",
+    # heatmap
+    "RegionGrid",
+    "RiskSurface",
+    "HeatmapStore",
+    "regional_risk",
+    # windows
+    "WindowEngine",
+    # service
+    "ScoringService",
+    "ServiceClient",
+    # trace
+    "trace",
+    "Tracer",
+    "span",
+    "traced",
+    # phi cache
+    "PhiCache",
+    "digest",
+    "file_digest",
+    # rasters
+    "RasterStore",
+    "LocalBackend",
+    "make_synthetic_store",
+    "finish_features",
+    "local_phi",
+]
@@ -0,0 +1,84 @@
+import os, json, struct
+import numpy as np
+
+# run bundle format (run.atlas), replaces tuple.pkl + featurecollection.json
+# layout: 8B magic | u32 version | u32 header length | utf-8 json header | zero pad to 64B | column data
+# the header holds run-level metadata (risk, Lambda, window params, ...) and a column table of {name,dtype,offset,n};
+# offsets are relative to the start of the data block and every column starts on an 8B boundary so it can be viewed straight off an mmap
+BUNDLE_NAME='run.atlas'
+BUNDLE_MAGIC=b'ATLASRUN'
+BUNDLE_VERSION=1
+_PREFIX=struct.Struct('<8sII')
+_ALIGN=64
+
+def _pad(n:int,align:int):return (-n)%align
+
+def write_bundle(path,columns:dict,meta:dict=None):
+    # columns: name -> 1d array (all the same length; lon & lat required), meta: json-serializable run-level values
+    cols={k:np.ascontiguousarray(v) for k,v in columns.items()}
+    if 'lon' not in cols or 'lat' not in cols:raise ValueError('run bundle needs lon & lat columns')
+    n=len(cols['lon'])
+    table=[];off=0
+    for name,arr in cols.items():
+        if arr.ndim!=1 or len(arr)!=n:raise ValueError(f'column {name} must be 1d with {n} rows')
+        arr=cols[name]=arr.astype(arr.dtype.newbyteorder('<'),copy=False)
+        table.append({'name':name,'dtype':arr.dtype.str,'offset':off,'n':n})
+        off+=arr.nbytes+_pad(arr.nbytes,8)
+    header=json.dumps({'n':n,'meta':meta or {},'columns':table},separators=(',',':')).encode('utf-8')
+    head=_PREFIX.pack(BUNDLE_MAGIC,BUNDLE_VERSION,len(header))+header
+    head+=b'\0'*_pad(len(head),_ALIGN)
+    tmp=f'{path}.tmp'
+    with open(tmp,'wb') as f:
+        f.write(head)
+        for arr in cols.values():
+            f.write(arr.tobytes())
+            f.write(b'\0'*_pad(arr.nbytes,8))
+    os.replace(tmp,path) # atomic, so catalog refreshes never see half a bundle
+
+def read_bundle(src,mmap:bool=True):
+    # src: path (memory-mapped by default) or bytes-like (eg. a zip member)
+    if isinstance(src,(bytes,bytearray,memoryview)):buf=np.frombuffer(src,dtype=np.uint8)
+    elif mmap:buf=np.memmap(src,dtype=np.uint8,mode='r')
+    else:
+        with open(src,'rb') as f:buf=np.frombuffer(f.read(),dtype=np.uint8)
+    if len(buf)<_PREFIX.size:raise ValueError('truncated run bundle')
+    magic,version,hlen=_PREFIX.unpack(bytes(buf[:_PREFIX.size]))
+    if magic!=BUNDLE_MAGIC:raise ValueError('not a run bundle')
+    if version>BUNDLE_VERSION:raise ValueError(f'run bundle version {version} is newer than this reader ({BUNDLE_VERSION})')
+    header=json.loads(bytes(buf[_PREFIX.size:_PREFIX.size+hlen]).decode('utf-8'))
+    start=_PREFIX.size+hlen;start+=_pad(start,_ALIGN)
+    columns={}
+    for c in header['columns']:
+        dt=np.dtype(c['dtype'])
+        lo=start+c['offset']
+        columns[c['name']]=buf[lo:lo+c['n']*dt.itemsize].view(dt)
+    return RunBundle(columns,header.get('meta',{}),version)
+
+# in-memory view of one run: per-sample columns + run-level metadata
+class RunBundle:
+    def __init__(self,columns:dict,meta:dict=None,version:int=BUNDLE_VERSION):
+        self.columns=columns
+        self.meta=meta or {}
+        self.version=version
+
+    @property
+    def risk(self):return self.meta.get('risk')
+    @property
+    def Lambda(self):return self.meta.get('Lambda')
+    @property
+    def n(self):return len(self.columns['lon'])
+    @property
+    def xy(self):return np.column_stack([self.columns['lon'],self.columns['lat']]).astype(np.float64,copy=False)
+
+    def sample_properties(self,i:int=0):
+        # per-sample values (everything but the coordinates) as plain python scalars
+        return {k:v[i].item() for k,v in self.columns.items() if k not in ('lon','lat')}
+
+    def to_geojson(self):
+        # back to a plain featurecollection (export / legacy consumers only, the viewer works off the arrays)
+        lon,lat=self.columns['lon'].tolist(),self.columns['lat'].tolist()
+        extra={k:v.tolist() for k,v in self.columns.items() if k not in ('lon','lat')}
+        props=[{k:v[i] for k,v in extra.items()} for i in range(self.n)]
+        return {'type':'FeatureCollection','features':[{'type':'Feature','geometry':{'type':'Point','coordinates':[x,y]},'id':str(i),'properties':p} for i,(x,y,p) in enumerate(zip(lon,lat,props))]}
+
+    def save(self,path):write_bundle(path,self.columns,self.meta)
@@ -0,0 +1,11 @@
+# converter for existing run folders: python -m atlas.convert [root] [--remove-legacy]
+import argparse
+from pathlib import Path
+from .runs import convert_tree
+
+if __name__=='__main__':
+    ap=argparse.ArgumentParser(description='convert legacy run folders (tuple.pkl + featurecollection.json) to run.atlas bundles')
+    ap.add_argument('root',nargs='?',default='database/outputs/examples')
+    ap.add_argument('--remove-legacy',action='store_true',help='delete the legacy files after writing each bundle')
+    args=ap.parse_args()
+    for p in convert_tree(Path(args.root),args.remove_legacy):print(f'wrote {p}')
@@ -0,0 +1,148 @@
+import os, json, shutil
+import numpy as np, pandas as pd
+from .phicache import file_digest
+
+# memory-mapped columnar store for the pca feature table (config model.path.pca, generation.ipynb)
+# pca.csv is parsed once, chunk by chunk, into raw little-endian column files; afterwards every run just maps them (no csv parsing, no copies)
+# and worker processes mapping the same files share one copy in the page cache
+# layout: <root>/meta.json, <root>/features.f32 (pca_1..pca_K as a (K,n) float32 block, so X is a zero-copy (n,K) view),
+#         <root>/<column>.<i64|f64> for key/fold_id/weight/weight_scaled & other numeric columns, <root>/fold_order.i64 (rows grouped by fold)
+# rows are addressed by position, which is also dF_pca's index when read through frame()
+STORE_VERSION=1
+DEFAULT_BUILD_CHUNK=250_000
+META_NAME='meta.json'
+FEATURES_NAME='features.f32'
+FOLD_ORDER_NAME='fold_order.i64'
+INT_COLUMNS=('key','fold_id')
+_EXT={'int64':'i64','float64':'f64','float32':'f32'}
+
+def _feature_columns(columns):
+    return sorted([c for c in columns if str(c).startswith('pca_')],key=lambda c:int(str(c).split('_')[1]))
+
+def _source_info(path:str):
+    st=os.stat(path)
+    return {'path':os.path.abspath(path),'size':st.st_size,'mtime_ns':st.st_mtime_ns}
+
+class FeatureStore:
+    def __init__(self,root:str):
+        self.root=root
+        with open(os.path.join(root,META_NAME),'r') as f:self.meta=json.load(f)
+        if self.meta.get('version')!=STORE_VERSION:raise ValueError(f'feature store {root} has version {self.meta.get("version")}, expected {STORE_VERSION}')
+        self.n=int(self.meta['n'])
+        self.features=list(self.meta['features'])
+        self.D=len(self.features)
+        self._maps={}
+
+    # pickles as its root, so process pools reopen the maps instead of copying arrays
+    def __reduce__(self):return (FeatureStore,(self.root,))
+
+    def __len__(self):return self.n
+
+    def _map(self,name:str,dtype,shape):
+        if name not in self._maps:
+            path=os.path.join(self.root,name)
+            self._maps[name]=np.memmap(path,dtype=np.dtype(dtype).newbyteorder('<'),mode='r',shape=shape) if self.n else np.empty(shape,dtype=dtype)
+        return self._maps[name]
+
+    @property
+    def columns(self):return self.features+list(self.meta['columns'])
+
+    # (n,D) float32 feature matrix (transposed view of the (D,n) block, no copy)
+    @property
+    def X(self):return self._map(FEATURES_NAME,np.float32,(self.D,self.n)).T
+
+    def column(self,name:str):
+        if name in self.meta['columns']:
+            dtype=self.meta['columns'][name]
+            return self._map(f'{name}.{_EXT[dtype]}',dtype,(self.n,))
+        if name in self.features:return self._map(FEATURES_NAME,np.float32,(self.D,self.n))[self.features.index(name)]
+        raise KeyError(name)
+    __getitem__=column
+
+    # fold ids & the rows of one fold (ascending row order, a view into fold_order)
+    @property
+    def folds(self):return [f for f,_,_ in self.meta['folds']]
+
+    def fold_rows(self,fold):
+        for f,a,b in self.meta['folds']:
+            if f==fold:return self._map(FOLD_ORDER_NAME,np.int64,(self.n,))[a:b]
+        raise KeyError(fold)
+
+    def frame(self,columns=None):
+        # dataframe over the mapped columns (not copied; read-only, assign new columns instead of writing in place)
+        cols=self.columns if columns is None else list(columns)
+        return pd.DataFrame({c:self.column(c) for c in cols},index=pd.RangeIndex(self.n),copy=False)
+
+    def is_fresh(self,csv_path:str):
+        # cheap size/mtime check first, content hash only when those moved (eg. the csv was touched or copied)
+        src=self.meta.get('source',{})
+        info=_source_info(csv_path)
+        if (src.get('size'),src.get('mtime_ns'))==(info['size'],info['mtime_ns']):return True
+        return src.get('size')==info['size'] and src.get('sha256')==file_digest(csv_path)
+
+    @classmethod
+    def open(cls,csv_path:str,root:str,chunksize:int=DEFAULT_BUILD_CHUNK,verbose:bool=True):
+        # the store for csv_path, (re)built when missing, from an older version or out of date w/ the csv
+        try:
+            store=cls(root)
+            if store.is_fresh(csv_path):return store
+        except (OSError,ValueError,KeyError):pass
+        if verbose:print(f'FeatureStore: building {root} from {csv_path}')
+        return cls.build(csv_path,root,chunksize)
+
+    @classmethod
+    def build(cls,csv_path:str,root:str,chunksize:int=DEFAULT_BUILD_CHUNK):
+        tmp=f'{root.rstrip(os.sep)}.{os.getpid()}.tmp'
+        shutil.rmtree(tmp,ignore_errors=True)
+        os.makedirs(tmp)
+        features=None;dtypes={};skipped=[];files={};n=0
+        try:
+            for chunk in pd.read_csv(csv_path,chunksize=chunksize):
+                if features is None: # column layout from the first chunk
+                    features=_feature_columns(chunk.columns)
+                    for c in chunk.columns:
+                        if c in features or c=='weight_scaled':continue # weight_scaled is always recomputed below
+                        if c in INT_COLUMNS or pd.api.types.is_integer_dtype(chunk[c]):dtypes[c]='int64'
+                        elif pd.api.types.is_numeric_dtype(chunk[c]) or pd.api.types.is_bool_dtype(chunk[c]):dtypes[c]='float64'
+                        else:skipped.append(c)
+                    files={c:open(os.path.join(tmp,f'feature_{j}.f32'),'wb') for j,c in enumerate(features)}
+                    files.update({c:open(os.path.join(tmp,f'{c}.{_EXT[t]}'),'wb') for c,t in dtypes.items()})
+                for c in features:files[c].write(chunk[c].to_numpy(np.dtype('<f4')).tobytes())
+                for c,t in dtypes.items():files[c].write(chunk[c].to_numpy(np.dtype(t).newbyteorder('<')).tobytes())
+                n+=len(chunk)
+        finally:
+            for f in files.values():f.close()
+        if features is None:raise ValueError(f'{csv_path} is empty')
+
+        # feature columns -> one (D,n) block
+        with open(os.path.join(tmp,FEATURES_NAME),'wb') as out:
+            for j in range(len(features)):
+                p=os.path.join(tmp,f'feature_{j}.f32')
+                with open(p,'rb') as f:shutil.copyfileobj(f,out,1<<24)
+                os.remove(p)
+        meta={'version':STORE_VERSION,'n':n,'features':features,'columns':dtypes,'skipped':skipped,'folds':[],'bg_scale':None,
+              'source':{**_source_info(csv_path),'sha256':file_digest(csv_path)}}
+
+        def col(name):return np.memmap(os.path.join(tmp,f'{name}.{_EXT[dtypes[name]]}'),dtype=np.dtype(dtypes[name]).newbyteorder('<'),mode='r',shape=(n,)) if n else np.empty(0)
+        # weight_scaled like the notebook: background weights divided by s=∑w_bg/∑w_pos so both classes carry comparable totals
+        if 'weight' in dtypes and 'key' in dtypes:
+            key,weight=col('key'),col('weight')
+            s=float(pd.Series(weight[key==0]).sum()/max(pd.Series(weight[key==1]).sum(),1e-12)) # whole-column sums, same as the notebook
+            meta['bg_scale']=s
+            with open(os.path.join(tmp,'weight_scaled.f64'),'wb') as out:
+                for a in range(0,n,chunksize):
+                    out.write(np.where(key[a:a+chunksize]==0,weight[a:a+chunksize]/s,weight[a:a+chunksize]).astype('<f8').tobytes())
+            meta['columns']['weight_scaled']='float64'
+        # rows grouped by fold (stable, so each fold keeps ascending row order)
+        if 'fold_id' in dtypes:
+            fold=np.asarray(col('fold_id'))
+            order=np.argsort(fold,kind='stable')
+            order.astype('<i8').tofile(os.path.join(tmp,FOLD_ORDER_NAME))
+            u,starts,counts=np.unique(fold[order],return_index=True,return_counts=True)
+            meta['folds']=[[int(f),int(a),int(a+c)] for f,a,c in zip(u,starts,counts)]
+        with open(os.path.join(tmp,META_NAME),'w') as f:json.dump(meta,f,indent=2)
+
+        # swap the finished store in (open maps of an old store stay valid until they are dropped)
+        shutil.rmtree(root,ignore_errors=True)
+        os.replace(tmp,root)
+        return cls(root)
@@ -0,0 +1,262 @@
+import os, json, math, hashlib
+import numpy as np, pandas as pd
+from .phicache import digest
+from .rasters import HOUR_MS, finish_features
+from .trace import span, traced
+
+# regional risk surfaces ("heatmap mode"): a bbox is tiled into ~cell_km cells, each cell gets K uniform subsamples and is scored as its own window
+# (area = cell area, dt) in one batched pass. subsample locations only depend on the grid (+K, seed), so the static terrain/soil part is sampled once
+# per grid and cached; an hourly refresh only recomputes the dynamic part, and w/ a local raster backend every distinct (weather pixel, bucket
+# timestamp) is computed once and shared by all the subsamples that read it
+# surfaces are stored as npz raster tiles (<root>/<surface key>/<ts>/r<i>_c<j>.npz + index.json) which the viewer overlays as a heatmap layer (atlas/maps.py)
+KM_PER_DEG_LAT=110.574
+KM_PER_DEG_LON=111.320
+DEFAULT_CELL_K=32
+DEFAULT_TILE_CELLS=128
+TILE_INDEX='index.json'
+
+class RegionGrid:
+    # regular lon/lat grid over bbox (min_lon,min_lat,max_lon,max_lat); row 0 = southern edge, cell id = row*n_cols+col
+    def __init__(self,bbox,cell_km:float):
+        lon0,lat0,lon1,lat1=(float(v) for v in bbox)
+        if not (lon1>lon0 and lat1>lat0):raise ValueError(f'invalid bbox {bbox}')
+        self.cell_km=float(cell_km)
+        self.dlat=self.cell_km/KM_PER_DEG_LAT
+        self.dlon=self.cell_km/(KM_PER_DEG_LON*math.cos(math.radians((lat0+lat1)/2))) # constant lon step, sized at the mid latitude
+        self.n_rows=max(math.ceil((lat1-lat0)/self.dlat-1e-9),1)
+        self.n_cols=max(math.ceil((lon1-lon0)/self.dlon-1e-9),1)
+        self.lon0,self.lat0=lon0,lat0
+        self.bbox=(lon0,lat0,lon1,lat1)
+        self.key=digest({'bbox':self.bbox,'cell_km':self.cell_km})[:16]
+
+    @property
+    def shape(self):return (self.n_rows,self.n_cols)
+
+    @property
+    def n_cells(self):return self.n_rows*self.n_cols
+
+    # outer bounds of the cells (can overshoot bbox by less than a cell)
+    @property
+    def bounds(self):return (self.lon0,self.lat0,self.lon0+self.n_cols*self.dlon,self.lat0+self.n_rows*self.dlat)
+
+    def cell_areas(self):
+        # (n_cells,) km^2, each row's width shrinks w/ the cosine of its center latitude
+        lat_c=self.lat0+(np.arange(self.n_rows)+0.5)*self.dlat
+        row_area=(self.dlat*KM_PER_DEG_LAT)*(self.dlon*KM_PER_DEG_LON*np.cos(np.radians(lat_c)))
+        return np.repeat(row_area,self.n_cols)
+
+    def subsamples(self,K:int=DEFAULT_CELL_K,seed:int=42,ts:int=0):
+        # K uniform points per cell w/ the same per-sample time columns as phi's subsamples (eid = cell id, sid unique over the grid)
+        # locations & u only depend on (grid, K, seed), so every hour re-reads the same points and the static part can be reused
+        rng=np.random.default_rng(int(seed))
+        cell=np.repeat(np.arange(self.n_cells),int(K))
+        r,c=np.divmod(cell,self.n_cols)
+        lat=self.lat0+(r+rng.random(len(cell)))*self.dlat
+        lon=self.lon0+(c+rng.random(len(cell)))*self.dlon
+        u=np.random.default_rng(int(seed)+1).random(len(cell))
+        dF=pd.DataFrame({'lon':lon,'lat':lat,'u':u,'sid':[f'{i}:{k}' for i,k in zip(cell.tolist(),np.tile(np.arange(int(K)),self.n_cells).tolist())],'eid':cell})
+        return at_timestamp(dF,ts)
+
+def at_timestamp(subsamples:pd.DataFrame,ts:int):
+    # (re)set the timestamp-dependent columns: sample time within the hour + the 24 hourly buckets of phi (bucket_ts = ts+bucket·1h+15min)
+    u=subsamples['u'].to_numpy()
+    bucket=np.floor(u*24).astype(np.int64)
+    return subsamples.assign(ts=int(ts)+HOUR_MS*u,bucket=bucket,bucket_ts=int(ts)+bucket*HOUR_MS+900000)
+
+def _shared_rows(backend,s:pd.DataFrame):
+    # representative row of every group of subsamples that read the same pixel of every time-stacked layer at the same bucket timestamp
+    # (their dynamic features are identical); None when the backend has no raster store to resolve pixels against
+    store=getattr(backend,'store',None)
+    if store is None or not hasattr(store,'pixels'):return None
+    lon,lat=s['lon'].to_numpy(),s['lat'].to_numpy()
+    cols=[s['bucket_ts'].to_numpy(np.int64)]
+    for name,g in store.layers.items():
+        if 't0_ms' not in g:continue
+        r,c,inside=store.pixels(name,lon,lat)
+        cols+=[r,c,inside.astype(np.int64)]
+    _,first,inv=np.unique(np.stack(cols,axis=1),axis=0,return_index=True,return_inverse=True)
+    return first,inv.ravel()
+
+def dynamic_part(backend,s:pd.DataFrame,ts:int):
+    # dynamic features of every subsample, each distinct (weather pixels, bucket) computed once
+    shared=_shared_rows(backend,s)
+    if shared is None:return backend.sample(s,ts,('dynamic',))['dynamic']
+    first,inv=shared
+    rep=s.iloc[first].reset_index(drop=True).assign(eid=0,sid=[str(i) for i in range(len(first))])
+    d=backend.sample(rep,ts,('dynamic',))['dynamic']
+    pos=pd.Index(d['sid'].astype(int)).get_indexer(inv) # rows whose representative was masked drop out, like sampling them one by one
+    keep=pos>=0
+    out=d.iloc[pos[keep]].drop(columns=['eid','sid']).reset_index(drop=True)
+    out.insert(0,'sid',s['sid'].to_numpy()[keep])
+    out.insert(0,'eid',s['eid'].to_numpy()[keep])
+    return out
+
+def engine_digest(engine)->str:
+    # content hash of a (numpy) scoring engine, so cached surfaces follow the model they were scored with
+    h=hashlib.sha256()
+    for name in ('W','b','w','c'):h.update(np.ascontiguousarray(getattr(engine,name)).tobytes())
+    h.update(repr((getattr(engine,'logit',None),getattr(engine,'logits',None),engine.mu_clip,engine.ref_area_km2,engine.ref_dt_sec)).encode('utf-8'))
+    return h.hexdigest()
+
+def _feed(h,obj):
+    # hash arrays by dtype/shape/bytes (repr truncates large ones), containers recursively
+    if isinstance(obj,np.ndarray):
+        h.update(f'{obj.dtype}{obj.shape}'.encode('utf-8'));h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj,(list,tuple)):
+        h.update(b'(')
+        for v in obj:_feed(h,v)
+        h.update(b')')
+    elif isinstance(obj,dict):
+        for k in sorted(obj,key=str):h.update(repr(k).encode('utf-8'));_feed(h,obj[k])
+    else:h.update(repr(obj).encode('utf-8'))
+
+def pipeline_digest(pipeline)->str:
+    # content hash of the feature pipeline (FrozenPipeline: columns, compiled spec steps, pca projection)
+    h=hashlib.sha256()
+    _feed(h,vars(pipeline) if hasattr(pipeline,'__dict__') else pipeline)
+    return h.hexdigest()
+
+def surface_params(grid:RegionGrid,engine,pipeline,backend,K:int=DEFAULT_CELL_K,seed:int=42,dt:float=3600.0):
+    # everything a stored surface depends on besides the timestamp; the surface key is their digest, so changing any of them is a new surface
+    return {'grid':grid.key,'model':engine_digest(engine),'pipeline':pipeline_digest(pipeline),'K':int(K),'seed':int(seed),'dt':float(dt),
+            'src':getattr(backend,'fingerprint','ee'),'cfg':digest(getattr(backend,'cfg',None))}
+
+class RiskSurface:
+    # per-cell risk of one grid at one timestamp; R/Lambda/R_std are (n_rows,n_cols) w/ nan where a cell kept no subsamples, K = subsamples used
+    def __init__(self,bounds,ts:int,cell_km:float,R,Lambda,K,R_std=None,key:str=None,model:str=None,params:dict=None):
+        self.bounds=tuple(float(v) for v in bounds)
+        self.ts=int(ts)
+        self.cell_km=float(cell_km)
+        self.R=np.asarray(R,dtype=np.float32)
+        self.Lambda=np.asarray(Lambda,dtype=np.float32)
+        self.K=np.asarray(K,dtype=np.int32)
+        self.R_std=None if R_std is None else np.asarray(R_std,dtype=np.float32)
+        self.key=key
+        self.model=model
+        self.params=params
+
+    @property
+    def shape(self):return self.R.shape
+
+    def frame(self):
+        # one row per scored cell (center lon/lat + values)
+        rows,cols=np.nonzero(self.K>0)
+        lon0,lat0,lon1,lat1=self.bounds
+        dlon,dlat=(lon1-lon0)/self.shape[1],(lat1-lat0)/self.shape[0]
+        out={'lon':lon0+(cols+0.5)*dlon,'lat':lat0+(rows+0.5)*dlat,'K':self.K[rows,cols],'Lambda':self.Lambda[rows,cols],'R':self.R[rows,cols]}
+        if self.R_std is not None:out['R_std']=self.R_std[rows,cols]
+        return pd.DataFrame(out)
+
+@traced('heatmap.regional_risk')
+def regional_risk(backend,grid:RegionGrid,ts:int,engine,pipeline,K:int=DEFAULT_CELL_K,seed:int=42,dt:float=3600.0,cache=None,tiles=None):
+    # risk surface of grid at ts (epoch ms): subsamples -> static (cached per grid) + shared dynamic parts -> snow flag/normalize/pca -> one batched score
+    # backend: LocalBackend or anything w/ the same sample(subsamples,timestamp,parts) contract (+ fingerprint); engine: AtlasEngine or EnsembleEngine
+    # cache: PhiCache for the static part; tiles: HeatmapStore, a stored surface w/ the same surface_params at ts is returned w/o sampling anything
+    params=surface_params(grid,engine,pipeline,backend,K,seed,dt)
+    key=digest(params)[:16]
+    if tiles is not None:
+        hit=tiles.get(key,ts,params=params)
+        if hit is not None:return hit
+    s=grid.subsamples(K,seed,ts)
+    def static():return backend.sample(s,ts,('static',))['static']
+    with span('heatmap.static') as sp:
+        if cache is not None:
+            static_dF=cache.cached('grid_static',cache.key('grid_static',grid=grid.key,K=params['K'],seed=params['seed'],src=params['src'],cfg=params['cfg']),static)
+        else:static_dF=static()
+        sp.rows=len(static_dF)
+    with span('heatmap.dynamic') as sp:
+        dyn=dynamic_part(backend,s,ts)
+        sp.rows=len(dyn)
+
+    # join on sid like phi_join (rows masked in either part drop out), columns sorted like computeFeatures returns them
+    dF=dyn.merge(static_dF.drop(columns='eid'),on='sid',how='inner')
+    cell=dF.pop('eid').to_numpy(np.int64)
+    dF=dF.drop(columns='sid')
+    X=finish_features(dF[sorted(dF.columns)],pipeline)
+    shape=grid.shape
+    R=np.full(grid.n_cells,np.nan);Lambda=np.full(grid.n_cells,np.nan);Kc=np.zeros(grid.n_cells,dtype=np.int64);R_std=None
+    if len(X):
+        scores=engine.risk_score_batch(X,cell,pd.Series(grid.cell_areas()),dt)
+        ids=scores.index.to_numpy()
+        R[ids],Lambda[ids],Kc[ids]=scores['R'].to_numpy(),scores['Lambda'].to_numpy(),scores['K'].to_numpy()
+        if 'R_std' in scores:
+            R_std=np.full(grid.n_cells,np.nan);R_std[ids]=scores['R_std'].to_numpy()
+    surface=RiskSurface(grid.bounds,ts,grid.cell_km,R.reshape(shape),Lambda.reshape(shape),Kc.reshape(shape),None if R_std is None else R_std.reshape(shape),key,params['model'],params)
+    if tiles is not None:tiles.put(surface)
+    return surface
+
+def _save_npz(path:str,**arrays):
+    os.makedirs(os.path.dirname(path),exist_ok=True)
+    tmp=f'{path}.{os.getpid()}.tmp'
+    with open(tmp,'wb') as f:np.savez(f,**arrays)
+    os.replace(tmp,path)
+
+class HeatmapStore:
+    # <root>/<surface key>/<ts>/index.json (bounds, shape, tile layout, model hash, surface params) + r<i>_c<j>.npz tiles of tile_cells x tile_cells cells
+    def __init__(self,root:str,tile_cells:int=DEFAULT_TILE_CELLS):
+        self.root=root
+        self.tile_cells=int(tile_cells)
+
+    def path(self,key:str,ts:int,name:str=TILE_INDEX):return os.path.join(self.root,key,str(int(ts)),name)
+
+    def put(self,surface:RiskSurface):
+        n=self.tile_cells;rows,cols=surface.shape
+        lon0,lat0,lon1,lat1=surface.bounds
+        dlon,dlat=(lon1-lon0)/cols,(lat1-lat0)/rows
+        tiles=[]
+        for i in range(0,rows,n):
+            for j in range(0,cols,n):
+                sl=(slice(i,i+n),slice(j,j+n))
+                name=f'r{i//n}_c{j//n}.npz'
+                arrs={'R':surface.R[sl],'Lambda':surface.Lambda[sl],'K':surface.K[sl]}
+                if surface.R_std is not None:arrs['R_std']=surface.R_std[sl]
+                _save_npz(self.path(surface.key,surface.ts,name),**arrs)
+                h,w=surface.R[sl].shape
+                tiles.append({'file':name,'row':i,'col':j,'bounds':[lon0+j*dlon,lat0+i*dlat,lon0+(j+w)*dlon,lat0+(i+h)*dlat]})
+        index={'key':surface.key,'ts':surface.ts,'cell_km':surface.cell_km,'bounds':list(surface.bounds),'shape':[rows,cols],'model':surface.model,'params':surface.params,'tiles':tiles}
+        p=self.path(surface.key,surface.ts)
+        with open(f'{p}.tmp','w') as f:json.dump(index,f,indent=1)
+        os.replace(f'{p}.tmp',p) # the index goes last, so a half-written surface is never listed
+        return p
+
+    def index(self,key:str,ts:int):
+        try:
+            with open(self.path(key,ts),'r') as f:return json.load(f)
+        except (OSError,ValueError):return None
+
+    def get(self,key:str,ts:int,model:str=None,params:dict=None):
+        # stored surface (tiles stitched back together), None if missing or scored w/ a different model / surface params
+        idx=self.index(key,ts)
+        if idx is None or (model is not None and idx.get('model')!=model):return None
+        if params is not None and idx.get('params')!=json.loads(json.dumps(params)):return None
+        shape=tuple(idx['shape'])
+        out={'R':np.full(shape,np.nan,dtype=np.float32),'Lambda':np.full(shape,np.nan,dtype=np.float32),'K':np.zeros(shape,dtype=np.int32)}
+        for t in idx['tiles']:
+            try:
+                with np.load(self.path(key,ts,t['file']),allow_pickle=False) as z:
+                    if 'R_std' in z and 'R_std' not in out:out['R_std']=np.full(shape,np.nan,dtype=np.float32)
+                    for name in out:
+                        a=z[name];out[name][t['row']:t['row']+a.shape[0],t['col']:t['col']+a.shape[1]]=a
+            except (OSError,ValueError,KeyError):return None
+        return RiskSurface(idx['bounds'],idx['ts'],idx['cell_km'],out['R'],out['Lambda'],out['K'],out.get('R_std'),key,idx.get('model'),idx.get('params'))
+
+    def tiles(self,key:str,ts:int):
+        # [(bounds, R tile)] for the viewer, w/o stitching
+        idx=self.index(key,ts)
+        if idx is None:return []
+        out=[]
+        for t in idx['tiles']:
+            with np.load(self.path(key,ts,t['file']),allow_pickle=False) as z:out.append((tuple(t['bounds']),z['R']))
+        return out
+
+    def surfaces(self):
+        # every stored (key, ts, bounds, cell_km), newest first
+        out=[]
+        if not os.path.isdir(self.root):return out
+        for key in sorted(os.listdir(self.root)):
+            d=os.path.join(self.root,key)
+            if not os.path.isdir(d):continue
+            for ts in os.listdir(d):
+                idx=self.index(key,ts) if ts.lstrip('-').isdigit() else None
+                if idx is not None:out.append({'key':key,'ts':int(idx['ts']),'bounds':tuple(idx['bounds']),'cell_km':idx['cell_km']})
+        return sorted(out,key=lambda r:(-r['ts'],r['key']))
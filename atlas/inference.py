@@ -0,0 +1,234 @@
+import os, glob, re
+import numpy as np
+from ast import literal_eval
+from .trace import traced, nrows
+
+# tensorflow-free inference for the RFF_LGCP model + logit calibrator from generation.ipynb
+# at inference the model is just mu=clip(sqrt(2/D)·cos(x@W+b)@w+c) and the calibrator is R=σ(a·mu+b0), so plain float32 numpy is enough
+
+REF_AREA_KM2=np.pi*17.0**2 # reference window the calibrator was fitted for (same as ATLAS)
+REF_DT_SEC=3600.0
+DEFAULT_MU_CLIP=(-20.0,10.0)
+DEFAULT_CHUNK=65536 # rows per matmul chunk (bounds the (chunk,rff_dim) temporary)
+ENSEMBLE_CHUNK=2048 # the stacked (chunk,M·rff_dim) temporary is M times wider, keep it cache sized
+
+def _find_vars(h5,key:str):
+    # keras 3 layout: layers/<layer name>/vars/{0,1}; match the layer by substring so renamed layers (dense_1 etc) still load
+    for name in h5['layers']:
+        if key in name:
+            v=h5['layers'][name]['vars']
+            return [np.asarray(v[str(i)]) for i in range(len(v))]
+    raise KeyError(f'no layer matching {key!r} in weights file')
+
+def load_rff_weights(path:str):
+    # (W,b,w,c) arrays from a rff_lgcp_sf*.weights.h5 file
+    import h5py
+    with h5py.File(path,'r') as h5:
+        W,b=_find_vars(h5,'fourier')
+        w,c=_find_vars(h5,'dense')
+    return W.astype(np.float32),b.astype(np.float32),w.astype(np.float32).reshape(-1),np.float32(np.ravel(c)[0])
+
+def load_logit(path:str):
+    # (a,b) of the fitted logistic calibrator R=σ(a·mu+b)
+    import joblib
+    lr=joblib.load(path)
+    return float(lr.coef_[0,0]),float(lr.intercept_[0])
+
+def load_mu_clip(config_path:str='config.yaml'):
+    # mu_clip from the model hyperparameters (stored as a '(lo, hi)' string in config.yaml)
+    import yaml
+    with open(config_path,'r') as f:v=yaml.safe_load(f)['model']['hyperparameters'].get('mu_clip',DEFAULT_MU_CLIP)
+    return tuple(float(x) for x in (literal_eval(v) if isinstance(v,str) else v))
+
+def pca_columns(columns):
+    # ordered pca_1..pca_K (same ordering as ATLAS)
+    return sorted([c for c in columns if str(c).startswith('pca_')],key=lambda c:int(str(c).split('_')[1]))
+
+def as_matrix(X):
+    # dataframe w/ pca_* columns or 2d array -> contiguous float32 matrix
+    if hasattr(X,'columns'):X=X[pca_columns(X.columns)].to_numpy(np.float32)
+    return np.ascontiguousarray(X,dtype=np.float32)
+
+def sigmoid(x):
+    # numerically stable logistic
+    x=np.asarray(x,dtype=np.float64)
+    out=np.empty_like(x)
+    pos=x>=0
+    out[pos]=1/(1+np.exp(-x[pos]))
+    ex=np.exp(x[~pos])
+    out[~pos]=ex/(1+ex)
+    return out
+
+def poisson_rescale(R_ref,window_area,dt,ref_area_km2=REF_AREA_KM2,ref_dt_sec=REF_DT_SEC):
+    # ref-window risk -> (Lambda,R) for the target window W=A·Δt (works elementwise on arrays too)
+    Lambda_ref=-np.log(np.maximum(1.0-np.asarray(R_ref,dtype=np.float64),1e-12))
+    scale=(np.asarray(window_area,dtype=np.float64)*np.asarray(dt,dtype=np.float64))/(ref_area_km2*ref_dt_sec)
+    Lambda=np.clip(Lambda_ref*scale,0.0,1e12)
+    return Lambda,np.clip(1.0-np.exp(-Lambda),0.0,1.0)
+
+def _per_window(v,ids):
+    # scalar, mapping/series keyed by window id, or array already ordered like ids
+    if hasattr(v,'get') or hasattr(v,'reindex'):
+        vals=v.reindex(ids).to_numpy(np.float64) if hasattr(v,'reindex') else np.array([v.get(i,np.nan) for i in ids.tolist()],dtype=np.float64)
+        if np.isnan(vals).any():raise KeyError('window_area/dt missing for some window ids')
+        return vals
+    if np.ndim(v)==0:return np.full(len(ids),float(v))
+    v=np.asarray(v,dtype=np.float64)
+    if len(v)!=len(ids):raise ValueError(f'expected {len(ids)} per-window values (one per sorted window id), got {len(v)}')
+    return v
+
+def window_risk(r_i,window_id,window_area,dt,ref_area_km2=REF_AREA_KM2,ref_dt_sec=REF_DT_SEC):
+    # per-row ref-window risk of many stacked windows -> per-window Lambda/R via segment means (same math as risk_score per window)
+    # window_area/dt: scalar, mapping window id -> value, or array ordered by sorted window id
+    import pandas as pd
+    ids,inv=np.unique(np.asarray(window_id),return_inverse=True)
+    K=np.bincount(inv,minlength=len(ids))
+    R_ref=np.clip(np.bincount(inv,weights=np.asarray(r_i,dtype=np.float64),minlength=len(ids))/K,0.0,1.0)
+    Lambda,R=poisson_rescale(R_ref,_per_window(window_area,ids),_per_window(dt,ids),ref_area_km2,ref_dt_sec)
+    return pd.DataFrame({'K':K,'R_ref':R_ref,'Lambda':Lambda,'R':R},index=pd.Index(ids,name='window_id'))
+
+class AtlasEngine:
+    def __init__(self,W,b,w,c,mu_clip=DEFAULT_MU_CLIP,logit=None,ref_area_km2=REF_AREA_KM2,ref_dt_sec=REF_DT_SEC,chunk_size=DEFAULT_CHUNK):
+        self.W=np.ascontiguousarray(W,dtype=np.float32)
+        self.b=np.asarray(b,dtype=np.float32).reshape(-1)
+        self.D,self.rff_dim=self.W.shape
+        # fold the sqrt(2/rff_dim) rff normalization into the linear head once
+        self.w=(np.asarray(w,dtype=np.float32).reshape(-1)*np.float32(np.sqrt(2/self.rff_dim))).astype(np.float32)
+        self.c=np.float32(c)
+        self.mu_clip=(float(mu_clip[0]),float(mu_clip[1]))
+        self.logit=None if logit is None else (float(logit[0]),float(logit[1]))
+        self.ref_area_km2=ref_area_km2
+        self.ref_dt_sec=ref_dt_sec
+        self.chunk_size=int(chunk_size)
+
+    @classmethod
+    def from_files(cls,weights_path:str,logit_path:str=None,mu_clip=DEFAULT_MU_CLIP,**kw):
+        W,b,w,c=load_rff_weights(weights_path)
+        return cls(W,b,w,c,mu_clip,load_logit(logit_path) if logit_path else None,**kw)
+
+    @classmethod
+    def from_models_dir(cls,models_dir:str='database/models/',sf_id:int=None,mu_clip=DEFAULT_MU_CLIP,**kw):
+        # picks rff_lgcp_sf{sf_id}.weights.h5 + logit_sf{sf_id}.joblib; w/o sf_id, the first superfold that has a calibrator
+        if sf_id is None:
+            found=sorted(int(re.search(r'logit_sf(\d+)',p).group(1)) for p in glob.glob(os.path.join(models_dir,'logit_sf*.joblib')))
+            if not found:raise FileNotFoundError(f'no logit_sf*.joblib calibrator in {models_dir}')
+            sf_id=found[0]
+        logit_path=os.path.join(models_dir,f'logit_sf{sf_id}.joblib')
+        eng=cls.from_files(os.path.join(models_dir,f'rff_lgcp_sf{sf_id}.weights.h5'),logit_path if os.path.exists(logit_path) else None,mu_clip,**kw)
+        eng.sf_id=sf_id
+        return eng
+
+    # raw μ for a batch of rows (float32, chunked so the rff temporary stays bounded)
+    @traced('atlas.mu',rows=nrows)
+    def mu(self,X,chunk_size:int=None):
+        X=as_matrix(X)
+        assert X.shape[1]==self.D,f'AtlasEngine: PCA dimensionality mismatch: model expects D={self.D},got {X.shape[1]}'
+        cs=int(chunk_size or self.chunk_size)
+        out=np.empty(len(X),dtype=np.float32)
+        for s in range(0,len(X),cs):
+            z=X[s:s+cs]@self.W
+            z+=self.b
+            np.cos(z,out=z)
+            out[s:s+cs]=z@self.w+self.c
+        return np.clip(out,self.mu_clip[0],self.mu_clip[1],out=out)
+
+    # μ→risk (reference window)
+    @traced('atlas.calibrate',rows=nrows)
+    def risk_from_mu(self,mu):
+        if self.logit is None:raise RuntimeError('no logistic calibrator; pass logit=(a,b) or a logit_path')
+        a,b=self.logit
+        return sigmoid(a*np.asarray(mu,dtype=np.float64)+b)
+
+    # per-row ref-window risk
+    def risk(self,X,chunk_size:int=None):return np.clip(self.risk_from_mu(self.mu(X,chunk_size)),0.0,1.0)
+
+    # same contract as ATLAS.risk_score: (Lambda,R) for one window of K subsamples
+    @traced('atlas.risk_score')
+    def risk_score(self,X,window_area,dt,chunk_size:int=None):
+        R_ref=float(np.clip(np.mean(self.risk(X,chunk_size)),0.0,1.0))
+        Lambda,R=poisson_rescale(R_ref,window_area,dt,self.ref_area_km2,self.ref_dt_sec)
+        return float(Lambda),float(R)
+
+    # many windows in one pass: X stacks every window's subsamples, window_id labels each row (or names a column of X)
+    # returns a dataframe indexed by window id w/ K, R_ref, Lambda, R
+    @traced('atlas.risk_score_batch',rows=nrows)
+    def risk_score_batch(self,X,window_id,window_area,dt,chunk_size:int=None):
+        if isinstance(window_id,str):window_id=X[window_id].to_numpy()
+        return window_risk(self.risk(X,chunk_size),window_id,window_area,dt,self.ref_area_km2,self.ref_dt_sec)
+
+# every superfold model stacked into one engine: the rff weights are concatenated to (D,M·rff_dim), so one matmul + cos gives every member's
+# features, and a per-member head reduction gives the (n,M) μ matrix; risk comes from each member's own calibrator (members without one borrow
+# the first calibrator found), and the spread across members is the uncertainty estimate
+class EnsembleEngine:
+    def __init__(self,members,mu_clip=DEFAULT_MU_CLIP,logits=None,sf_ids=None,ref_area_km2=REF_AREA_KM2,ref_dt_sec=REF_DT_SEC,chunk_size=ENSEMBLE_CHUNK):
+        # members: [(W,b,w,c),...] like load_rff_weights; logits: one (a,b) for all members or one (a,b)/None per member
+        Ws=[np.asarray(m[0],dtype=np.float32) for m in members]
+        self.M=len(Ws);self.D,self.rff_dim=Ws[0].shape
+        if any(W.shape!=(self.D,self.rff_dim) for W in Ws):raise ValueError('ensemble members must share input & rff dims')
+        self.W=np.ascontiguousarray(np.concatenate(Ws,axis=1)) # (D,M·R)
+        self.b=np.concatenate([np.asarray(m[1],dtype=np.float32).reshape(-1) for m in members])
+        self.head=np.stack([np.asarray(m[2],dtype=np.float32).reshape(-1) for m in members]) # raw kernels (M,R), kept for the l2 term
+        self.w=(self.head*np.float32(np.sqrt(2/self.rff_dim))).astype(np.float32) # rff normalization folded in, as in AtlasEngine
+        self.c=np.array([np.ravel(m[3])[0] for m in members],dtype=np.float32)
+        self.mu_clip=(float(mu_clip[0]),float(mu_clip[1]))
+        if logits is None or (len(logits)==2 and np.isscalar(logits[0])):logits=[logits]*self.M
+        self.logits=[None if l is None else (float(l[0]),float(l[1])) for l in logits]
+        self.sf_ids=list(sf_ids) if sf_ids is not None else list(range(self.M))
+        self.ref_area_km2=ref_area_km2
+        self.ref_dt_sec=ref_dt_sec
+        self.chunk_size=int(chunk_size)
+
+    @classmethod
+    def from_models_dir(cls,models_dir:str='database/models/',sf_ids=None,mu_clip=DEFAULT_MU_CLIP,logit=None,**kw):
+        # every rff_lgcp_sf*.weights.h5 (or just sf_ids) + its logit_sf*.joblib when there is one; logit=(a,b) overrides the fallback calibrator
+        if sf_ids is None:sf_ids=sorted(int(re.search(r'rff_lgcp_sf(\d+)',p).group(1)) for p in glob.glob(os.path.join(models_dir,'rff_lgcp_sf*.weights.h5')))
+        if not sf_ids:raise FileNotFoundError(f'no rff_lgcp_sf*.weights.h5 in {models_dir}')
+        members=[load_rff_weights(os.path.join(models_dir,f'rff_lgcp_sf{sf}.weights.h5')) for sf in sf_ids]
+        own=[load_logit(p) if os.path.exists(p:=os.path.join(models_dir,f'logit_sf{sf}.joblib')) else None for sf in sf_ids]
+        fallback=logit if logit is not None else next((l for l in own if l is not None),None)
+        return cls(members,mu_clip,[l if l is not None else fallback for l in own],sf_ids,**kw)
+
+    # (n,M) μ of every member, one stacked matmul per chunk; members picks a subset (indices into sf_ids)
+    @traced('ensemble.mu',rows=nrows)
+    def mu(self,X,chunk_size:int=None,members=None):
+        X=as_matrix(X)
+        assert X.shape[1]==self.D,f'EnsembleEngine: PCA dimensionality mismatch: model expects D={self.D},got {X.shape[1]}'
+        sel=np.arange(self.M) if members is None else np.asarray(members,dtype=np.int64).reshape(-1)
+        W,b=self.W,self.b
+        if members is not None: # column blocks of the chosen members only
+            cols=(sel[:,None]*self.rff_dim+np.arange(self.rff_dim)[None,:]).ravel()
+            W,b=np.ascontiguousarray(W[:,cols]),b[cols]
+        w,c=self.w[sel],self.c[sel]
+        cs=int(chunk_size or self.chunk_size)
+        out=np.empty((len(X),len(sel)),dtype=np.float32)
+        for s in range(0,len(X),cs):
+            z=X[s:s+cs]@W
+            z+=b
+            np.cos(z,out=z)
+            out[s:s+cs]=np.einsum('nmr,mr->nm',z.reshape(len(z),len(sel),self.rff_dim),w)+c
+        return np.clip(out,self.mu_clip[0],self.mu_clip[1],out=out)
+
+    # (n,M) per-row ref-window risk, each member through its calibrator
+    @traced('ensemble.risk',rows=nrows)
+    def risk(self,X,chunk_size:int=None):
+        if any(l is None for l in self.logits):raise RuntimeError('no logistic calibrator for some members; pass logit=(a,b) or add logit_sf*.joblib files')
+        a=np.array([l[0] for l in self.logits]);b=np.array([l[1] for l in self.logits])
+        return np.clip(sigmoid(a*self.mu(X,chunk_size).astype(np.float64)+b),0.0,1.0)
+
+    # (Lambda,R) of the ensemble for one window + R_std, the spread of the members' own R
+    @traced('ensemble.risk_score')
+    def risk_score(self,X,window_area,dt,chunk_size:int=None):
+        R_ref=np.clip(self.risk(X,chunk_size).mean(axis=0),0.0,1.0) # per member
+        Lambda,R=poisson_rescale(float(R_ref.mean()),window_area,dt,self.ref_area_km2,self.ref_dt_sec)
+        _,R_m=poisson_rescale(R_ref,window_area,dt,self.ref_area_km2,self.ref_dt_sec)
+        return float(Lambda),float(R),float(np.std(R_m))
+
+    # many windows at once, like AtlasEngine.risk_score_batch plus an R_std column
+    @traced('ensemble.risk_score_batch',rows=nrows)
+    def risk_score_batch(self,X,window_id,window_area,dt,chunk_size:int=None):
+        if isinstance(window_id,str):window_id=X[window_id].to_numpy()
+        r=self.risk(X,chunk_size)
+        out=window_risk(r.mean(axis=1),window_id,window_area,dt,self.ref_area_km2,self.ref_dt_sec)
+        R_m=np.column_stack([window_risk(r[:,m],window_id,window_area,dt,self.ref_area_km2,self.ref_dt_sec)['R'].to_numpy() for m in range(self.M)])
+        out['R_std']=R_m.std(axis=1)
+        return out
@@ -0,0 +1,123 @@
+import numpy as np, folium
+from folium.plugins import FastMarkerCluster
+from .runs import point_coords
+
+MAP_MODES=('auto','points','cluster','grid') # auto = points under the budget, grid above it
+DEFAULT_COLOR='#1a4e9a' # used when a run has no risk value
+DEFAULT_MAX_POINTS=5000 # point budget for the whole map (split across overlaid runs)
+RAMP_STOPS=((0.0,(26,78,154)),(0.5,(240,173,40)),(1.0,(214,39,40))) # blue -> amber -> red
+
+def coords_array(geo:dict):
+    # point coordinates as an (n,2) lon/lat array
+    xy=np.asarray(point_coords(geo),dtype=np.float64)
+    return xy.reshape(-1,2)
+
+def risk_color(risk):
+    # blue -> amber -> red ramp so overlaid runs are distinguishable by risk
+    if risk is None or not np.isfinite(risk):return DEFAULT_COLOR
+    r=float(np.clip(risk,0,1))
+    stops=RAMP_STOPS
+    for (t0,c0),(t1,c1) in zip(stops[:-1],stops[1:]):
+        if r<=t1:
+            f=(r-t0)/(t1-t0)
+            return '#%02x%02x%02x'%tuple(int(round(a+(b-a)*f)) for a,b in zip(c0,c1))
+    return '#%02x%02x%02x'%stops[-1][1]
+
+def risk_rgba(R:np.ndarray,opacity:float=0.6,vmax:float=None):
+    # same ramp as risk_color, vectorized over a risk raster -> (rows,cols,4) uint8; nan cells are transparent
+    # vmax stretches the ramp (regional risk is usually far below 1), defaults to the raster's max
+    R=np.asarray(R,dtype=np.float64)
+    ok=np.isfinite(R)
+    top=float(vmax) if vmax else (float(R[ok].max()) if ok.any() else 1.0)
+    r=np.clip(np.where(ok,R,0)/(top or 1.0),0,1)
+    t=[a for a,_ in RAMP_STOPS]
+    rgb=np.stack([np.interp(r,t,[c[k] for _,c in RAMP_STOPS]) for k in range(3)],axis=-1)
+    alpha=np.where(ok,255*float(opacity),0)[...,None]
+    return np.round(np.concatenate([rgb,alpha],axis=-1)).astype(np.uint8)
+
+def add_heatmap_layer(fmap:folium.Map,tiles:list,name:str,opacity:float=0.6,vmax:float=None):
+    # regional risk surface (atlas/heatmap.py) as image overlays, one per stored tile: tiles = [(bounds (lon0,lat0,lon1,lat1), R raster)]
+    # rasters are stored south row first, images are drawn north row first; the ramp is shared by all tiles of the surface
+    if not tiles:return None
+    if vmax is None:vmax=max([float(np.nanmax(R)) for _,R in tiles if np.isfinite(R).any()] or [1.0])
+    group=folium.FeatureGroup(name=name)
+    for (lon0,lat0,lon1,lat1),R in tiles:
+        folium.raster_layers.ImageOverlay(risk_rgba(R[::-1],opacity,vmax),bounds=[(lat0,lon0),(lat1,lon1)],interactive=False).add_to(group)
+    group.add_to(fmap)
+    return group
+
+def grid_aggregate(xy:np.ndarray,max_cells:int):
+    # bin points into a regular lon/lat grid coarse enough to give at most max_cells occupied cells
+    # returns per-cell centroids (mean of member points) and counts
+    n=len(xy)
+    if n<=max_cells:return xy,np.ones(n,dtype=np.int64)
+    lo=xy.min(axis=0)
+    span=np.maximum(xy.max(axis=0)-lo,1e-9)
+    cell=float(span.max()/np.sqrt(max(max_cells,1)))
+    while True:
+        ij=np.floor((xy-lo)/cell).astype(np.int64)
+        key=ij[:,0]*(int(ij[:,1].max())+1)+ij[:,1]
+        uniq,inv=np.unique(key,return_inverse=True)
+        if len(uniq)<=max_cells:break
+        cell*=1.5 # still too many occupied cells, coarsen
+    counts=np.bincount(inv,minlength=len(uniq))
+    centers=np.stack([np.bincount(inv,weights=xy[:,0]),np.bincount(inv,weights=xy[:,1])],axis=1)/counts[:,None]
+    return centers,counts
+
+def points_geojson(xy:np.ndarray,counts=None):
+    # minimal featurecollection (no copied properties, rounded coords) to keep the embedded payload small
+    feats=[]
+    for i,(x,y) in enumerate(np.round(xy,5).tolist()):
+        ft={'type':'Feature','geometry':{'type':'Point','coordinates':[x,y]},'properties':{}}
+        if counts is not None:ft['properties']['n']=int(counts[i])
+        feats.append(ft)
+    return {'type':'FeatureCollection','features':feats}
+
+def _cell_radius(n:int):
+    # bucketed so folium only has to embed a handful of distinct styles
+    return int(3+2*np.floor(np.log2(max(n,1))))
+
+def subsample(xy:np.ndarray,max_points:int,seed:int=0):
+    # deterministic uniform subset of at most max_points rows (original order kept)
+    if len(xy)<=max_points:return xy
+    return xy[np.sort(np.random.default_rng(seed).choice(len(xy),max_points,replace=False))]
+
+def _cluster_marker(color:str):
+    # FastMarkerCluster callback: risk colored circle per point (row = [lat,lon])
+    return ("function(row){return L.circleMarker(new L.LatLng(row[0],row[1]),"
+            f"{{radius:3,color:'{color}',fillColor:'{color}',fill:true,fillOpacity:0.9,weight:1}});}}")
+
+def add_run_layer(fmap:folium.Map,xy:np.ndarray,name:str,risk=None,mode:str='auto',max_points:int=DEFAULT_MAX_POINTS):
+    # one layer per run: a single geojson layer (points), a client-side cluster, or grid-aggregated cells
+    # points/cluster above max_points embed a deterministic subsample, so no mode grows past the budget
+    color=risk_color(risk)
+    if len(xy)==0:return 'empty'
+    if mode=='auto':mode='points' if len(xy)<=max_points else 'grid'
+    if mode=='cluster':
+        FastMarkerCluster(np.round(subsample(xy,max_points)[:,::-1],5).tolist(),callback=_cluster_marker(color),name=name).add_to(fmap)
+    elif mode=='grid':
+        centers,counts=grid_aggregate(xy,max_points)
+        folium.GeoJson(points_geojson(centers,counts),name=name,
+            marker=folium.CircleMarker(radius=3,color=color,fill=True,fill_opacity=0.7,weight=1),
+            style_function=lambda ft:{'radius':_cell_radius(ft['properties']['n'])},
+            tooltip=folium.GeoJsonTooltip(fields=['n'],aliases=['Subsamples'])).add_to(fmap)
+    else:
+        folium.GeoJson(points_geojson(subsample(xy,max_points)),name=name,
+            marker=folium.CircleMarker(radius=3,color=color,fill=True,fill_opacity=0.9)).add_to(fmap)
+    return mode
+
+def build_map(layers:list,mode:str='auto',max_points:int=DEFAULT_MAX_POINTS,heatmaps:list=(),opacity:float=0.6):
+    # layers: list of (name,xy,risk); the point budget is shared so payload stays bounded however many runs are overlaid
+    # heatmaps: list of (name,tiles) regional surfaces drawn underneath the runs
+    fmap=folium.Map(location=[0,0],zoom_start=2,control_scale=True,tiles='CartoDB dark_matter')
+    for name,tiles in heatmaps:add_heatmap_layer(fmap,tiles,name,opacity)
+    per_layer=max(1,int(max_points)//max(len(layers),1))
+    for name,xy,risk in layers:add_run_layer(fmap,xy,name,risk,mode,per_layer)
+    # zoom to bounds of everything drawn
+    pts=[xy for _,xy,_ in layers if len(xy)]+[np.array([[b[0],b[1]],[b[2],b[3]]]) for _,tiles in heatmaps for b,_ in tiles]
+    if pts:
+        allxy=np.concatenate(pts)
+        lo,hi=allxy.min(axis=0),allxy.max(axis=0)
+        fmap.fit_bounds([(float(lo[1]),float(lo[0])),(float(hi[1]),float(hi[0]))],padding=(20,20))
+    folium.LayerControl().add_to(fmap)
+    return fmap
@@ -0,0 +1,46 @@
+import numpy as np
+
+# exact weighted threshold sweep for μ (validation-side evaluation of the RFF_LGCP model, see ATLAS.best_mu_threshold)
+# every distinct μ is a threshold (predict positive iff μ>=t): one sort/unique + suffix sums of the positive & negative weight,
+# so the full precision/recall/F1 curve costs O(n log n) instead of one masked pass over n rows per grid point
+# labels follow the notebook: y==1 positive, y==0 negative, any other label is ignored
+
+def _value_weights(mu,y,w):
+    # distinct μ (ascending) + the positive/negative weight sitting on each
+    mu=np.asarray(mu,dtype=np.float64).ravel();y=np.asarray(y).ravel();w=np.asarray(w,dtype=np.float64).ravel()
+    u,inv=np.unique(mu,return_inverse=True)
+    return u,np.bincount(inv,weights=w*(y==1),minlength=len(u)),np.bincount(inv,weights=w*(y==0),minlength=len(u))
+
+def _merge_value_weights(parts):
+    u=np.concatenate([p[0] for p in parts])
+    v,inv=np.unique(u,return_inverse=True)
+    return v,np.bincount(inv,weights=np.concatenate([p[1] for p in parts]),minlength=len(v)),np.bincount(inv,weights=np.concatenate([p[2] for p in parts]),minlength=len(v))
+
+def threshold_curve(mu,y,w,chunk_size:int=None,resolution:float=None):
+    # weighted precision/recall/f1 at every distinct μ (ascending thresholds) + pr-auc (average precision) and the best-f1 threshold
+    # chunk_size: reduce the arrays (eg. np.memmap) chunk by chunk to per-value weights; the pending chunk runs are only merged once they outgrow
+    # the merged table, so the total cost stays O(n log n). the curve itself has one point per distinct μ, so for continuous μ memory is still
+    # O(n) in exact mode; resolution rounds μ to that grid first, which bounds memory by range/resolution (+ one chunk)
+    n=len(mu)
+    if resolution:q=lambda m:np.round(np.asarray(m,dtype=np.float64)/resolution)*resolution
+    else:q=lambda m:m
+    if chunk_size and n>chunk_size:
+        cs=int(chunk_size);acc=None;parts=[];pending=0
+        for s in range(0,n,cs):
+            parts.append(_value_weights(q(mu[s:s+cs]),y[s:s+cs],w[s:s+cs]));pending+=len(parts[-1][0])
+            if pending>max(len(acc[0]) if acc else 0,cs):
+                acc=_merge_value_weights(([acc] if acc else [])+parts);parts=[];pending=0
+        t,wp,wn=_merge_value_weights(([acc] if acc else [])+parts) if parts else acc
+    else:t,wp,wn=_value_weights(q(mu),y,w)
+    # threshold t_k predicts every value >= t_k, i.e. suffix sums over the ascending values
+    TP=np.cumsum(wp[::-1])[::-1];FP=np.cumsum(wn[::-1])[::-1]
+    P=float(wp.sum())
+    precision=TP/(TP+FP+1e-12)
+    recall=TP/(P+1e-12) # TP+FN is every positive weight
+    f1=2*precision*recall/(precision+recall+1e-12)
+    # average precision: precision at each threshold weighted by the recall it adds (thresholds descending)
+    r_desc=np.concatenate([[0.0],recall[::-1]])
+    pr_auc=float(np.sum(np.diff(r_desc)*precision[::-1])) if P>0 else float('nan')
+    k=int(np.argmax(f1)) if len(f1) else 0 # first max = smallest threshold among ties (same pick as a grid scan w/ strict >)
+    return {'threshold':t,'precision':precision,'recall':recall,'f1':f1,'pr_auc':pr_auc,
+            'best_threshold':float(t[k]) if len(t) else float('nan'),'best_f1':float(f1[k]) if len(f1) else -1.0}
@@ -0,0 +1,124 @@
+import os, json, hashlib, threading
+import numpy as np, pandas as pd
+
+# content-addressed disk cache for phi outputs (generation.ipynb)
+# entries are keyed by a sha256 of everything the output depends on (query inputs + hashes of config sections / spec.json / pca.joblib),
+# so a stale entry can never be served: changing any input just changes the key and the old entry ages out of the lru
+# layout: <root>/<stage>/<key[:2]>/<key>.npz, one plain (pickle-free) npz per dataframe; file mtime doubles as the lru access time
+DEFAULT_MAX_BYTES=1<<30 # 1GiB
+CACHE_EXT='.npz'
+
+def digest(obj)->str:
+    # stable hash of any json-able value (dict key order doesn't matter)
+    return hashlib.sha256(json.dumps(obj,sort_keys=True,separators=(',',':'),default=str).encode('utf-8')).hexdigest()
+
+_file_digests={}
+def file_digest(path:str)->str:
+    # sha256 of a file's bytes, memoized on (size,mtime) so hot loops dont rehash pca.joblib every call
+    st=os.stat(path)
+    memo=_file_digests.get(path)
+    if memo and memo[0]==(st.st_size,st.st_mtime_ns):return memo[1]
+    h=hashlib.sha256()
+    with open(path,'rb') as f:
+        for block in iter(lambda:f.read(1<<20),b''):h.update(block)
+    _file_digests[path]=((st.st_size,st.st_mtime_ns),h.hexdigest())
+    return h.hexdigest()
+
+def _plain(a:np.ndarray):
+    # object arrays only go in as fixed-width strings (npz is loaded w/o pickle)
+    if a.dtype!=object:return a
+    if not all(isinstance(v,str) for v in a):raise TypeError('only numeric/string columns can be cached')
+    return a.astype(np.str_)
+
+def _to_npz(df:pd.DataFrame):
+    # columns stored positionally (c0,c1,..) + their names, so any column name round-trips
+    arrs={f'c{i}':_plain(df[c].to_numpy()) for i,c in enumerate(df.columns)}
+    arrs['__columns__']=np.array([str(c) for c in df.columns],dtype=np.str_)
+    arrs['__index__']=_plain(df.index.to_numpy())
+    return arrs
+
+def _from_npz(z):
+    cols=z['__columns__'].tolist()
+    return pd.DataFrame({c:z[f'c{i}'] for i,c in enumerate(cols)},index=z['__index__'],columns=cols)
+
+class PhiCache:
+    def __init__(self,root:str,max_bytes:int=DEFAULT_MAX_BYTES):
+        self.root=root
+        self.max_bytes=int(max_bytes)
+        self.hits=0
+        self.misses=0
+        self._size=None # lazily scanned total bytes on disk
+        self._lock=threading.Lock()
+
+    def key(self,stage:str,**parts)->str:return digest({'stage':stage,**parts})
+
+    def path(self,stage:str,key:str):return os.path.join(self.root,stage,key[:2],key+CACHE_EXT)
+
+    def get(self,stage:str,key:str):
+        # cached dataframe or None; a hit bumps the entry's mtime (lru recency)
+        p=self.path(stage,key)
+        try:
+            with np.load(p,allow_pickle=False) as z:df=_from_npz(z)
+            os.utime(p)
+        except (OSError,ValueError,KeyError):
+            self.misses+=1
+            return None
+        self.hits+=1
+        return df
+
+    def put(self,stage:str,key:str,df:pd.DataFrame):
+        p=self.path(stage,key)
+        try:arrs=_to_npz(df)
+        except TypeError:return df # not cacheable, still hand it back
+        os.makedirs(os.path.dirname(p),exist_ok=True)
+        tmp=f'{p}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp,'wb') as f:np.savez(f,**arrs)
+        with self._lock:
+            try:old=os.path.getsize(p) # an overwritten entry only adds the difference
+            except OSError:old=0
+            os.replace(tmp,p) # atomic, concurrent readers never see half an entry
+            if self._size is not None:self._size+=os.path.getsize(p)-old
+        self.evict()
+        return df
+
+    def cached(self,stage:str,key:str,compute):
+        # get-or-compute helper: compute() only runs on a miss
+        df=self.get(stage,key)
+        return df if df is not None else self.put(stage,key,compute())
+
+    def _entries(self):
+        # (mtime,size,path) of every entry under root
+        out=[]
+        for dirpath,_,files in os.walk(self.root):
+            for name in files:
+                if not name.endswith(CACHE_EXT):continue
+                p=os.path.join(dirpath,name)
+                try:st=os.stat(p)
+                except OSError:continue
+                out.append((st.st_mtime_ns,st.st_size,p))
+        return out
+
+    def size(self):
+        with self._lock:
+            if self._size is None:self._size=sum(s for _,s,_ in self._entries())
+            return self._size
+
+    def evict(self):
+        # drop least recently used entries until the cache fits in max_bytes
+        if self.size()<=self.max_bytes:return 0
+        with self._lock:
+            entries=sorted(self._entries())
+            total=sum(s for _,s,_ in entries);removed=0
+            for _,s,p in entries:
+                if total<=self.max_bytes:break
+                try:os.remove(p)
+                except OSError:continue
+                total-=s;removed+=1
+            self._size=total
+        return removed
+
+    def clear(self):
+        for _,_,p in self._entries():
+            try:os.remove(p)
+            except OSError:pass
+        with self._lock:self._size=0
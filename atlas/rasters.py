@@ -0,0 +1,343 @@
+import os, json, math
+import numpy as np, pandas as pd
+from .phicache import digest
+from .trace import span, traced, nrows
+
+# local raster backend for phi: the same named feature columns as the earth engine phi in generation.ipynb, computed from memory-mapped grids on disk
+# store layout: <root>/store.json + one .npy per layer. every layer has its own regular lon/lat grid (static bands ~300m, weather stacks ~0.1deg like gpm/era5)
+#   static layers: 2d (rows,cols), row 0 = southern edge
+#   stacks: 3d (rows,cols,steps), pixel-major so one subsample's whole time series is a single contiguous read; step k starts at t0_ms+k*step_ms
+# sampling mirrors phi: K uniform points in the uncertainty disc, each w/ u~U(0,1), bucket=floor(24u), bucket_ts=ts+bucket*1h+15min and bkt_idx into the sorted occupied buckets
+# windows follow ee filterDate semantics (steps starting in [end-h,end)); differences from earth engine: nearest-pixel sampling instead of bilinear,
+# and soil moisture day bins end at the bucket timestamp instead of being anchored at the first era5 image
+STORE_NAME='store.json'
+HOUR_MS=3600000
+DAY_MS=86400000
+PARTS=('static','dynamic')
+ESA_CLASSES=(10,20,30,40,50,60,80,90) # esa worldcover codes used by the synthetic generator
+
+class RasterStore:
+    def __init__(self,root:str):
+        self.root=root
+        with open(os.path.join(root,STORE_NAME),'r') as f:self.meta=json.load(f)
+        self.layers=self.meta['layers']
+        self.fingerprint=digest(self.meta)
+        self._arrays={}
+
+    def array(self,name:str):
+        # memory-mapped layer (opened once, pages come in on demand)
+        if name not in self._arrays:self._arrays[name]=np.load(os.path.join(self.root,self.layers[name]['file']),mmap_mode='r')
+        return self._arrays[name]
+
+    def pixels(self,name:str,lon,lat):
+        # nearest pixel (row,col) of each point + whether it falls inside the layer
+        g=self.layers[name]
+        r=np.floor((np.asarray(lat)-g['lat0'])/g['res']).astype(np.int64)
+        c=np.floor((np.asarray(lon)-g['lon0'])/g['res']).astype(np.int64)
+        h,w=g['shape'][:2]
+        inside=(r>=0)&(r<h)&(c>=0)&(c<w)
+        return np.clip(r,0,h-1),np.clip(c,0,w-1),inside
+
+    def static(self,name:str,lon,lat):
+        r,c,inside=self.pixels(name,lon,lat)
+        return np.where(inside,self.array(name)[r,c].astype(np.float64),np.nan)
+
+    def neighborhood(self,name:str,lon,lat):
+        # 3x3 window around each point's pixel (edges replicated), shape (n,3,3) w/ [0] = south row
+        r,c,inside=self.pixels(name,lon,lat)
+        a=self.array(name);h,w=a.shape
+        d=np.arange(-1,2)
+        win=a[np.clip(r[:,None,None]+d[None,:,None],0,h-1),np.clip(c[:,None,None]+d[None,None,:],0,w-1)].astype(np.float64)
+        win[~inside]=np.nan
+        return win
+
+    def series(self,name:str,lon,lat,t_lo,t_hi):
+        # per point time series covering [min(t_lo),max(t_hi)) as (values (n,steps), time of step 0, step_ms); one slice read per point
+        g=self.layers[name]
+        t0,step=g['t0_ms'],g['step_ms']
+        k0=int(np.clip(math.ceil((np.min(t_lo)-t0)/step),0,g['shape'][2]))
+        k1=int(np.clip(math.ceil((np.max(t_hi)-t0)/step),k0,g['shape'][2]))
+        r,c,inside=self.pixels(name,lon,lat)
+        vals=self.array(name)[r,c,k0:k1].astype(np.float64)
+        vals[~inside]=np.nan
+        return vals,t0+k0*step,step
+
+def _span(t_start,step,a,b,n):
+    # step index range [lo,hi) of steps starting in [a,b), clipped to the loaded series
+    lo=np.clip(np.ceil((np.asarray(a)-t_start)/step),0,n).astype(np.int64)
+    hi=np.clip(np.ceil((np.asarray(b)-t_start)/step),0,n).astype(np.int64)
+    return lo,np.maximum(hi,lo)
+
+def window_reduce(vals,t_start,step,a,b,how:str,empty=np.nan):
+    # per row reduction of vals[i,lo_i:hi_i] (sum/mean via prefix sums, max via a gathered window)
+    n=vals.shape[1]
+    lo,hi=_span(t_start,step,a,b,n)
+    rows=np.arange(len(vals))
+    cnt=hi-lo
+    if how in ('sum','mean'):
+        cs=np.concatenate([np.zeros((len(vals),1)),np.nancumsum(vals,axis=1)],axis=1)
+        s=cs[rows,hi]-cs[rows,lo]
+        out=s if how=='sum' else s/np.maximum(cnt,1)
+    elif how=='max':
+        L=int(cnt.max()) if len(cnt) else 0
+        if L==0:return np.full(len(vals),empty)
+        idx=lo[:,None]+np.arange(L)[None,:]
+        win=np.where(idx<hi[:,None],vals[rows[:,None],np.minimum(idx,n-1)],-np.inf)
+        out=win.max(axis=1)
+    else:raise ValueError(f'unknown reduction {how!r}')
+    return np.where(cnt>0,out,empty)
+
+def daily_means(vals,t_start,step,end,days:int):
+    # (n,days) daily means of the days ending at end (column 0 = oldest day), all days off one prefix sum
+    a=np.asarray(end,dtype=np.float64)[:,None]-np.arange(days,0,-1)[None,:]*DAY_MS
+    lo,hi=_span(t_start,step,a,a+DAY_MS,vals.shape[1])
+    cs=np.concatenate([np.zeros((len(vals),1)),np.nancumsum(vals,axis=1)],axis=1)
+    rows=np.arange(len(vals))[:,None]
+    cnt=hi-lo
+    return np.where(cnt>0,(cs[rows,hi]-cs[rows,lo])/np.maximum(cnt,1),np.nan)
+
+class LocalBackend:
+    def __init__(self,store,features:dict,unmask_val:float=-99):
+        # features: the features.features section of config.yaml
+        self.store=store if isinstance(store,RasterStore) else RasterStore(store)
+        self.cfg=features
+        self.unmask_val=unmask_val
+        self.fingerprint=self.store.fingerprint
+
+    @classmethod
+    def from_config(cls,root:str,config_path:str='config.yaml'):
+        import yaml
+        with open(config_path,'r') as f:cfg=yaml.safe_load(f)['features']
+        return cls(root,cfg['features'],cfg['sampling'].get('unmask_val',-99))
+
+    # subsamples for one event (q: lon, lat, ts, radius, K, seed), same columns/semantics as phi_subsamples in generation.ipynb
+    def subsamples(self,q:dict,eid:int=0):
+        rng=np.random.default_rng(int(q['seed']))
+        K=int(q['K'])
+        # uniform in the disc (equirectangular offsets are fine at these radii)
+        r=float(q['radius'])*np.sqrt(rng.random(K));th=2*np.pi*rng.random(K)
+        lat=q['lat']+r*np.sin(th)/110.574
+        lon=q['lon']+r*np.cos(th)/(111.320*np.cos(np.radians(q['lat'])))
+        u=np.random.default_rng(int(q['seed'])+1).random(K)
+        bucket=np.floor(u*24).astype(np.int64)
+        dF=pd.DataFrame({'lon':lon,'lat':lat,'u':u,'ts':q['ts']+HOUR_MS*u,'bucket':bucket,'bucket_ts':q['ts']+bucket*HOUR_MS+900000,'sid':[str(i) for i in range(K)],'eid':eid})
+        return dF
+
+    def _static(self,s:pd.DataFrame):
+        st=self.store;cfg=self.cfg['static']
+        lon,lat=s['lon'].to_numpy(),s['lat'].to_numpy()
+        out={}
+        # terrain from the dem's 3x3 neighborhood (horn gradients, laplacian4 curvature, ruggedness)
+        z=st.neighborhood('dem',lon,lat)
+        res=st.layers['dem']['res']
+        dx=res*111320.0*np.cos(np.radians(lat));dy=np.full_like(dx,res*110540.0)
+        dzdx=((z[:,0,2]+2*z[:,1,2]+z[:,2,2])-(z[:,0,0]+2*z[:,1,0]+z[:,2,0]))/(8*dx)
+        dzdy=((z[:,2,0]+2*z[:,2,1]+z[:,2,2])-(z[:,0,0]+2*z[:,0,1]+z[:,0,2]))/(8*dy)
+        slope=np.arctan(np.hypot(dzdx,dzdy))
+        aspect=np.arctan2(-dzdx,-dzdy)%(2*np.pi) # downslope azimuth, clockwise from north
+        out['slope_deg']=np.degrees(slope)
+        out['aspect_sin']=np.sin(aspect)
+        out['aspect_cos']=np.cos(aspect)
+        out['tri']=np.sqrt(((z-z[:,1:2,1:2])**2).sum(axis=(1,2)))
+        area=dx*dy
+        out['twi']=np.log(np.maximum(st.static('upa',lon,lat)*1e6/np.sqrt(area),1)/np.maximum(np.tan(slope),1e-6))
+        out['curvature_laplace']=(z[:,0,1]+z[:,2,1]+z[:,1,0]+z[:,1,2]-4*z[:,1,1])/area
+        for d in cfg['sc_depths']:
+            out[f'sand_content_{d}']=st.static(f'sand_content_{d}',lon,lat)
+            out[f'clay_content_{d}']=st.static(f'clay_content_{d}',lon,lat)
+        out['land_class']=st.static('land_class',lon,lat)
+        for suction in ('0033','1500'):
+            for d in cfg['vwc_depths']:out[f'vwc_kPa{suction}_{d}']=st.static(f'vwc_kPa{suction}_{d}',lon,lat)
+        # coordinate encoding
+        la,lo=np.radians(lat),np.radians(lon)
+        out.update({'lat_sin':np.sin(la),'lat_cos':np.cos(la),'lon_sin':np.sin(lo),'lon_cos':np.cos(lo)})
+        return out
+
+    def _dynamic(self,s:pd.DataFrame,timestamp:int):
+        st=self.store;cfg=self.cfg['dynamic'];uv=self.unmask_val
+        lon,lat=s['lon'].to_numpy(),s['lat'].to_numpy()
+        T=s['bucket_ts'].to_numpy(np.float64) # every sample reads its own bucket's timestamp (= timestamps[bkt_idx])
+        out={}
+        def load(name,hours):return st.series(name,lon,lat,T-hours*HOUR_MS,T)
+
+        # precipitation sums/maxes/hits (gpm rates, like the ee stacks)
+        p_hours=max(cfg['precip_sum_h']+cfg['precip_max_h']+cfg['precip_hits_h']+[cfg['pev_sum_d']*24])
+        pv,pt,pstep=load('precipitation',p_hours)
+        for h in cfg['precip_sum_h']:out[f'precip_mm_{h}h_sum']=window_reduce(pv,pt,pstep,T-h*HOUR_MS,T,'sum',uv)
+        for h in cfg['precip_max_h']:out[f'precip_mm_{h}h_max']=window_reduce(pv,pt,pstep,T-h*HOUR_MS,T,'max',uv)
+        hits=(pv*(pstep/HOUR_MS)>10).astype(np.float64) # depth per step > 10mm
+        for h in cfg['precip_hits_h']:out[f'precip_hits_{h}h']=window_reduce(hits,pt,pstep,T-h*HOUR_MS,T,'sum',uv)
+
+        # era5 runoff sums
+        rh=max(cfg['runoff_h'])
+        for band,label in (('surface_runoff','surface_runoff'),('sub_surface_runoff','subsurface_runoff')):
+            v,t,step=load(band,rh)
+            for h in cfg['runoff_h']:out[f'{label}_{h}h_sum']=window_reduce(v,t,step,T-h*HOUR_MS,T,'sum',uv)
+
+        # soil moisture means, anomaly (z of today vs the last d days) & trend (slope of daily means, per day)
+        days=max(cfg['soil_moist_anom_d']+cfg['soil_moist_trend_d'])
+        for level,label in zip(self.cfg['vsw_levels'],self.cfg['vsw_labels']):
+            v,t,step=load(f'volumetric_soil_water_layer_{level}',max(days*24,max(cfg['soil_moist_mean_h'])))
+            for h in cfg['soil_moist_mean_h']:out[f'soil_moist_{label}_{h}h_mean']=window_reduce(v,t,step,T-h*HOUR_MS,T,'mean',uv)
+            daily=daily_means(v,t,step,T,days)
+            for d in cfg['soil_moist_anom_d']:
+                w=daily[:,-d:]
+                out[f'soil_moist_anom_{d}d_{label}']=np.nan_to_num((w[:,-1]-np.nanmean(w,axis=1))/np.maximum(np.nanstd(w,axis=1),1e-6),nan=uv)
+            for d in cfg['soil_moist_trend_d']:
+                w=daily[:,-d:];x=np.arange(d,dtype=np.float64)
+                ok=np.isfinite(w);cnt=np.maximum(ok.sum(axis=1),1)
+                xm=(ok*x).sum(axis=1)/cnt;ym=np.nansum(w,axis=1)/cnt
+                cov=np.nansum((x-xm[:,None])*(w-ym[:,None]),axis=1);var=(ok*(x-xm[:,None])**2).sum(axis=1)
+                out[f'soil_moist_trend_{d}d_{label}']=np.where(var>0,cov/np.maximum(var,1e-12),uv)
+
+        # potential evaporation & moisture deficit (pev minus precip over the same window)
+        pd_=cfg['pev_sum_d']
+        v,t,step=load('potential_evaporation_hourly',pd_*24)
+        pev=window_reduce(v,t,step,T-pd_*DAY_MS,T,'sum',uv)
+        out[f'pev_sum_{pd_}d']=pev
+        out[f'moisture_deficit_{pd_}d']=pev-window_reduce(pv,pt,pstep,T-pd_*DAY_MS,T,'sum',0.0)
+
+        # snow cover & depth sums
+        sh=max(cfg['snow_h'])
+        for band,label in (('snow_cover','snow_cover'),('snow_depth_water_equivalent','snow_depth')):
+            v,t,step=load(band,sh)
+            for h in cfg['snow_h']:out[f'{label}_{h}h_sum']=window_reduce(v,t,step,T-h*HOUR_MS,T,'sum',uv)
+
+        # day of year encoding
+        dts=pd.DatetimeIndex(pd.to_datetime(T,unit='ms',utc=True))
+        year_start=pd.DatetimeIndex(pd.to_datetime(pd.DataFrame({'year':dts.year,'month':1,'day':1}),utc=True))
+        doy=(dts-year_start).total_seconds().to_numpy()/86400+1
+        ang=doy/365.25*2*np.pi
+        out['doy_sin'],out['doy_cos']=np.sin(ang),np.cos(ang)
+
+        # ndvi anomaly over the antecedent window of the event timestamp (z of the latest composite)
+        nd=self.cfg['static']['ndvi_anom_d']
+        v,t,step=st.series('ndvi',lon,lat,np.full(len(s),timestamp-nd*DAY_MS),np.full(len(s),timestamp))
+        if v.shape[1]:
+            last=v[:,-1];mu=np.nanmean(v,axis=1);sd=np.nanstd(v,axis=1,ddof=1) if v.shape[1]>1 else np.zeros(len(v))
+            out[f'ndvi_anom_{nd}d']=(last-mu)/np.maximum(np.nan_to_num(sd),1e-6)
+        else:out[f'ndvi_anom_{nd}d']=np.full(len(s),np.nan)
+        return out
+
+    # sample the requested parts at a subsample frame (from one or more events), same contract as phi_sample in generation.ipynb
+    # rows w/ masked (nan) values are dropped like sampleRegions does; returns {part: dataframe w/ eid, sid + band columns}
+    def sample(self,subsamples:pd.DataFrame,timestamp:int,parts=PARTS):
+        s=subsamples.reset_index(drop=True)
+        ts_sorted=np.sort(s['bucket_ts'].unique())
+        s=s.assign(bkt_idx=np.searchsorted(ts_sorted,s['bucket_ts'].to_numpy()))
+        res={}
+        for p in parts:
+            with span(f'phi.{p}') as sp:
+                cols=self._static(s) if p=='static' else self._dynamic(s,int(timestamp))
+                dF=pd.concat([s[['eid','sid']],pd.DataFrame(cols,index=s.index)],axis=1)
+                res[p]=dF[dF.drop(columns=['eid','sid']).notna().all(axis=1)].reset_index(drop=True)
+                sp.rows=len(res[p])
+        return res
+
+    def raw_features(self,q:dict):
+        # one event's raw (pre snow flag) feature frame (indexed by sid, like phi_join) + its subsamples, columns sorted like computeFeatures returns them
+        s=self.subsamples(q)
+        parts=self.sample(s,q['ts'])
+        dF=parts['dynamic'].drop(columns='eid').merge(parts['static'].drop(columns='eid'),on='sid',how='inner').set_index('sid')
+        return dF[sorted(dF.columns)],s
+
+def finish_features(dF:pd.DataFrame,pipeline):
+    # snow flag + frozen spec normalization & pca (featuretoolkit FrozenPipeline), same as phi_finish in generation.ipynb
+    with span('phi.snow_flag',rows=len(dF)):
+        snow=[c for c in dF.columns if 'snow_cover' in c or 'snow_depth' in c]
+        flag=(dF[snow].sum(axis=1)>0).astype(int)
+        dF=dF.drop(columns=snow).assign(snow_flag=flag)
+    with span('transform.pca',rows=len(dF)):return pipeline.transform_frame(dF)
+
+@traced('phi',rows=nrows)
+def local_phi(backend:LocalBackend,lat:float,lon:float,timestamp:int,radius:float,K:int=128,seed:int=42,pipeline=None):
+    # offline phi -> (pca features, subsamples); pipeline defaults to spec.json + pca.joblib from config.yaml
+    if pipeline is None:
+        import yaml
+        from featuretoolkit.src.transform import FrozenPipeline
+        with open('config.yaml','r') as f:cfg=yaml.safe_load(f)
+        pipeline=FrozenPipeline.from_files(cfg['features']['path']['spec'],cfg['model']['path']['pca_persist'])
+    dF,s=backend.raw_features({'lon':float(lon),'lat':float(lat),'ts':int(timestamp),'radius':float(radius),'K':int(K),'seed':int(seed)})
+    return finish_features(dF,pipeline),s
+
+def _smooth_noise(rng,shape,scale:float):
+    # gaussian-filtered white noise (fft), normalized to zero mean / unit std
+    f=np.fft.fftn(rng.standard_normal(shape))
+    k=[np.fft.fftfreq(n)[:,None] if i==0 else np.fft.fftfreq(n)[None,:] for i,n in enumerate(shape)]
+    out=np.real(np.fft.ifftn(f*np.exp(-(k[0]**2+k[1]**2)*(scale**2)*2*np.pi**2)))
+    return (out-out.mean())/(out.std() or 1)
+
+def make_synthetic_store(root:str,center=(76.98,10.02),extent_deg:float=1.0,start='2020-04-01',days:int=150,static_res:float=0.0025,stack_res:float=0.1,seed:int=42,features:dict=None):
+    # writes a self-consistent synthetic store around center (lon,lat): terrain/soil grids + ~monsoonal gpm/era5 stacks + 16-day ndvi composites
+    # sizes stay small (default ~15MB) so the full offline pipeline runs anywhere
+    if features is None:
+        import yaml
+        with open('config.yaml','r') as f:features=yaml.safe_load(f)['features']['features']
+    rng=np.random.default_rng(seed)
+    os.makedirs(root,exist_ok=True)
+    lon0,lat0=center[0]-extent_deg/2,center[1]-extent_deg/2
+    layers={}
+    def put(name,arr,res,**extra):
+        fn=f'{name}.npy'
+        np.save(os.path.join(root,fn),np.ascontiguousarray(arr,dtype=np.float32))
+        layers[name]={'file':fn,'lon0':lon0,'lat0':lat0,'res':res,'shape':list(arr.shape),**extra}
+
+    # static grids
+    n=int(round(extent_deg/static_res))
+    dem=np.clip(1200+700*_smooth_noise(rng,(n,n),n/8)+60*_smooth_noise(rng,(n,n),4),0,None)
+    put('dem',dem,static_res)
+    put('upa',0.01*np.exp(4*(dem.max()-dem)/(np.ptp(dem) or 1))*np.exp(0.5*_smooth_noise(rng,(n,n),3)),static_res) # drainage area (km2), larger in valleys
+    for d in features['static']['sc_depths']:
+        put(f'sand_content_{d}',np.round(40+3*_smooth_noise(rng,(n,n),n/8)),static_res)
+        put(f'clay_content_{d}',np.round(33+3*_smooth_noise(rng,(n,n),n/8)),static_res)
+    lc=_smooth_noise(rng,(n,n),n/10)
+    put('land_class',np.array(ESA_CLASSES,dtype=np.float32)[np.clip(((lc+2.5)/5*len(ESA_CLASSES)).astype(int),0,len(ESA_CLASSES)-1)],static_res)
+    for suction,base in (('0033',0.33),('1500',0.2)):
+        for d in features['static']['vwc_depths']:put(f'vwc_kPa{suction}_{d}',base+0.01*_smooth_noise(rng,(n,n),n/8),static_res)
+
+    # hourly/half-hourly weather stacks on a coarse grid, pixel-major
+    m=max(int(round(extent_deg/stack_res)),1)
+    t0=int(pd.Timestamp(start,tz='UTC').value//10**6)
+    steps_h=days*24
+    season=np.clip(np.sin(np.linspace(0,np.pi,steps_h)),0,None) # wet season peaking mid-window
+    storm=np.maximum(_smooth_noise(rng,(m*m,steps_h),12)+1.2*season-1.2,0)**2*2 # mm/hr, sparse & bursty
+    gpm=np.repeat(storm.reshape(m,m,steps_h),2,axis=2)*np.exp(0.2*rng.standard_normal((m,m,2*steps_h)))
+    put('precipitation',gpm,stack_res,t0_ms=t0,step_ms=HOUR_MS//2)
+    rain=storm.reshape(m,m,steps_h)
+    wet=np.empty_like(rain);acc=np.full((m,m),0.25)
+    for k in range(steps_h):
+        acc=np.clip(acc*0.998+rain[:,:,k]*0.002,0.05,0.5) # leaky bucket soil moisture
+        wet[:,:,k]=acc
+    put('volumetric_soil_water_layer_1',wet,stack_res,t0_ms=t0,step_ms=HOUR_MS)
+    deep=np.empty_like(wet);acc=wet[:,:,0].copy()
+    for k in range(steps_h):
+        acc=acc+(wet[:,:,k]-acc)*0.01
+        deep[:,:,k]=acc
+    put('volumetric_soil_water_layer_4',deep,stack_res,t0_ms=t0,step_ms=HOUR_MS)
+    hour=(np.arange(steps_h)%24)/24
+    put('potential_evaporation_hourly',np.broadcast_to(-0.0004*np.clip(np.sin(2*np.pi*(hour-0.25)),0,None),(m,m,steps_h)),stack_res,t0_ms=t0,step_ms=HOUR_MS)
+    put('surface_runoff',rain*np.clip(wet-0.35,0,None)*1e-3,stack_res,t0_ms=t0,step_ms=HOUR_MS)
+    put('sub_surface_runoff',rain*wet*2e-4,stack_res,t0_ms=t0,step_ms=HOUR_MS)
+    put('snow_cover',np.zeros((m,m,steps_h)),stack_res,t0_ms=t0,step_ms=HOUR_MS)
+    put('snow_depth_water_equivalent',np.zeros((m,m,steps_h)),stack_res,t0_ms=t0,step_ms=HOUR_MS)
+
+    # 16-day ndvi composites (modis scaling), on the coarse grid to keep the store small
+    nc=days//16
+    put('ndvi',6000+1500*_smooth_noise(rng,(m*m,nc),2).reshape(m,m,nc),stack_res,t0_ms=t0,step_ms=16*DAY_MS)
+
+    meta={'version':1,'synthetic':True,'seed':seed,'center':list(center),'start':start,'days':days,'layers':layers}
+    with open(os.path.join(root,STORE_NAME),'w') as f:json.dump(meta,f,indent=1)
+    return RasterStore(root)
+
+if __name__=='__main__':
+    # python -m atlas.rasters [root]: build a synthetic store and score one event fully offline
+    import sys, time
+    from .inference import AtlasEngine
+    root=sys.argv[1] if len(sys.argv)>1 else 'database/synthetic'
+    t=time.perf_counter()
+    if not os.path.exists(os.path.join(root,STORE_NAME)):make_synthetic_store(root)
+    backend=LocalBackend.from_config(root)
+    ts=int(pd.Timestamp('2020-08-06',tz='UTC').value//10**6)
+    X,_=local_phi(backend,10.0178,76.9784,ts,17,K=128)
+    Lambda,R=AtlasEngine.from_models_dir().risk_score(X,17**2*math.pi,3600)
+    print(f'{len(X)} subsamples, Lambda={Lambda:.4f}, R={R:.4f} ({time.perf_counter()-t:.2f}s)')
@@ -0,0 +1,319 @@
+import os, io, json, time, pickle, sqlite3, zipfile, statistics, threading
+import numpy as np
+from abc import ABC, abstractmethod
+from pathlib import Path
+from datetime import datetime, timezone
+from .bundle import BUNDLE_NAME, RunBundle, read_bundle
+
+RUN_FILES=('tuple.pkl','featurecollection.json') # legacy run files (a folder is a run if it has these or a run.atlas bundle)
+CATALOG_NAME='.catalog.sqlite' # manifest filename (lives in the workspace root)
+
+def load_risk(pkl_path:Path):
+    # grab risk value from various pickle formats (path or open binary file)
+    if hasattr(pkl_path,'read'):obj=pickle.load(pkl_path)
+    else:
+        with open(pkl_path,'rb') as f:obj=pickle.load(f)
+
+    # try direct number first, then list/tuple
+    # this bit exists mostly because i originally used tuples for risk (lambda + risk) before switching to just risk values for viz
+    if isinstance(obj,(int,float)):val=float(obj)
+    elif isinstance(obj,(list,tuple)) and obj and isinstance(obj[0],(int,float)):val=float(obj[0])
+    else:return None
+    return val
+
+def as_geojson(info):
+    # normalize whatever was saved (fc, feature list, single feature) to a featurecollection dict
+    if not isinstance(info,dict):return {'type':'FeatureCollection','features':[]}
+    if info.get('type')=='FeatureCollection':return info
+    if 'features' in info:return {'type':'FeatureCollection','features':info['features']}
+    if info.get('type')=='Feature':return {'type':'FeatureCollection','features':[info]}
+    return {'type':'FeatureCollection','features':[]}
+
+def load_geojson(json_path:Path):
+    # parse saved featurecollection locally (path or open file)
+    if hasattr(json_path,'read'):return as_geojson(json.load(json_path))
+    with open(json_path,'r') as f:return as_geojson(json.load(f))
+
+def point_coords(geo:dict):
+    # (lon,lat) pairs of all point features
+    return [(ft['geometry']['coordinates'][0],ft['geometry']['coordinates'][1]) for ft in geo.get('features',[]) if ft.get('geometry',{}).get('type')=='Point' and ft.get('geometry',{}).get('coordinates')]
+
+def get_bounds(geo:dict):
+    # find min/max coords for map bounds
+    coords=point_coords(geo)
+    if not coords:return None
+    xs,ys=zip(*coords)
+    return [(min(ys),min(xs)),(max(ys),max(xs))]
+
+def mean_coord(geo:dict):
+    # average lat/lon of all points
+    coords=point_coords(geo)
+    if not coords:return None
+    xs,ys=zip(*coords)
+    return (statistics.fmean(ys),statistics.fmean(xs)) # lat,lon
+
+# date property hunting, shared by extract_date & extract_timestamp
+DATE_KEYS=('timestamp','time','date','time_start') # this also exists because of some inconsistencies in earlier versions. old inferences should still pass well through this
+
+def _epoch_ms(v):
+    # handle ee dates & epochs (ms or s), None if it doesnt look like a date
+    if isinstance(v,dict) and v.get('type')=='Date' and isinstance(v.get('value'),(int,float)):return float(v['value'])
+    if isinstance(v,(int,float)) and not isinstance(v,bool):
+        # milliseconds or seconds since epoch
+        ts=v/1000 if v>10_000_000_000 else v
+        if ts>10_000_000:return float(ts*1000)
+    return None
+
+def _prop_date(props:dict):
+    # known keys first then any value that looks like a date
+    for k in DATE_KEYS:
+        if k in props:return props[k]
+    for v in props.values():
+        if _epoch_ms(v) is not None or isinstance(v,str):return v
+    return None
+
+def _date_value(geo:dict):
+    # check first few features
+    for ft in geo.get('features',[])[:12]:
+        v=_prop_date(ft.get('properties',{}) or {})
+        if v is not None:return v
+    return None
+
+def _fmt_ms(ms):return datetime.fromtimestamp(ms/1000,timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
+
+def extract_date(geo:dict):
+    # hunt for date in feature properties, formatted for display
+    v=_date_value(geo)
+    ms=_epoch_ms(v)
+    if ms is not None:return _fmt_ms(ms)
+    if isinstance(v,str):return v
+    return '—'
+
+def extract_timestamp(geo:dict):
+    # same hunt as extract_date but as epoch millis (None for string-only dates)
+    return _epoch_ms(_date_value(geo))
+
+def run_files(names):
+    # files backing a run given a folder listing: the bundle if present, else the legacy pair (None if not a run)
+    if BUNDLE_NAME in names:return (BUNDLE_NAME,)
+    if all(f in names for f in RUN_FILES):return RUN_FILES
+    return None
+
+def run_mtime(run_dir:Path,files=None):
+    # latest mtime over the run files (None if the folder isnt a valid run)
+    files=files or run_files(os.listdir(run_dir))
+    if not files:return None
+    try:return max(os.stat(os.path.join(run_dir,f)).st_mtime for f in files)
+    except OSError:return None
+
+def bundle_from_geojson(geo:dict,risk=None,columns:dict=None,**meta):
+    # pack a featurecollection (+ run-level values) into a RunBundle
+    # numeric per-sample properties become columns, the date hunt from extract_date gives the 'ts' column if theres no numeric ts already
+    geo=as_geojson(geo)
+    pts=[ft for ft in geo.get('features',[]) if ft.get('geometry',{}).get('type')=='Point' and ft.get('geometry',{}).get('coordinates')]
+    props=[ft.get('properties',{}) or {} for ft in pts]
+    cols={'lon':np.array([ft['geometry']['coordinates'][0] for ft in pts],dtype=np.float64),
+          'lat':np.array([ft['geometry']['coordinates'][1] for ft in pts],dtype=np.float64)}
+    for k in dict.fromkeys(k for p in props for k in p):
+        vals=[p.get(k) for p in props]
+        if not all(isinstance(v,(int,float)) and not isinstance(v,bool) for v in vals):continue
+        if all(isinstance(v,int) for v in vals):
+            arr=np.asarray(vals,dtype=np.int64)
+            cols[k]=next((arr.astype(t) for t in (np.int16,np.int32) if arr.size==0 or (arr.min()>=np.iinfo(t).min and arr.max()<=np.iinfo(t).max)),arr) # smallest int that fits
+        else:cols[k]=np.asarray(vals,dtype=np.float64)
+    if 'ts' not in cols:cols['ts']=np.array([_epoch_ms(_prop_date(p)) or np.nan for p in props],dtype=np.float64)
+    for k,v in (columns or {}).items():cols[k]=np.asarray(v)
+    meta={'risk':risk,'ts':extract_timestamp(geo),'date':extract_date(geo),**meta}
+    return RunBundle(cols,meta)
+
+def summarize(run:RunBundle):
+    # everything the selector needs about a run, straight off the bundle arrays
+    xy=run.xy
+    ts=run.meta.get('ts')
+    if ts is None and 'ts' in run.columns:
+        finite=run.columns['ts'][np.isfinite(run.columns['ts'])]
+        ts=float(finite[0]) if finite.size else None
+    has=len(xy)>0
+    lo,hi,avg=(xy.min(axis=0),xy.max(axis=0),xy.mean(axis=0)) if has else (None,None,None)
+    return {
+        'risk':run.risk,
+        'lat':float(avg[1]) if has else None,'lon':float(avg[0]) if has else None,
+        'min_lat':float(lo[1]) if has else None,'min_lon':float(lo[0]) if has else None,
+        'max_lat':float(hi[1]) if has else None,'max_lon':float(hi[0]) if has else None,
+        'ts':ts,'date':run.meta.get('date') or (_fmt_ms(ts) if ts is not None else '—'),
+        'n_pts':run.n}
+
+def read_run(run_dir:Path):
+    # RunBundle for a run folder, from run.atlas if present, else from the legacy pair
+    run_dir=Path(run_dir)
+    if (run_dir/BUNDLE_NAME).exists():return read_bundle(run_dir/BUNDLE_NAME)
+    try:risk=load_risk(run_dir/RUN_FILES[0])
+    except Exception:risk=None
+    return bundle_from_geojson(load_geojson(run_dir/RUN_FILES[1]),risk=risk)
+
+def summarize_run(run_dir:Path):return summarize(read_run(run_dir))
+
+def iter_run_dirs(root:Path):
+    # walk the tree once w/ scandir (much cheaper than rglob + exists checks per path)
+    stack=[str(root)]
+    while stack:
+        d=stack.pop()
+        try:entries=list(os.scandir(d))
+        except OSError:continue
+        if run_files({e.name for e in entries if e.is_file()}):yield Path(d)
+        stack.extend(e.path for e in entries if e.is_dir(follow_symlinks=False))
+
+def convert_run_dir(run_dir:Path,remove_legacy:bool=False):
+    # write run.atlas for a legacy run folder (optionally dropping tuple.pkl + featurecollection.json after)
+    run_dir=Path(run_dir)
+    read_run(run_dir).save(run_dir/BUNDLE_NAME)
+    if remove_legacy:
+        for f in RUN_FILES:(run_dir/f).unlink(missing_ok=True)
+    return run_dir/BUNDLE_NAME
+
+def convert_tree(root:Path,remove_legacy:bool=False):
+    # convert every legacy-only run under root, returns converted bundle paths
+    return [convert_run_dir(d,remove_legacy) for d in iter_run_dirs(root) if not (d/BUNDLE_NAME).exists()]
+
+# workspaces: where runs live (a local folder or an uploaded zip)
+# both list runs as (relative path, change stamp) and only decode a run when it is asked for (the viewer keeps its own bounded cache of decoded runs)
+class Workspace(ABC):
+    catalog_path=':memory:' # where the run catalog for this workspace is persisted
+
+    @abstractmethod
+    def runs(self):... # yields (run, mtime) of every valid run
+    @abstractmethod
+    def has(self,run:str,name:str):...
+    @abstractmethod
+    def open(self,run:str,name:str):... # binary file object
+    def label(self,run:str):return run
+
+    def read_bundle(self,run:str):
+        with self.open(run,BUNDLE_NAME) as f:return read_bundle(f.read())
+
+    def decode(self,run:str):
+        # RunBundle for one run, read fresh from the workspace (legacy runs get packed on the fly)
+        if self.has(run,BUNDLE_NAME):return self.read_bundle(run)
+        try:
+            with self.open(run,RUN_FILES[0]) as f:risk=load_risk(f)
+        except Exception:risk=None
+        with self.open(run,RUN_FILES[1]) as f:geo=load_geojson(f)
+        return bundle_from_geojson(geo,risk=risk)
+
+    def summarize(self,run:str):return summarize(self.decode(run))
+    def close(self):pass
+
+class DirWorkspace(Workspace):
+    def __init__(self,root):
+        self.root=Path(root)
+        self.catalog_path=str(self.root/CATALOG_NAME)
+
+    def runs(self):
+        if not self.root.exists():return
+        for d in iter_run_dirs(self.root):
+            mt=run_mtime(d)
+            if mt is not None:yield d.relative_to(self.root).as_posix(),mt
+
+    def has(self,run:str,name:str):return (self.root/run/name).exists()
+    def open(self,run:str,name:str):return open(self.root/run/name,'rb')
+    def read_bundle(self,run:str):return read_bundle(self.root/run/BUNDLE_NAME) # memory-mapped
+    def label(self,run:str):return str(self.root/run)
+
+class ZipWorkspace(Workspace):
+    # reads members straight out of the archive; nothing is extracted to disk
+    def __init__(self,src,name:str='upload.zip'):
+        self.name=name
+        self.zf=zipfile.ZipFile(io.BytesIO(src) if isinstance(src,(bytes,bytearray)) else src,'r')
+        # index run members by parent folder once; the central directory is all that gets read here
+        self.members={}
+        for zi in self.zf.infolist():
+            if zi.is_dir():continue
+            parent,_,base=zi.filename.rstrip('/').rpartition('/')
+            if base in RUN_FILES or base==BUNDLE_NAME:self.members.setdefault(parent or '.',{})[base]=zi
+
+    def runs(self):
+        for run,m in self.members.items():
+            files=run_files(m)
+            if files:yield run,max(time.mktime(m[f].date_time+(0,0,-1)) for f in files)
+
+    def has(self,run:str,name:str):return name in self.members.get(run,{})
+    def open(self,run:str,name:str):return self.zf.open(self.members[run][name])
+    def label(self,run:str):return f'{self.name}:{run}'
+
+    def close(self):self.zf.close()
+
+# persisted, indexed manifest of runs in a workspace
+# rows are keyed by path relative to the workspace and only re-summarized when the run's change stamp (mtime) changes
+class RunCatalog:
+    COLUMNS=('path','mtime','risk','lat','lon','min_lat','min_lon','max_lat','max_lon','ts','date','n_pts')
+
+    def __init__(self,workspace,db_path=None):
+        self.workspace=workspace if isinstance(workspace,Workspace) else DirWorkspace(workspace)
+        self.db_path=str(db_path or self.workspace.catalog_path)
+        self._lock=threading.Lock()
+        try:self.con=sqlite3.connect(self.db_path,check_same_thread=False);self._init_schema()
+        except sqlite3.Error:
+            # read-only workspace etc; fall back to an in-memory manifest for this session
+            self.db_path=':memory:'
+            self.con=sqlite3.connect(self.db_path,check_same_thread=False);self._init_schema()
+
+    def _init_schema(self):
+        with self.con:
+            self.con.execute('CREATE TABLE IF NOT EXISTS runs (path TEXT PRIMARY KEY,mtime REAL,risk REAL,lat REAL,lon REAL,min_lat REAL,min_lon REAL,max_lat REAL,max_lon REAL,ts REAL,date TEXT,n_pts INTEGER)')
+            self.con.execute('CREATE INDEX IF NOT EXISTS runs_risk ON runs(risk)')
+            self.con.execute('CREATE INDEX IF NOT EXISTS runs_ts ON runs(ts)')
+            self.con.execute('CREATE INDEX IF NOT EXISTS runs_latlon ON runs(lat,lon)')
+
+    def refresh(self):
+        # incremental sync: stat every run, only re-summarize new/changed ones, drop vanished ones
+        # returns (added_or_updated,removed) counts
+        with self._lock:
+            known=dict(self.con.execute('SELECT path,mtime FROM runs').fetchall())
+            seen=set();changed=[]
+            for rel,mt in self.workspace.runs():
+                seen.add(rel)
+                if known.get(rel)==mt:continue
+                try:row=self.workspace.summarize(rel)
+                except (OSError,ValueError,EOFError,zipfile.BadZipFile):continue # half-written run, pick it up next refresh
+                changed.append({'path':rel,'mtime':mt,**row})
+            removed=[p for p in known if p not in seen]
+            with self.con:
+                if changed:self.con.executemany(f'INSERT OR REPLACE INTO runs VALUES ({",".join(":"+c for c in self.COLUMNS)})',changed)
+                if removed:self.con.executemany('DELETE FROM runs WHERE path=?',[(p,) for p in removed])
+            return len(changed),len(removed)
+
+    def _where(self,bbox=None,t0=None,t1=None,min_risk=None):
+        # bbox is (min_lon,min_lat,max_lon,max_lat) and matches runs whose point bounds intersect it; t0/t1 are epoch millis
+        clauses=[];args=[]
+        if bbox is not None:
+            clauses.append('max_lon>=? AND min_lon<=? AND max_lat>=? AND min_lat<=?')
+            args+=[bbox[0],bbox[2],bbox[1],bbox[3]]
+        if t0 is not None:clauses.append('ts>=?');args.append(t0)
+        if t1 is not None:clauses.append('ts<=?');args.append(t1)
+        if min_risk is not None:clauses.append('risk>=?');args.append(min_risk)
+        return (' WHERE '+' AND '.join(clauses)) if clauses else '',args
+
+    def query(self,bbox=None,t0=None,t1=None,min_risk=None,order='path',limit=None,offset=0):
+        # filtered & paged run summaries as dicts (order is a column name, prefix w/ '-' for descending)
+        col=order.lstrip('-')
+        if col not in self.COLUMNS:raise ValueError(f'unknown order column: {order}')
+        where,args=self._where(bbox,t0,t1,min_risk)
+        sql=f'SELECT {",".join(self.COLUMNS)} FROM runs{where} ORDER BY {col} {"DESC" if order.startswith("-") else "ASC"},path'
+        if limit is not None:sql+=' LIMIT ? OFFSET ?';args+=[int(limit),int(offset)]
+        with self._lock:rows=self.con.execute(sql,args).fetchall()
+        return [dict(zip(self.COLUMNS,r)) for r in rows]
+
+    def count(self,bbox=None,t0=None,t1=None,min_risk=None):
+        where,args=self._where(bbox,t0,t1,min_risk)
+        with self._lock:return self.con.execute(f'SELECT COUNT(*) FROM runs{where}',args).fetchone()[0]
+
+    def get(self,path):
+        with self._lock:r=self.con.execute(f'SELECT {",".join(self.COLUMNS)} FROM runs WHERE path=?',(path,)).fetchone()
+        return dict(zip(self.COLUMNS,r)) if r else None
+
+    def time_range(self):
+        with self._lock:return self.con.execute('SELECT MIN(ts),MAX(ts) FROM runs').fetchone()
+
+    def close(self):
+        self.con.close()
+        self.workspace.close()
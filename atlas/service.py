@@ -0,0 +1,231 @@
+import asyncio, io, json, time, threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+from .inference import AtlasEngine, EnsembleEngine, load_mu_clip
+from .trace import span
+
+# long running scoring service: the chosen superfold (or the superfold ensemble) + its logit calibrator stay loaded, and concurrent requests are
+# micro-batched, i.e. every request that arrives while a batch is being collected (up to max_delay_ms or max_batch_rows) is stacked into one
+# risk_score_batch call, each request being its own window (own area & dt). latency per request is returned w/ the scores and summarized on /metrics
+# transport is plain http/1.1 (keep-alive) over tcp or a unix socket, no web framework:
+#   POST /score  json {"X": [[pca_1..pca_D],...], "window_area": km², "dt": s}  or  an .npy body (application/x-npy) w/ ?window_area=..&dt=..
+#   GET /health, GET /metrics (prometheus text)
+# python -m atlas.service [--models database/models/] [--sf 1 | --ensemble] [--port 8765 | --unix /tmp/atlas.sock]
+DEFAULT_PORT=8765
+DEFAULT_MAX_DELAY_MS=5.0
+DEFAULT_MAX_BATCH_ROWS=65536
+LATENCY_WINDOW=10000 # latencies kept for the /metrics quantiles
+MAX_BODY=1<<30
+
+class _Pending:
+    __slots__=('X','window_area','dt','future','t_in')
+    def __init__(self,X,window_area,dt,future):
+        self.X,self.window_area,self.dt,self.future=X,window_area,dt,future
+        self.t_in=time.perf_counter()
+
+class ScoringService:
+    def __init__(self,engine,max_delay_ms:float=DEFAULT_MAX_DELAY_MS,max_batch_rows:int=DEFAULT_MAX_BATCH_ROWS):
+        # engine: AtlasEngine or EnsembleEngine w/ a calibrator
+        self.engine=engine
+        self.max_delay=max_delay_ms/1000
+        self.max_batch_rows=int(max_batch_rows)
+        self._queue=None;self._task=None
+        self._pool=ThreadPoolExecutor(1,thread_name_prefix='atlas-score') # numpy releases the gil, so the loop keeps accepting while a batch runs
+        self.stats={'requests':0,'rows':0,'batches':0,'errors':0}
+        self.latencies=deque(maxlen=LATENCY_WINDOW)
+        self._lock=threading.Lock()
+
+    @classmethod
+    def from_models_dir(cls,models_dir:str='database/models/',sf_id:int=None,ensemble:bool=False,config_path:str='config.yaml',**kw):
+        mu_clip=load_mu_clip(config_path)
+        engine=EnsembleEngine.from_models_dir(models_dir,None,mu_clip) if ensemble else AtlasEngine.from_models_dir(models_dir,sf_id,mu_clip)
+        return cls(engine,**kw)
+
+    @property
+    def model(self):
+        e=self.engine
+        return f'ensemble sf{",".join(str(s) for s in e.sf_ids)}' if isinstance(e,EnsembleEngine) else f'sf{getattr(e,"sf_id","?")}'
+
+    def start(self):
+        # the batcher runs on the current event loop
+        if self._task is None:
+            self._queue=asyncio.Queue()
+            self._task=asyncio.get_running_loop().create_task(self._batcher())
+        return self
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:await self._task
+            except asyncio.CancelledError:pass
+            self._task=None
+        self._pool.shutdown(wait=False)
+
+    async def score(self,X,window_area:float,dt:float):
+        # (n,D) pca features of one window -> {Lambda, R, K, R_ref[, R_std], latency_ms, queue_ms, batch_requests, batch_rows}
+        X=np.ascontiguousarray(X,dtype=np.float32)
+        if X.ndim!=2 or X.shape[1]!=self.engine.D:raise ValueError(f'expected an (n,{self.engine.D}) feature matrix, got {X.shape}')
+        if not len(X):raise ValueError('empty window (no subsamples)')
+        if self._task is None:self.start()
+        fut=asyncio.get_running_loop().create_future()
+        await self._queue.put(_Pending(X,float(window_area),float(dt),fut))
+        return await fut
+
+    async def _batcher(self):
+        loop=asyncio.get_running_loop()
+        while True:
+            batch=[await self._queue.get()];rows=len(batch[0].X)
+            deadline=loop.time()+self.max_delay
+            while rows<self.max_batch_rows:
+                try:item=self._queue.get_nowait() # already queued requests join w/o waiting
+                except asyncio.QueueEmpty:
+                    timeout=deadline-loop.time()
+                    if timeout<=0:break
+                    try:item=await asyncio.wait_for(self._queue.get(),timeout)
+                    except asyncio.TimeoutError:break
+                batch.append(item);rows+=len(item.X)
+            await self._run(batch,rows)
+
+    def _score_batch(self,batch,rows:int):
+        with span('service.batch',rows=rows,requests=len(batch)):
+            X=np.concatenate([p.X for p in batch]) if len(batch)>1 else batch[0].X
+            ids=np.repeat(np.arange(len(batch)),[len(p.X) for p in batch])
+            return self.engine.risk_score_batch(X,ids,np.array([p.window_area for p in batch]),np.array([p.dt for p in batch]))
+
+    async def _run(self,batch,rows:int):
+        t0=time.perf_counter()
+        try:scores=await asyncio.get_running_loop().run_in_executor(self._pool,self._score_batch,batch,rows)
+        except Exception as e:
+            with self._lock:self.stats['errors']+=len(batch)
+            for p in batch:
+                if not p.future.done():p.future.set_exception(e)
+            return
+        t1=time.perf_counter()
+        cols=[c for c in ('K','R_ref','Lambda','R','R_std') if c in scores]
+        vals={c:scores[c].to_numpy() for c in cols}
+        with self._lock:
+            self.stats['requests']+=len(batch);self.stats['rows']+=rows;self.stats['batches']+=1
+            for i,p in enumerate(batch):
+                if p.future.done():continue # caller went away
+                out={c:(int(vals[c][i]) if c=='K' else float(vals[c][i])) for c in cols}
+                out.update(latency_ms=1000*(t1-p.t_in),queue_ms=1000*(t0-p.t_in),batch_requests=len(batch),batch_rows=rows)
+                self.latencies.append(out['latency_ms'])
+                p.future.set_result(out)
+
+    def metrics(self,prefix:str='atlas_service'):
+        # prometheus text: counters + latency quantiles over the last LATENCY_WINDOW requests
+        with self._lock:
+            stats=dict(self.stats);lat=np.array(self.latencies,dtype=np.float64)
+        lines=[]
+        for k,v in stats.items():lines+=[f'# TYPE {prefix}_{k}_total counter',f'{prefix}_{k}_total {v}']
+        lines.append(f'# TYPE {prefix}_latency_ms summary')
+        for q in (0.5,0.9,0.99):lines.append(f'{prefix}_latency_ms{{quantile="{q}"}} {np.quantile(lat,q) if len(lat) else float("nan"):.6g}')
+        lines+=[f'{prefix}_latency_ms_count {len(lat)}',f'{prefix}_latency_ms_sum {lat.sum():.6g}']
+        lines+=[f'# TYPE {prefix}_batch_rows_mean gauge',f'{prefix}_batch_rows_mean {stats["rows"]/max(stats["batches"],1):.6g}']
+        return '\n'.join(lines)+'\n'
+
+    # http/1.1 over asyncio streams
+
+    async def _route(self,method:str,target:str,headers:dict,body:bytes):
+        url=urlsplit(target)
+        if method=='GET' and url.path=='/health':
+            return 200,'application/json',json.dumps({'ok':True,'model':self.model,'D':self.engine.D}).encode()
+        if method=='GET' and url.path=='/metrics':return 200,'text/plain; version=0.0.4',self.metrics().encode()
+        if method!='POST' or url.path!='/score':return 404,'application/json',b'{"error":"not found"}'
+        try:
+            if headers.get('content-type','').startswith('application/x-npy'):
+                q={k:v[0] for k,v in parse_qs(url.query).items()}
+                X,area,dt=np.load(io.BytesIO(body),allow_pickle=False),q['window_area'],q['dt']
+            else:
+                req=json.loads(body)
+                X,area,dt=np.asarray(req['X'],dtype=np.float32),req['window_area'],req['dt']
+            out=await self.score(X,float(area),float(dt))
+        except (KeyError,ValueError,TypeError) as e:
+            return 400,'application/json',json.dumps({'error':f'{type(e).__name__}: {e}'}).encode()
+        return 200,'application/json',json.dumps(out).encode()
+
+    async def _handle(self,reader,writer):
+        try:
+            while True: # keep-alive
+                line=await reader.readline()
+                if not line.strip():break
+                method,target,_=line.decode('latin-1').split(' ',2)
+                headers={}
+                while True:
+                    h=await reader.readline()
+                    if h in (b'\r\n',b'\n',b''):break
+                    k,_,v=h.decode('latin-1').partition(':');headers[k.strip().lower()]=v.strip()
+                n=int(headers.get('content-length',0))
+                if n>MAX_BODY:
+                    status,ctype,payload=413,'application/json',b'{"error":"body too large"}'
+                    headers['connection']='close'
+                else:status,ctype,payload=await self._route(method,target,headers,await reader.readexactly(n) if n else b'')
+                close=headers.get('connection','').lower()=='close'
+                writer.write(f'HTTP/1.1 {status} {_REASON.get(status,"")}\r\nContent-Type: {ctype}\r\nContent-Length: {len(payload)}\r\nConnection: {"close" if close else "keep-alive"}\r\n\r\n'.encode('latin-1')+payload)
+                await writer.drain()
+                if close:break
+        except (asyncio.IncompleteReadError,ConnectionError,ValueError):pass
+        finally:
+            writer.close()
+            try:await writer.wait_closed()
+            except ConnectionError:pass
+
+    async def serve(self,host:str='127.0.0.1',port:int=DEFAULT_PORT,unix:str=None):
+        # start the batcher + listener and return the asyncio server (await server.serve_forever() to block)
+        self.start()
+        if unix:return await asyncio.start_unix_server(self._handle,path=unix)
+        return await asyncio.start_server(self._handle,host,port)
+
+_REASON={200:'OK',400:'Bad Request',404:'Not Found',413:'Payload Too Large'}
+
+class ServiceClient:
+    # blocking client (one keep-alive connection); unix= for a unix socket service
+    def __init__(self,host:str='127.0.0.1',port:int=DEFAULT_PORT,unix:str=None,timeout:float=30.0):
+        import http.client, socket
+        if unix:
+            class _UnixConnection(http.client.HTTPConnection):
+                def connect(self):
+                    self.sock=socket.socket(socket.AF_UNIX,socket.SOCK_STREAM);self.sock.settimeout(timeout);self.sock.connect(unix)
+            self.con=_UnixConnection('localhost',timeout=timeout)
+        else:self.con=http.client.HTTPConnection(host,port,timeout=timeout)
+
+    def _request(self,method:str,path:str,body=None,headers=None):
+        self.con.request(method,path,body,headers or {})
+        r=self.con.getresponse();data=r.read()
+        if r.status!=200:raise RuntimeError(f'{r.status}: {data.decode(errors="replace")}')
+        return data
+
+    def score(self,X,window_area:float,dt:float):
+        # X: (n,D) array or dataframe w/ pca_* columns; sent as .npy (no json float formatting)
+        from .inference import as_matrix
+        buf=io.BytesIO();np.save(buf,as_matrix(X),allow_pickle=False)
+        return json.loads(self._request('POST',f'/score?window_area={float(window_area)!r}&dt={float(dt)!r}',buf.getvalue(),{'Content-Type':'application/x-npy'}))
+
+    def health(self):return json.loads(self._request('GET','/health'))
+
+    def metrics(self):return self._request('GET','/metrics').decode()
+
+    def close(self):self.con.close()
+
+if __name__=='__main__':
+    import argparse
+    ap=argparse.ArgumentParser(description='warm ATLAS scoring service w/ request micro-batching')
+    ap.add_argument('--models',default='database/models/')
+    ap.add_argument('--sf',type=int,default=None,help='superfold id (default: the first one w/ a calibrator)')
+    ap.add_argument('--ensemble',action='store_true',help='score w/ every superfold (adds R_std)')
+    ap.add_argument('--config',default='config.yaml')
+    ap.add_argument('--host',default='127.0.0.1')
+    ap.add_argument('--port',type=int,default=DEFAULT_PORT)
+    ap.add_argument('--unix',default=None,help='listen on this unix socket instead of tcp')
+    ap.add_argument('--max-delay-ms',type=float,default=DEFAULT_MAX_DELAY_MS,help='how long a batch waits for more requests')
+    ap.add_argument('--max-batch-rows',type=int,default=DEFAULT_MAX_BATCH_ROWS)
+    args=ap.parse_args()
+    async def main():
+        svc=ScoringService.from_models_dir(args.models,args.sf,args.ensemble,args.config,max_delay_ms=args.max_delay_ms,max_batch_rows=args.max_batch_rows)
+        server=await svc.serve(args.host,args.port,args.unix)
+        print(f'atlas scoring service ({svc.model}, D={svc.engine.D}) on {args.unix or f"http://{args.host}:{args.port}"}',flush=True)
+        async with server:await server.serve_forever()
+    try:asyncio.run(main())
+    except KeyboardInterrupt:pass
@@ -0,0 +1,179 @@
+import os, json, time, threading, functools, contextvars, tracemalloc
+from collections import deque
+
+# opt-in stage tracing for scoring requests (phi -> snow flag -> normalize/pca -> predict -> calibration, and the viewer's discovery/rendering)
+# span(name) / @traced(name) time a stage: wall time, process cpu time, rows and (w/ memory=True, via tracemalloc) the peak of python/numpy allocations
+# above the stage's starting point. spans nest; the outermost span (or an explicit request(name)) is the request its inner spans are aggregated into
+# disabled (the default) every span is one global lookup returning a shared no-op, so instrumented code pays ~nothing
+# enable() in code, or ATLAS_TRACE=1 in the environment (ATLAS_TRACE_MEMORY=1 adds peak memory, ATLAS_TRACE_FILE=path appends every request as a json line)
+# finished requests are kept in a bounded deque (recent()) and folded into per-stage totals exported as prometheus text (prometheus())
+DEFAULT_KEEP=1000
+METRIC_PREFIX='atlas_stage'
+
+_TRACER=None
+_CURRENT=contextvars.ContextVar('atlas_trace_current',default=None) # innermost open span of this thread/task
+
+class _NoopSpan:
+    # shared stand-in while tracing is off: a context manager whose rows can be set & ignored
+    rows=None
+    def __enter__(self):return self
+    def __exit__(self,*exc):return False
+
+_NOOP=_NoopSpan()
+
+class Span:
+    def __init__(self,tracer,name:str,rows:int=None,attrs:dict=None,root:bool=False):
+        self.tracer=tracer;self.name=name;self.rows=rows;self.attrs=attrs or {};self.root=root
+        self.children=[];self.parent=None
+        self.wall=self.cpu=0.0;self.peak=None;self.error=None
+
+    def __enter__(self):
+        self.parent=None if self.root else _CURRENT.get()
+        self._token=_CURRENT.set(self)
+        if self.tracer.memory:
+            cur,peak=tracemalloc.get_traced_memory()
+            if self.parent is not None:self.parent._peak_abs=max(self.parent._peak_abs,peak)
+            tracemalloc.reset_peak()
+            self._mem0=self._peak_abs=cur
+        self.start=time.time()
+        self._t0=time.perf_counter();self._c0=time.process_time()
+        return self
+
+    def __exit__(self,exc_type,exc,tb):
+        self.wall=time.perf_counter()-self._t0;self.cpu=time.process_time()-self._c0
+        if self.tracer.memory:
+            self._peak_abs=max(self._peak_abs,tracemalloc.get_traced_memory()[1])
+            self.peak=self._peak_abs-self._mem0
+            if self.parent is not None:self.parent._peak_abs=max(self.parent._peak_abs,self._peak_abs)
+        if exc_type is not None:self.error=exc_type.__name__
+        _CURRENT.reset(self._token)
+        if self.parent is None:self.tracer._finish(self)
+        else:self.parent.children.append(self)
+        return False
+
+    def walk(self,depth:int=0):
+        yield depth,self
+        for c in self.children:yield from c.walk(depth+1)
+
+    def record(self):
+        # flat dict of this span (no children)
+        out={'name':self.name,'wall_s':self.wall,'cpu_s':self.cpu}
+        if self.rows is not None:out['rows']=int(self.rows)
+        if self.peak is not None:out['peak_bytes']=int(self.peak)
+        if self.error:out['error']=self.error
+        if self.attrs:out['attrs']=self.attrs
+        return out
+
+    def stages(self):
+        # per stage name aggregation over the whole request (calls, summed wall/cpu/rows, max peak)
+        agg={}
+        for _,s in self.walk():
+            a=agg.setdefault(s.name,{'calls':0,'wall_s':0.0,'cpu_s':0.0,'rows':0,'peak_bytes':None})
+            a['calls']+=1;a['wall_s']+=s.wall;a['cpu_s']+=s.cpu;a['rows']+=int(s.rows or 0)
+            if s.peak is not None:a['peak_bytes']=max(a['peak_bytes'] or 0,int(s.peak))
+        return agg
+
+    def to_dict(self):
+        return {'request':self.name,'start':self.start,**{k:v for k,v in self.record().items() if k!='name'},
+                'spans':[{**s.record(),'depth':d} for d,s in self.walk()][1:],'stages':self.stages()}
+
+class Tracer:
+    def __init__(self,memory:bool=False,path:str=None,keep:int=DEFAULT_KEEP):
+        self.memory=memory;self.path=path
+        self.requests=deque(maxlen=keep)
+        self.totals={}
+        self._lock=threading.Lock()
+
+    def _finish(self,root:Span):
+        with self._lock:
+            self.requests.append(root)
+            for name,a in root.stages().items():
+                t=self.totals.setdefault(name,{'calls':0,'wall_s':0.0,'cpu_s':0.0,'rows':0,'peak_bytes':None})
+                t['calls']+=a['calls'];t['wall_s']+=a['wall_s'];t['cpu_s']+=a['cpu_s'];t['rows']+=a['rows']
+                if a['peak_bytes'] is not None:t['peak_bytes']=max(t['peak_bytes'] or 0,a['peak_bytes'])
+            if self.path:
+                with open(self.path,'a') as f:f.write(json.dumps(root.to_dict())+'\n')
+
+    def recent(self,n:int=None):
+        with self._lock:reqs=list(self.requests)
+        return reqs if n is None else reqs[-n:]
+
+    def to_jsonl(self,path:str):
+        # every kept request as one json line (appended)
+        with open(path,'a') as f:
+            for r in self.recent():f.write(json.dumps(r.to_dict())+'\n')
+
+    def prometheus(self,prefix:str=METRIC_PREFIX):
+        # cumulative per stage totals in the prometheus text exposition format
+        with self._lock:totals={k:dict(v) for k,v in self.totals.items()}
+        def lbl(name):return '{stage="'+name.replace('\\','\\\\').replace('"','\\"')+'"}'
+        lines=[]
+        for key,metric,kind,help_ in (('calls','calls_total','counter','spans finished'),('wall_s','wall_seconds_total','counter','wall time'),
+                                      ('cpu_s','cpu_seconds_total','counter','process cpu time'),('rows','rows_total','counter','rows processed'),
+                                      ('peak_bytes','peak_bytes','gauge','max traced allocation peak of one span')):
+            vals=[(n,t[key]) for n,t in sorted(totals.items()) if t[key] is not None]
+            if not vals:continue
+            lines+=[f'# HELP {prefix}_{metric} {help_}',f'# TYPE {prefix}_{metric} {kind}']
+            lines+=[f'{prefix}_{metric}{lbl(n)} {v:.9g}' if isinstance(v,float) else f'{prefix}_{metric}{lbl(n)} {v}' for n,v in vals]
+        return '\n'.join(lines)+'\n'
+
+    def summary(self):
+        # per stage totals as a dataframe (slowest first)
+        import pandas as pd
+        with self._lock:totals={k:dict(v) for k,v in self.totals.items()}
+        dF=pd.DataFrame.from_dict(totals,orient='index')
+        if dF.empty:return dF
+        dF['wall_ms_per_call']=1000*dF['wall_s']/dF['calls']
+        return dF.sort_values('wall_s',ascending=False)
+
+    def reset(self):
+        with self._lock:self.requests.clear();self.totals.clear()
+
+def enable(memory:bool=False,path:str=None,keep:int=DEFAULT_KEEP):
+    # start tracing (replaces any previous tracer); memory=True starts tracemalloc, which slows allocation heavy code noticeably
+    global _TRACER
+    if memory and not tracemalloc.is_tracing():tracemalloc.start()
+    _TRACER=Tracer(memory,path,keep)
+    return _TRACER
+
+def disable():
+    global _TRACER
+    t,_TRACER=_TRACER,None
+    if t is not None and t.memory and tracemalloc.is_tracing():tracemalloc.stop()
+    return t
+
+def tracer():return _TRACER
+
+def span(name:str,rows:int=None,**attrs):
+    # with span('phi.sample') as sp: ...; sp.rows=len(dF)
+    t=_TRACER
+    return _NOOP if t is None else Span(t,name,rows,attrs)
+
+def request(name:str,**attrs):
+    # explicit request root (eg. one viewer rerun); spans opened inside are aggregated into it
+    t=_TRACER
+    return _NOOP if t is None else Span(t,name,None,attrs,root=True)
+
+def traced(name:str=None,rows=None):
+    # decorator form; rows: optional callable(result) -> row count
+    def deco(fn):
+        label=name or fn.__qualname__
+        @functools.wraps(fn)
+        def wrapper(*args,**kw):
+            t=_TRACER
+            if t is None:return fn(*args,**kw)
+            with Span(t,label) as s:
+                out=fn(*args,**kw)
+                if rows is not None:s.rows=rows(out)
+                return out
+        return wrapper
+    return deco
+
+def nrows(out):
+    # row count of a result (frame/array, or the first item of a tuple like phi's (dFpca, subsamples))
+    if isinstance(out,tuple):out=out[0]
+    try:return len(out)
+    except TypeError:return None
+
+if os.environ.get('ATLAS_TRACE','').lower() in ('1','true','yes'):
+    enable(os.environ.get('ATLAS_TRACE_MEMORY','').lower() in ('1','true','yes'),os.environ.get('ATLAS_TRACE_FILE') or None)
@@ -0,0 +1,259 @@
+import math
+import numpy as np, pandas as pd
+from .rasters import HOUR_MS
+
+# incremental window aggregation for the dynamic (weather) features of a fixed set of sites, eg. an hourly nowcast over a watchlist
+# instead of re-reading every window at every hour, each site keeps per band state and advancing one hour is O(1) per feature:
+#   sums/means: one prefix-sum ring per band, every configured window is P[k]-P[k-w] (w in steps)
+#   maxes: one monotonic deque per window (decreasing values, amortized O(1) push), vectorized over the sites
+#   soil moisture anomaly/trend: daily means ending at each hour, kept as 24 phase rings (one per hour of day) w/ running counts, ∑y, ∑y², ∑k·y per window
+# columns & semantics follow LocalBackend._dynamic at T = the current time: windows of the steps starting in [T-h,T), nan steps count as 0 in sums
+# and as steps in means (nancumsum), windows w/o any step yet give unmask_val. ndvi (16-day composites) is not hourly and stays w/ the backend
+# steps missing from the store (before/after its range) are pushed as absent: like window_reduce clipping them they add nothing and aren't counted,
+# so a day w/o any step has a nan daily mean that anomaly/trend skip (nanmean/nanstd & the masked slope). maxes also skip nan steps (window_reduce doesnt)
+STEP_MS={'precipitation':HOUR_MS//2} # gpm is half-hourly, every other band hourly era5
+RUNOFF_BANDS=(('surface_runoff','surface_runoff'),('sub_surface_runoff','subsurface_runoff'))
+SNOW_BANDS=(('snow_cover','snow_cover'),('snow_depth_water_equivalent','snow_depth'))
+HITS_BAND='precip_hits' # derived: depth per step > 10mm
+
+class _PrefixRing:
+    # running prefix sum of one band over the last L steps, (n,L+1) ring; P[k]=∑ of the first k steps, C[k]=how many of them were present
+    def __init__(self,n:int,L:int):
+        self.L=int(L)
+        self.P=np.zeros((n,self.L+1))
+        self.C=np.zeros(self.L+1,dtype=np.int64) # presence is per step (the store's time range), the same for every site
+        self.k=0
+
+    def push(self,v,present:bool=True):
+        p,c=self.P[:,self.k%(self.L+1)],self.C[self.k%(self.L+1)]
+        self.k+=1
+        self.P[:,self.k%(self.L+1)]=p+np.nan_to_num(v)
+        self.C[self.k%(self.L+1)]=c+bool(present)
+
+    def sum(self,w:int):
+        if self.k==0:return np.zeros(len(self.P))
+        return self.P[:,self.k%(self.L+1)]-self.P[:,(self.k-min(w,self.k))%(self.L+1)]
+
+    def count(self,w:int):
+        # present steps among the last w
+        if self.k==0:return 0
+        return int(self.C[self.k%(self.L+1)]-self.C[(self.k-min(w,self.k))%(self.L+1)])
+
+class _MaxDeque:
+    # sliding max over the last w steps: per site a ring of (value, step) w/ decreasing values, front = window max
+    def __init__(self,n:int,w:int):
+        self.w=int(w)
+        self.val=np.full((n,self.w),-np.inf);self.idx=np.zeros((n,self.w),dtype=np.int64)
+        self.head=np.zeros(n,dtype=np.int64);self.size=np.zeros(n,dtype=np.int64)
+        self.rows=np.arange(n)
+        self.k=0
+
+    def push(self,v):
+        v=np.where(np.isnan(v),-np.inf,v)
+        rows,w=self.rows,self.w
+        # the front leaves once it is w steps old (at most one entry per push)
+        old=(self.size>0)&(self.idx[rows,self.head]<=self.k-w)
+        self.head=np.where(old,(self.head+1)%w,self.head);self.size-=old
+        # drop everything at the back that the new value dominates
+        while True:
+            pop=(self.size>0)&(self.val[rows,(self.head+self.size-1)%w]<=v)
+            if not pop.any():break
+            self.size-=pop
+        tail=(self.head+self.size)%w
+        self.val[rows,tail]=v;self.idx[rows,tail]=self.k
+        self.size+=1
+        self.k+=1
+
+    def max(self):return np.where(self.size>0,self.val[self.rows,self.head],-np.inf)
+
+class _DailyStats:
+    # mean/std & slope of the last d daily means (one per day, the newest ending now) for several d, updated once per hour
+    # daily means ending at hour H only share a ring w/ hours H±24k, so there is one ring per phase H%24 and each hour updates just its own phase
+    # nan daily means (days w/o any step, or not seen yet) are skipped: per window the sums only run over valid days, at positions 0..d-1 (newest at d-1)
+    def __init__(self,n:int,windows):
+        self.windows=sorted(set(int(d) for d in windows))
+        self.D=max(self.windows)
+        self.Y=np.full((n,24,self.D),np.nan)
+        new=lambda:{d:np.zeros((n,24)) for d in self.windows}
+        self.M,self.X,self.XX=new(),new(),new() # valid days, ∑ position, ∑ position²
+        self.S0,self.S1,self.Q=new(),new(),new() # ∑y, ∑ position·y, ∑y²
+        self.last=np.full(n,np.nan)
+        self.H=0
+
+    def push(self,y):
+        # y: the daily mean ending at the hour just completed (nan for a day w/o any step)
+        y=np.asarray(y,dtype=np.float64)
+        self.H+=1
+        p,j=self.H%24,(self.H-1)//24 # j: how many earlier daily means this phase has seen
+        old={d:(self.Y[:,p,(j-d)%self.D].copy() if j>=d else np.nan) for d in self.windows}
+        self.Y[:,p,j%self.D]=y
+        ok=np.isfinite(y);y0=np.where(ok,y,0.0)
+        for d in self.windows:
+            o=np.isfinite(old[d]);o0=np.where(o,old[d],0.0)
+            # the oldest (position 0) falls off, every other day moves down one position, the new one lands at d-1
+            m,x,s0=self.M[d][:,p]-o,self.X[d][:,p],self.S0[d][:,p]-o0
+            self.S1[d][:,p]+=-s0+(d-1)*y0
+            self.XX[d][:,p]+=-2*x+m+ok*(d-1)**2
+            self.X[d][:,p]=x-m+ok*(d-1)
+            self.M[d][:,p]=m+ok
+            self.S0[d][:,p]=s0+y0
+            self.Q[d][:,p]+=y0*y0-o0*o0
+        self.last=y
+
+    def anomaly(self,d:int,empty:float):
+        p=self.H%24;m=self.M[d][:,p]
+        with np.errstate(divide='ignore',invalid='ignore'):
+            mu=self.S0[d][:,p]/m
+            sd=np.sqrt(np.maximum(self.Q[d][:,p]/m-mu*mu,0))
+            return np.nan_to_num((self.last-mu)/np.maximum(sd,1e-6),nan=empty)
+
+    def trend(self,d:int,empty:float):
+        p=self.H%24;m=self.M[d][:,p]
+        xm=self.X[d][:,p]/np.maximum(m,1)
+        var=self.XX[d][:,p]-xm*self.X[d][:,p] # ∑(x-x̄)² over the valid positions, 0 for fewer than 2 days
+        return np.where(var>0,(self.S1[d][:,p]-xm*self.S0[d][:,p])/np.maximum(var,1e-12),empty)
+
+class WindowEngine:
+    def __init__(self,features:dict,lon,lat,t_ms:int,unmask_val:float=-99,step_ms:dict=None):
+        # features: the features.features section of config.yaml (like LocalBackend); lon/lat: the sites; t_ms: time the state starts at (empty windows)
+        self.cfg=features
+        cfg=features['dynamic']
+        self.lon=np.asarray(lon,dtype=np.float64).ravel();self.lat=np.asarray(lat,dtype=np.float64).ravel()
+        self.n=len(self.lon)
+        self.t=int(t_ms)
+        self.uv=unmask_val
+        self.step_ms={**STEP_MS,**(step_ms or {})}
+        for b,s in self.step_ms.items():
+            if HOUR_MS%s:raise ValueError(f'{b}: step of {s}ms does not divide an hour')
+        # window lengths (hours) each band needs
+        pev_h=cfg['pev_sum_d']*24
+        self.levels=list(zip(features['vsw_levels'],features['vsw_labels']))
+        need={'precipitation':cfg['precip_sum_h']+cfg['precip_max_h']+[pev_h],HITS_BAND:cfg['precip_hits_h'],'potential_evaporation_hourly':[pev_h]}
+        for band,_ in RUNOFF_BANDS:need[band]=cfg['runoff_h']
+        for band,_ in SNOW_BANDS:need[band]=cfg['snow_h']
+        for level,_ in self.levels:need[f'volumetric_soil_water_layer_{level}']=cfg['soil_moist_mean_h']+[24]
+        self.rings={b:_PrefixRing(self.n,max(hs)*self.spb(b)) for b,hs in need.items()}
+        self.maxes={h:_MaxDeque(self.n,h*self.spb('precipitation')) for h in cfg['precip_max_h']}
+        days=cfg['soil_moist_anom_d']+cfg['soil_moist_trend_d']
+        self.daily={level:_DailyStats(self.n,days) for level,_ in self.levels}
+
+    @property
+    def bands(self):return [b for b in self.rings if b!=HITS_BAND] # raw bands advance() expects
+
+    def spb(self,band:str):
+        # steps per hour (hits run on the precipitation steps)
+        return HOUR_MS//self.step_ms.get('precipitation' if band==HITS_BAND else band,HOUR_MS)
+
+    def advance(self,values:dict,present:dict=None):
+        # push one hour: values[band] = the (n,steps per hour) (or (n,) for hourly bands) steps starting in [T,T+1h), then T += 1h
+        # present[band]: (steps per hour,) flags, False for steps the source doesnt have (default all present, nan values are still nan steps)
+        present=present or {}
+        for b in self.bands:
+            v=np.asarray(values[b],dtype=np.float64).reshape(self.n,self.spb(b))
+            ok=np.broadcast_to(np.asarray(present.get(b,True),dtype=bool),(v.shape[1],))
+            for k in range(v.shape[1]):self.rings[b].push(v[:,k],ok[k])
+            if b=='precipitation':
+                hits=(v/self.spb(b)>10).astype(np.float64)
+                for k in range(v.shape[1]):
+                    self.rings[HITS_BAND].push(hits[:,k],ok[k])
+                    for m in self.maxes.values():m.push(v[:,k])
+        for level,_ in self.levels:
+            r=self.rings[f'volumetric_soil_water_layer_{level}'];c=r.count(24)
+            self.daily[level].push(r.sum(24)/c if c else np.full(self.n,np.nan))
+        self.t+=HOUR_MS
+
+    def _sum(self,band:str,h:int,empty=None):
+        r=self.rings[band];w=h*self.spb(band)
+        return r.sum(w) if r.count(w) else np.full(self.n,self.uv if empty is None else empty)
+
+    def _mean(self,band:str,h:int):
+        r=self.rings[band];w=h*self.spb(band)
+        return r.sum(w)/r.count(w) if r.count(w) else np.full(self.n,self.uv)
+
+    def features(self):
+        # dynamic feature columns at the current T (same names as LocalBackend._dynamic, w/o ndvi)
+        cfg=self.cfg['dynamic'];uv=self.uv
+        out={}
+        for h in cfg['precip_sum_h']:out[f'precip_mm_{h}h_sum']=self._sum('precipitation',h)
+        for h,m in self.maxes.items():
+            mx=m.max()
+            out[f'precip_mm_{h}h_max']=np.where(np.isfinite(mx),mx,uv)
+        for h in cfg['precip_hits_h']:out[f'precip_hits_{h}h']=self._sum(HITS_BAND,h)
+        for band,label in RUNOFF_BANDS:
+            for h in cfg['runoff_h']:out[f'{label}_{h}h_sum']=self._sum(band,h)
+        for level,label in self.levels:
+            for h in cfg['soil_moist_mean_h']:out[f'soil_moist_{label}_{h}h_mean']=self._mean(f'volumetric_soil_water_layer_{level}',h)
+            for d in cfg['soil_moist_anom_d']:out[f'soil_moist_anom_{d}d_{label}']=self.daily[level].anomaly(d,uv)
+            for d in cfg['soil_moist_trend_d']:out[f'soil_moist_trend_{d}d_{label}']=self.daily[level].trend(d,uv)
+        pd_=cfg['pev_sum_d']
+        pev=self._sum('potential_evaporation_hourly',pd_*24)
+        out[f'pev_sum_{pd_}d']=pev
+        out[f'moisture_deficit_{pd_}d']=pev-self._sum('precipitation',pd_*24,0.0)
+        for band,label in SNOW_BANDS:
+            for h in cfg['snow_h']:out[f'{label}_{h}h_sum']=self._sum(band,h)
+        # day of year encoding (same for every site)
+        dt=pd.Timestamp(self.t,unit='ms',tz='UTC')
+        ang=((dt-pd.Timestamp(year=dt.year,month=1,day=1,tz='UTC')).total_seconds()/86400+1)/365.25*2*np.pi
+        out['doy_sin'],out['doy_cos']=np.full(self.n,np.sin(ang)),np.full(self.n,np.cos(ang))
+        return out
+
+    def frame(self):return pd.DataFrame(self.features())
+
+    # raster store driven state: warm up over the longest window, then catch up hour by hour as new steps land
+
+    def _read(self,store,band:str,t_ms:int):
+        # steps starting in [T,t_ms) for every site as (n,hours,steps per hour), nan where the store has no data
+        # + (hours,steps per hour) flags of the steps inside the store's range
+        g=store.layers[band];step=g['step_ms']
+        if step!=self.step_ms.get(band,HOUR_MS):raise ValueError(f'{band}: store step {step}ms, engine expects {self.step_ms.get(band,HOUR_MS)}ms')
+        hours=(int(t_ms)-self.t)//HOUR_MS;spb=self.spb(band)
+        k0=math.ceil((self.t-g['t0_ms'])/step) # first step starting at/after T
+        out=np.full((self.n,hours*spb),np.nan)
+        a,b=max(k0,0),min(k0+hours*spb,g['shape'][2])
+        if b>a:
+            r,c,inside=store.pixels(band,self.lon,self.lat)
+            v=store.array(band)[r,c,a:b].astype(np.float64)
+            v[~inside]=np.nan
+            out[:,a-k0:b-k0]=v
+        present=np.zeros(hours*spb,dtype=bool);present[max(a-k0,0):max(b-k0,0)]=True
+        return out.reshape(self.n,hours,spb),present.reshape(hours,spb)
+
+    def catch_up(self,store,t_ms:int):
+        # advance hour by hour up to t_ms (whole hours) from a RasterStore
+        if int(t_ms)-self.t<HOUR_MS:return self
+        vals={b:self._read(store,b,t_ms) for b in self.bands}
+        for i in range(next(iter(vals.values()))[0].shape[1]):self.advance({b:v[:,i] for b,(v,_) in vals.items()},{b:ok[i] for b,(_,ok) in vals.items()})
+        return self
+
+    @classmethod
+    def history_hours(cls,features:dict):
+        # hours of history that fill every window
+        cfg=features['dynamic']
+        return max(cfg['precip_sum_h']+cfg['precip_max_h']+cfg['precip_hits_h']+cfg['runoff_h']+cfg['soil_moist_mean_h']+cfg['snow_h']
+                   +[cfg['pev_sum_d']*24,24*max(cfg['soil_moist_anom_d']+cfg['soil_moist_trend_d'])])
+
+    @classmethod
+    def from_store(cls,store,features:dict,lon,lat,t_ms:int,unmask_val:float=-99):
+        # state at t_ms, warmed up over the full history
+        hours=cls.history_hours(features)
+        return cls(features,lon,lat,int(t_ms)-hours*HOUR_MS,unmask_val).catch_up(store,t_ms)
+
+if __name__=='__main__':
+    # python -m atlas.windows [root]: parity of the engine w/ LocalBackend._dynamic on the synthetic store, while the store holds less history than
+    # the longest window (warm-up), once every window is covered (steady state) and after an hour by hour catch_up; exits 1 past the tolerance
+    import os, sys
+    from .rasters import DAY_MS, STORE_NAME, LocalBackend, make_synthetic_store
+    root=sys.argv[1] if len(sys.argv)>1 else 'database/synthetic'
+    if not os.path.exists(os.path.join(root,STORE_NAME)):make_synthetic_store(root)
+    backend=LocalBackend.from_config(root);store=backend.store
+    g=store.layers['volumetric_soil_water_layer_1'];t0=g['t0_ms']
+    rng=np.random.default_rng(0)
+    lon=g['lon0']+rng.random(64)*g['res']*g['shape'][1];lat=g['lat0']+rng.random(64)*g['res']*g['shape'][0]
+    worst=0.0
+    for label,start,t in (('warm-up 12h',None,t0+12*HOUR_MS),('warm-up 60d',None,t0+60*DAY_MS),('steady 120d',None,t0+120*DAY_MS),('catch_up 100d->120d',t0+100*DAY_MS,t0+120*DAY_MS)):
+        eng=WindowEngine.from_store(store,backend.cfg,lon,lat,start or t,backend.unmask_val).catch_up(store,t)
+        ref=backend._dynamic(pd.DataFrame({'lon':lon,'lat':lat,'bucket_ts':np.full(len(lon),t)}),t)
+        err={c:float(np.max(np.abs(v-ref[c]))) for c,v in eng.features().items()}
+        col=max(err,key=err.get);worst=max(worst,err[col])
+        print(f'{label}: max abs diff {err[col]:.2e} ({col})')
+    sys.exit(0 if worst<1e-8 else 1)
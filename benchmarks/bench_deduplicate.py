@@ -0,0 +1,46 @@
+import argparse, sys, time
+import numpy as np, pandas as pd
+from featuretoolkit import src as ftk
+
+# deduplicate: day-key merge vs spatio-temporal index join on a synthetic catalog w/ a few monsoon-style busy days
+# run as a module from the repo root (like benchmarks.suite) so featuretoolkit is importable
+# python -m benchmarks.bench_deduplicate [--coolr N] [--gfld N] [--days N] [--busy-frac F]
+def synthetic_catalog(n:int,days:int,busy_frac:float,dur_max_ms:int,seed:int):
+    rng=np.random.default_rng(seed)
+    t0=int(pd.Timestamp('2015-01-01',tz='UTC').value//10**6)
+    day=rng.integers(0,days,n)
+    busy=rng.random(n)<busy_frac
+    day[busy]=rng.integers(0,max(days//365,1),int(busy.sum())) # ~one busy day per year of window, all piled up at the start
+    ts=t0+day*86_400_000+rng.integers(0,86_400_000,n)
+    # clustered around a handful of hotspots, like the real catalogs
+    hubs=rng.uniform([-40,-180],[60,180],(64,2))
+    h=rng.integers(0,len(hubs),n)
+    return pd.DataFrame({'latitude_center':np.clip(hubs[h,0]+rng.normal(0,1.5,n),-89,89),'longitude_center':(hubs[h,1]+rng.normal(0,1.5,n)+180)%360-180,
+                         'time_start':ts.astype(float),'time_end':(ts+rng.integers(0,dur_max_ms,n)).astype(float),
+                         'spatial_uncertainty':rng.choice([500.,1000.,5000.,10000.,25000.,50000.],n)})
+
+def timed(fn,*a,**kw):
+    t=time.perf_counter();out=fn(*a,**kw)
+    return out,time.perf_counter()-t
+
+def main(argv=None):
+    ap=argparse.ArgumentParser(description='benchmark featuretoolkit deduplicate (day merge vs index join)')
+    ap.add_argument('--coolr',type=int,default=50_000)
+    ap.add_argument('--gfld',type=int,default=10_000)
+    ap.add_argument('--days',type=int,default=3650)
+    ap.add_argument('--busy-frac',type=float,default=0.3)
+    ap.add_argument('--skip-merge',action='store_true',help='only time the index join (merge path is quadratic per day)')
+    args=ap.parse_args(argv)
+    coolr=synthetic_catalog(args.coolr,args.days,args.busy_frac,86_400_000,0)
+    gfld=synthetic_catalog(args.gfld,args.days,args.busy_frac,6*3_600_000,1)
+    print(f'coolr={len(coolr)} gfld={len(gfld)} days={args.days} busy_frac={args.busy_frac}')
+    fast,t_fast=timed(ftk.deduplicate,coolr,gfld)
+    print(f'index join: {t_fast:8.2f}s  matches={len(fast[2])}')
+    if not args.skip_merge:
+        ref,t_ref=timed(ftk.deduplicate,coolr,gfld,indexed=False)
+        print(f'day merge:  {t_ref:8.2f}s  matches={len(ref[2])}  speedup x{t_ref/t_fast:.1f}')
+        for a,b in zip(ref,fast):pd.testing.assert_frame_equal(a,b)
+        print('outputs identical')
+    return 0
+
+if __name__=='__main__':sys.exit(main())
@@ -0,0 +1,150 @@
+import argparse, gc, json, os, platform, shutil, sys, tempfile, time, tracemalloc
+import numpy as np, pandas as pd
+from featuretoolkit import src as ftk
+from atlas import AtlasEngine, threshold_curve, write_bundle, read_run, summarize, RunCatalog, DirWorkspace, BUNDLE_NAME
+from . import synthetic
+
+# offline benchmark suite: featuretoolkit catalog processing & normalization, the ATLAS scoring path and the viewer's run loading, on synthetic data
+# every benchmark is timed at each requested size (best of --repeat, w/ enough loops per repeat to reach --min-time), then run once more under
+# tracemalloc for the peak of python/numpy allocations; results are compared against a json baseline and any stage slower (or hungrier) than
+# baseline*(1+threshold) fails the run (exit code 1)
+# python -m benchmarks.suite [--sizes 1e3,1e4,1e5] [--only deduplicate,atlas.mu] [--record] [--baseline benchmarks/baseline.json] [--threshold 0.25]
+DEFAULT_BASELINE=os.path.join(os.path.dirname(os.path.abspath(__file__)),'baseline.json')
+DEFAULT_SIZES=(1_000,10_000,100_000)
+MEM_FLOOR=1<<20 # peak growth below 1MB is noise, never a regression
+_TMP=[] # scratch run folders, removed after each measurement
+
+def _engine(D:int=None):
+    # the shipped superfold when its weights are on disk, otherwise random weights of the same shape
+    try:return AtlasEngine.from_models_dir('database/models/')
+    except (OSError,ImportError):
+        rng=np.random.default_rng(0);D=D or 16
+        return AtlasEngine(rng.standard_normal((D,512)).astype(np.float32),rng.uniform(0,2*np.pi,512),rng.standard_normal(512)*0.1,-3.0,logit=(1.0,-2.0))
+
+def _runs_dir(n:int):
+    # a workspace of n/1000 runs (at least 2) w/ 1000 subsamples each, like a folder of saved notebook outputs
+    root=tempfile.mkdtemp(prefix='atlas_bench_runs_');_TMP.append(root)
+    for i in range(max(n//1000,2)):
+        os.makedirs(os.path.join(root,f'run_{i:05d}'))
+        write_bundle(os.path.join(root,f'run_{i:05d}',BUNDLE_NAME),synthetic.run_columns(1000,i),{'risk':0.1,'ts':float(synthetic.T0_MS)})
+    return root
+
+def _one_run(n:int):
+    root=tempfile.mkdtemp(prefix='atlas_bench_run_');_TMP.append(root)
+    write_bundle(os.path.join(root,BUNDLE_NAME),synthetic.run_columns(n),{'risk':0.1,'ts':float(synthetic.T0_MS)})
+    return root
+
+def _catalog_refresh(root:str):
+    # a cold catalog sync (fresh manifest each call)
+    db=os.path.join(root,'.bench.sqlite')
+    if os.path.exists(db):os.remove(db)
+    cat=RunCatalog(DirWorkspace(root),db)
+    cat.refresh();n=cat.count();cat.con.close()
+    return n
+
+# name -> (setup(n) -> args, fn(*args), largest n it is run at); setup is never timed
+BENCHES={
+    'process_coolr':(lambda n:(synthetic.raw_coolr(n),),ftk.process_coolr,10_000_000),
+    'process_gfld':(lambda n:(synthetic.raw_gfld(n),),ftk.process_gfld,10_000_000),
+    'deduplicate':(lambda n:synthetic.catalogs(n),ftk.deduplicate,10_000_000),
+    'set_regions':(lambda n:(synthetic.catalogs(n)[0],),ftk.set_regions,1_000_000),
+    'normalize':(lambda n:(synthetic.feature_frame(n,synthetic.spec_columns()[1]),[],['precip_hits_72h']),ftk.normalize,1_000_000),
+    'transform_spec':(lambda n:(synthetic.feature_frame(n,synthetic.spec_columns()[1]),synthetic.spec_columns()[0]),ftk.transform_spec,1_000_000),
+    'frozen_pipeline':(lambda n:(ftk.FrozenPipeline(synthetic.spec_columns()[0]),synthetic.feature_frame(n,synthetic.spec_columns()[1])),lambda p,dF:p.transform(dF),10_000_000),
+    'best_mu_threshold':(lambda n:synthetic.labels(n),threshold_curve,10_000_000),
+    'atlas.mu':(lambda n:(e:=_engine(),synthetic.pca_matrix(n,e.D)),lambda e,X:e.mu(X),10_000_000),
+    'atlas.risk_score':(lambda n:(e:=_engine(),synthetic.pca_matrix(n,e.D),np.arange(n)//128),lambda e,X,w:e.risk_score_batch(X,w,17**2*np.pi,3600),10_000_000),
+    'runs.read_run':(lambda n:(_one_run(n),),lambda root:summarize(read_run(root)),10_000_000),
+    'runs.catalog_refresh':(lambda n:(_runs_dir(n),),_catalog_refresh,1_000_000),
+}
+
+def measure(fn,args,repeat:int=3,min_time:float=0.1):
+    # best per-call seconds over repeats (each repeat loops until min_time so small sizes are not timer noise), then the tracemalloc peak of one call
+    t=time.perf_counter();fn(*args);first=time.perf_counter()-t # warm-up
+    loops=max(1,int(min_time/max(first,1e-9)))
+    best=first if loops==1 else float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        t=time.perf_counter()
+        for _ in range(loops):fn(*args)
+        best=min(best,(time.perf_counter()-t)/loops)
+    gc.collect()
+    started=tracemalloc.is_tracing()
+    if not started:tracemalloc.start()
+    tracemalloc.reset_peak();base=tracemalloc.get_traced_memory()[0]
+    fn(*args)
+    peak=tracemalloc.get_traced_memory()[1]-base
+    if not started:tracemalloc.stop()
+    return best,int(peak)
+
+def run(sizes=DEFAULT_SIZES,only=None,repeat:int=3,min_time:float=0.1,verbose:bool=True):
+    results={}
+    for name,(setup,fn,max_n) in BENCHES.items():
+        if only and name not in only:continue
+        for n in sizes:
+            if n>max_n:continue
+            args=setup(int(n))
+            sec,peak=measure(fn,args,repeat,min_time)
+            results[f'{name}/{int(n)}']={'seconds':sec,'rows_per_s':n/sec if sec>0 else float('inf'),'peak_bytes':peak}
+            if verbose:print(f'{name:22s} n={int(n):>10,d}  {sec*1e3:10.2f} ms  {n/sec:14,.0f} rows/s  peak {peak/2**20:9.1f} MB',flush=True)
+            del args
+            while _TMP:shutil.rmtree(_TMP.pop(),ignore_errors=True)
+    return results
+
+def environment():
+    return {'python':platform.python_version(),'numpy':np.__version__,'pandas':pd.__version__,'platform':platform.platform(),'cpus':os.cpu_count()}
+
+def load_baseline(path:str):
+    try:
+        with open(path,'r') as f:return json.load(f)
+    except FileNotFoundError:return None
+
+def save_baseline(path:str,results:dict):
+    # merges into an existing baseline so partial runs (--only/--sizes) only replace what they measured
+    old=load_baseline(path) or {}
+    data={'environment':environment(),'results':{**old.get('results',{}),**results}}
+    with open(path,'w') as f:json.dump(data,f,indent=1,sort_keys=True)
+
+def compare(results:dict,baseline:dict,threshold:float=0.25,mem_threshold:float=0.25):
+    # (key, metric, base, new, ratio) for every measured stage over its threshold
+    regressions=[]
+    for key,r in results.items():
+        b=baseline.get('results',{}).get(key)
+        if b is None:continue
+        if r['seconds']>b['seconds']*(1+threshold):regressions.append((key,'seconds',b['seconds'],r['seconds'],r['seconds']/b['seconds']))
+        if r['peak_bytes']-b['peak_bytes']>MEM_FLOOR and r['peak_bytes']>b['peak_bytes']*(1+mem_threshold):
+            regressions.append((key,'peak_bytes',b['peak_bytes'],r['peak_bytes'],r['peak_bytes']/max(b['peak_bytes'],1)))
+    return regressions
+
+def main(argv=None):
+    ap=argparse.ArgumentParser(description='offline benchmark suite for featuretoolkit, ATLAS scoring & the viewer run loading')
+    ap.add_argument('--sizes',default=','.join(str(s) for s in DEFAULT_SIZES),help='comma separated row counts, eg. 1e3,1e5,1e7')
+    ap.add_argument('--only',default=None,help=f'comma separated subset of: {",".join(BENCHES)}')
+    ap.add_argument('--repeat',type=int,default=3)
+    ap.add_argument('--min-time',type=float,default=0.1,help='seconds each repeat loops for (small sizes)')
+    ap.add_argument('--baseline',default=DEFAULT_BASELINE)
+    ap.add_argument('--record',action='store_true',help='write the results into the baseline instead of comparing')
+    ap.add_argument('--threshold',type=float,default=0.25,help='allowed slowdown vs baseline (0.25 = 25%%)')
+    ap.add_argument('--mem-threshold',type=float,default=0.25,help='allowed peak memory growth vs baseline')
+    ap.add_argument('--out',default=None,help='also write this run as json')
+    args=ap.parse_args(argv)
+    sizes=[int(float(s)) for s in args.sizes.split(',') if s.strip()]
+    only=set(args.only.split(',')) if args.only else None
+    if only and only-set(BENCHES):ap.error(f'unknown benchmarks: {",".join(sorted(only-set(BENCHES)))}')
+    results=run(sizes,only,args.repeat,args.min_time)
+    if args.out:
+        with open(args.out,'w') as f:json.dump({'environment':environment(),'results':results},f,indent=1,sort_keys=True)
+    if args.record:
+        save_baseline(args.baseline,results)
+        print(f'baseline written to {args.baseline}')
+        return 0
+    baseline=load_baseline(args.baseline)
+    if baseline is None:
+        print(f'no baseline at {args.baseline}, run with --record first')
+        return 0
+    regressions=compare(results,baseline,args.threshold,args.mem_threshold)
+    for key,metric,b,r,ratio in regressions:print(f'REGRESSION {key} {metric}: {b:.4g} -> {r:.4g} (x{ratio:.2f})')
+    print(f'{len(results)} measurements, {len(regressions)} regressions (threshold {args.threshold:.0%} time, {args.mem_threshold:.0%} memory)')
+    return 1 if regressions else 0
+
+if __name__=='__main__':sys.exit(main())
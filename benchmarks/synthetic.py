@@ -0,0 +1,84 @@
+import json
+import numpy as np, pandas as pd
+from featuretoolkit.src.coolr import COOLR_TRIGGERS
+from featuretoolkit.src.gfld import GFLD_TRIGGERS
+
+# synthetic inputs for the benchmark suite (benchmarks/suite.py), all seeded & offline
+# raw catalogs look like the coolr/gfld exports process_coolr/process_gfld read, feature frames carry the spec.json columns w/ roughly the real
+# value ranges (heavy tailed precip/runoff, bounded soil moisture, trig encodings, categorical land class), pca matrices are plain gaussians
+T0_MS=int(pd.Timestamp('2015-01-01',tz='UTC').value//10**6)
+COOLR_ACCURACY=['exact','Known within 1 km','1km','5km','10km','25km','50km','100km','250km','unknown']
+ESA_CLASSES=(10,20,30,40,50,60,80,90)
+
+def _hubs(rng,n:int):
+    # lat/lon clustered around a handful of hotspots, like the real catalogs
+    hubs=rng.uniform([-40,-180],[60,180],(64,2))
+    h=rng.integers(0,len(hubs),n)
+    return np.clip(hubs[h,0]+rng.normal(0,1.5,n),-89,89),(hubs[h,1]+rng.normal(0,1.5,n)+180)%360-180
+
+def raw_coolr(n:int,seed:int=0):
+    # coolr export: m/d/Y dates, 12h times (some unknown), accuracy strings, mixed triggers, ~2% duplicated source links
+    rng=np.random.default_rng(seed)
+    lat,lon=_hubs(rng,n)
+    day=pd.to_datetime(T0_MS+rng.integers(0,3650,n)*86_400_000,unit='ms',utc=True)
+    hour=rng.integers(1,13,n);minute=rng.integers(0,60,n)
+    times=pd.Series([f'{h}:{m:02d} {ap}' for h,m,ap in zip(hour,minute,rng.choice(['AM','PM'],n))])
+    times[rng.random(n)<0.3]='unknown'
+    link=rng.integers(0,int(n*0.98)+1,n)
+    triggers=np.array(COOLR_TRIGGERS+['earthquake','snowmelt','construction','unknown'],dtype=object)
+    return pd.DataFrame({'event_date':day.strftime('%m/%d/%Y %H:%M:%S'),'event_time':times,'longitude':lon,'latitude':lat,
+                         'location_accuracy':rng.choice(COOLR_ACCURACY,n,p=[.05,.05,.2,.2,.15,.15,.1,.05,.03,.02]),
+                         'landslide_trigger':triggers[rng.integers(0,len(triggers),n)],'source_link':[f'https://news.example/{i}' for i in link]})
+
+def raw_gfld(n:int,seed:int=1):
+    # gfld export: iso dates, precision as an area (m²), mostly rainfall triggered
+    rng=np.random.default_rng(seed)
+    lat,lon=_hubs(rng,n)
+    day=pd.to_datetime(T0_MS+rng.integers(0,3650,n)*86_400_000,unit='ms',utc=True)
+    return pd.DataFrame({'Date':day.strftime('%Y-%m-%d'),'Longitude':lon,'Latitude':lat,'Precision':np.pi*rng.choice([500.,1000.,5000.,10000.,25000.],n)**2,
+                         'Trigger':rng.choice(GFLD_TRIGGERS+['earthquake','other'],n,p=[.85,.1,.05]),'Source 1':[f'https://gfld.example/{i}' for i in rng.integers(0,int(n*0.98)+1,n)]})
+
+def catalogs(n:int,seed:int=0):
+    # standardized (coolr, gfld) pair for deduplicate: gfld is a fifth of coolr, a few busy days pile up events
+    from .bench_deduplicate import synthetic_catalog
+    return synthetic_catalog(n,3650,0.3,86_400_000,seed),synthetic_catalog(max(n//5,1),3650,0.3,6*3_600_000,seed+1)
+
+def spec_columns(spec_path:str='database/records/spec.json'):
+    with open(spec_path,'r') as f:spec=json.load(f)
+    return spec,[c for c,cfg in spec['columns'].items() if not cfg.get('meta',False)]
+
+def feature_frame(n:int,columns,seed:int=0):
+    # raw (pre normalization) feature frame w/ the given spec.json columns
+    rng=np.random.default_rng(seed)
+    out={}
+    for c in columns:
+        if c.endswith(('_sin','_cos')):v=rng.uniform(-1,1,n)
+        elif c=='land_class':v=rng.choice(ESA_CLASSES,n).astype(np.float64)
+        elif c=='snow_flag':v=(rng.random(n)<0.02).astype(np.float64)
+        elif c.startswith('precip_hits'):v=rng.poisson(0.1,n).astype(np.float64)
+        elif c.startswith(('precip_mm','surface_runoff','subsurface_runoff')):v=rng.gamma(0.3,5,n)*(rng.random(n)<0.6)
+        elif c.startswith('soil_moist_') and c.endswith('_mean'):v=rng.uniform(0.05,0.5,n)
+        elif c.startswith(('soil_moist_anom','soil_moist_trend','ndvi_anom')):v=rng.standard_t(4,n)
+        elif c.startswith(('pev_sum','moisture_deficit')):v=-rng.gamma(2,0.01,n)
+        elif c.startswith(('sand_content','clay_content')):v=np.round(rng.normal(35,5,n))
+        elif c.startswith('vwc_'):v=rng.normal(0.3,0.02,n)
+        elif c=='slope_deg':v=rng.gamma(2,6,n)
+        elif c=='twi':v=rng.normal(8,2,n)
+        else:v=rng.normal(0,1,n)
+        out[c]=v
+    return pd.DataFrame(out)
+
+def pca_matrix(n:int,D:int,seed:int=0):return np.random.default_rng(seed).standard_normal((n,D)).astype(np.float32)
+
+def labels(n:int,seed:int=0):
+    # (mu, y, w) like a validation set: ~5% positives w/ higher μ, weighted backgrounds
+    rng=np.random.default_rng(seed)
+    y=(rng.random(n)<0.05).astype(np.int64)
+    mu=(rng.normal(-3,1.5,n)+2*y).astype(np.float32)
+    return mu,y,np.where(y==1,1.0,rng.gamma(2,0.5,n))
+
+def run_columns(n:int,seed:int=0):
+    # per subsample columns of one saved run (the shape phi + the notebook writer produce)
+    rng=np.random.default_rng(seed)
+    lat,lon=_hubs(rng,n)
+    return {'lon':lon,'lat':lat,'ts':np.full(n,float(T0_MS)),'bucket':rng.integers(0,24,n).astype(np.int16),'mu':rng.normal(-3,1,n)}
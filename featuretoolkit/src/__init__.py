@@ -27,14 +27,23 @@ from .common import (
     concatenate,
 )
 
+# chunked / incremental catalog ingestion
+from .ingest import (
+    ingest,
+    CatalogStore,
+)
+
 # transformation utilities
 from .transform import (
     normalize,
+    normalize_stream,
+    QuantileSketch,
     transform_spec,
     inverse_transform_spec,
     save_spec,
     load_spec,
     transform_full,
+    FrozenPipeline,
 )
 
 __all__ = [
@@ -58,11 +67,17 @@ __all__ = [
     "set_regions",
     "add_index",
     "concatenate",
+    # ingest
+    "ingest",
+    "CatalogStore",
     # transform
     "normalize",
+    "normalize_stream",
+    "QuantileSketch",
     "transform_spec",
     "inverse_transform_spec",
     "save_spec",
     "load_spec",
     "transform_full",
+    "FrozenPipeline",
 ]
\ No newline at end of file
@@ -1,8 +1,10 @@
 import numpy as np, pandas as pd, h3
 
+EARTH_RADIUS_M=6371008.8 # average earth radius in meters
+
 # calculate haversine distance in meters using latitudes & longitudes
 def haversine_dist(lat1:float,lon1:float,lat2:float,lon2:float):
-    R=6371008.8 # average earth radius in meters
+    R=EARTH_RADIUS_M
     lat1=np.radians(lat1)
     lon1=np.radians(lon1)
     lat2=np.radians(lat2)
@@ -12,7 +14,64 @@ def haversine_dist(lat1:float,lon1:float,lat2:float,lon2:float):
     a=np.sin(dlat/2.0)**2+np.cos(lat1)*np.cos(lat2)*np.sin(dlon/2.0)**2
     return 2*R*np.arcsin(np.sqrt(a))
 
-def deduplicate(coolr:pd.DataFrame,gfld:pd.DataFrame):
+# candidate pairs via an equality merge on calendar day (reference path; quadratic in the reports per day)
+def _merge_candidates(cool:pd.DataFrame,gfl:pd.DataFrame):
+    # coolr may have windows up to 1 day; include both start-day and end-day if different
+    cool_keys=pd.concat([cool.assign(date=cool["day_start"]),cool.loc[cool["day_end"].ne(cool["day_start"])].assign(date=cool["day_end"]),],ignore_index=True)
+    cand=cool_keys.merge(gfl,on="date",suffixes=("_coolr","_gfld"),how="inner")
+    return cand.drop_duplicates(subset=["coolr_id","gfld_id"])
+
+# unit-sphere xyz, so great-circle radii become euclidean (chord) radii
+def _unit_xyz(lat,lon):
+    lat=np.radians(np.asarray(lat,dtype=float));lon=np.radians(np.asarray(lon,dtype=float))
+    return np.column_stack([np.cos(lat)*np.cos(lon),np.cos(lat)*np.sin(lon),np.sin(lat)])
+
+def _chord(d_m):
+    # great-circle meters -> chord on the unit sphere, padded a hair so the exact haversine filter decides borderline pairs
+    ang=np.clip(np.asarray(d_m,dtype=float)/EARTH_RADIUS_M,0,np.pi)
+    return 2*np.sin(ang/2)*(1+1e-9)+1e-12
+
+# candidate pairs via a k-d tree over (unit-sphere xyz, day key): only pairs on the same day within rad_coolr+rad_gfld are generated
+# the day code sits in a 4th coordinate spaced DAY_SEP apart (> any chord radius), so different days never meet;
+# both sides are split into radius tiers (powers of 8) so each tier pair's join radius max(rad_coolr)+max(rad_gfld) stays within 8x of the pairs' own
+# pairs come out in the merge's row order (coolr day-key copy, coolr row, gfld row), so the downstream sort/first() picks the same matches
+DAY_SEP=4.0
+def _indexed_candidates(cool:pd.DataFrame,gfl:pd.DataFrame):
+    from scipy.spatial import cKDTree
+    days,_=pd.factorize(pd.concat([cool["day_start"],cool["day_end"],gfl["date"]],ignore_index=True)) # NaT -> -1
+    nc=len(cool)
+    d_start,d_end,d_g=days[:nc],days[nc:2*nc],days[2*nc:]
+    rad_c=cool["_rad_m"].to_numpy(float);rad_g=gfl["_rad_m"].to_numpy(float)
+    ok_c=np.isfinite(rad_c)&np.isfinite(cool["latitude_center"].to_numpy(float))&np.isfinite(cool["longitude_center"].to_numpy(float))&cool["time_start"].notna().to_numpy()&cool["time_end"].notna().to_numpy()
+    ok_g=np.isfinite(rad_g)&np.isfinite(gfl["latitude_center"].to_numpy(float))&np.isfinite(gfl["longitude_center"].to_numpy(float))&gfl["time_start"].notna().to_numpy()&gfl["time_end"].notna().to_numpy()&(d_g>=0)
+    # query points: one per (coolr row, day key), start-day copies first like cool_keys
+    s0=np.flatnonzero(ok_c&(d_start>=0));s1=np.flatnonzero(ok_c&(d_end>=0)&(d_end!=d_start))
+    q_row=np.concatenate([s0,s1]);q_copy=np.repeat([0,1],[len(s0),len(s1)])
+    q_day=np.where(q_copy==0,d_start[q_row],d_end[q_row])
+    xyz_c=_unit_xyz(cool["latitude_center"].to_numpy(float),cool["longitude_center"].to_numpy(float))
+    xyz_g=_unit_xyz(gfl["latitude_center"].to_numpy(float),gfl["longitude_center"].to_numpy(float))
+    g_rows=np.flatnonzero(ok_g)
+    # each (coolr tier, gfld tier) is one dual-tree join at a single radius
+    def tiers(rows,rad,xyz,day):
+        t=np.frexp(np.maximum(rad,0))[1]//3
+        return [(rows[t==k],rad[t==k].max(),cKDTree(np.column_stack([xyz[t==k],DAY_SEP*day[t==k]]),balanced_tree=False,compact_nodes=False)) for k in np.unique(t)]
+    tc=tiers(np.arange(len(q_row)),rad_c[q_row],xyz_c[q_row],q_day)
+    tg=tiers(g_rows,rad_g[g_rows],xyz_g[g_rows],d_g[g_rows])
+    qi,gi=[],[]
+    for rows_c,max_c,tree_c in tc:
+        for rows_g,max_g,tree_g in tg:
+            hits=tree_c.sparse_distance_matrix(tree_g,float(_chord(max_c+max_g)),output_type='ndarray')
+            qi.append(rows_c[hits['i']]);gi.append(rows_g[hits['j']])
+    qi=np.concatenate(qi) if qi else np.empty(0,dtype=np.int64);gi=np.concatenate(gi) if gi else np.empty(0,dtype=np.int64)
+    order=np.lexsort((gi,q_row[qi],q_copy[qi]))
+    qi,gi=qi[order],gi[order]
+    c=cool.iloc[q_row[qi]].drop(columns=["day_start","day_end"]).reset_index(drop=True)
+    g=gfl.iloc[gi].reset_index(drop=True)
+    shared=set(c.columns)&set(g.columns)
+    cand=pd.concat([c.rename(columns={k:f"{k}_coolr" for k in shared}),g.rename(columns={k:f"{k}_gfld" for k in shared})],axis=1)
+    return cand.drop_duplicates(subset=["coolr_id","gfld_id"])
+
+def deduplicate(coolr:pd.DataFrame,gfld:pd.DataFrame,indexed:bool=True):
     # keep originals & create index columns
     cool=coolr.copy().reset_index().rename(columns={"index":"coolr_id"})
     gfl=gfld.copy().reset_index().rename(columns={"index":"gfld_id"})
@@ -29,15 +88,12 @@ def deduplicate(coolr:pd.DataFrame,gfld:pd.DataFrame):
     # gfld still uses its start day as the key
     gfl["date"]=gfl["time_start"].dt.normalize()
 
-    # coolr may have windows up to 1 day; include both start-day and end-day if different
+    # coolr may have windows up to 1 day; both start-day and end-day are keys
     cool["day_start"]=cool["time_start"].dt.normalize()
     cool["day_end"]=cool["time_end"].dt.normalize()
-    cool_keys=pd.concat([cool.assign(date=cool["day_start"]),cool.loc[cool["day_end"].ne(cool["day_start"])].assign(date=cool["day_end"]),],ignore_index=True)
-
-    # check candidate pairs where gfld and coolr got temporal overlap, drop duplicates
-    cand=cool_keys.merge(gfl,on="date",suffixes=("_coolr","_gfld"),how="inner")
-    cand=cand.drop_duplicates(subset=["coolr_id","gfld_id"])
 
+    # candidate pairs w/ a shared day key: spatio-temporal index join (default) or the plain day merge
+    cand=_indexed_candidates(cool,gfl) if indexed else _merge_candidates(cool,gfl)
     # check for true interval overlap (all elements in the intersection of coolr start & end, gfld start & end)
     cand=cand[(cand["time_start_coolr"]<=cand["time_end_gfld"])&(cand["time_start_gfld"]<=cand["time_end_coolr"])].copy()
     if cand.empty:return coolr.copy(),gfld.copy(),pd.DataFrame(columns=["coolr_id","gfld_id","date","distance_m","coolr_rad_m","gfld_rad_m","time_start_coolr","time_end_coolr","time_start_gfld","time_end_gfld"])
@@ -57,6 +113,7 @@ def deduplicate(coolr:pd.DataFrame,gfld:pd.DataFrame):
     mask_smaller=best["_rad_m_gfld"]<best["_rad_m_coolr"]
     if mask_smaller.any():
         new_vals=(best.loc[mask_smaller,["coolr_id","spatial_uncertainty_gfld"]].set_index("coolr_id")["spatial_uncertainty_gfld"])
+        cool_updated["spatial_uncertainty"]=cool_updated["spatial_uncertainty"].astype(float) # integer radii (coolr_loc_map) take the fractional gfld ones
         cool_updated.loc[new_vals.index,"spatial_uncertainty"]=new_vals.values
 
     # drop duplicate gfld rows
@@ -67,38 +124,46 @@ def deduplicate(coolr:pd.DataFrame,gfld:pd.DataFrame):
 
     return cool_updated,gfld_deduped,matches
 
-def set_regions(dataframe:pd.DataFrame,res_region:int=2,res_fold:int=1,min_events_per_region:int=13,max_neighbor_k:int=3):
+# h3 cells for a batch of coordinates (module level so it can run in a process pool)
+def _latlng_cells(lat,lon,res:int):return [h3.latlng_to_cell(float(y),float(x),res) for y,x in zip(lat,lon)]
+
+def set_regions(dataframe:pd.DataFrame,res_region:int=2,res_fold:int=1,min_events_per_region:int=13,max_neighbor_k:int=3,n_jobs:int=1,chunk_size:int=100_000):
     # set regions & folds for CV blocking (not to be fed into the model!!!)
     dF=dataframe.copy()
-    fold_regions={}
-    mapping={}
-
-    # assign region_id (finer) and fold_id (coarser)
-    dF["region_id"]=[h3.latlng_to_cell(float(lat),float(lon),res_region)for lat,lon in zip(dF["latitude_center"],dF["longitude_center"])]
-    dF["fold_id"]=[h3.cell_to_parent(c,res_fold) for c in dF["region_id"]]
-
-    # get counts per (fold, region)
-    grp=dF.groupby(["fold_id","region_id"]).size().rename("cnt").reset_index()
-    counts={(r.fold_id,r.region_id): int(r.cnt) for r in grp.itertuples(index=False)}
-    for r in grp.itertuples(index=False):fold_regions.setdefault(r.fold_id,set()).add(r.region_id)
 
-    # find small regions and build replacement mapping
-    small=[(r.fold_id,r.region_id) for r in grp.itertuples(index=False) if r.cnt<min_events_per_region]
-
-    for fold,region in small:
+    # assign region_id (finer) and fold_id (coarser), h3 is only called once per unique coordinate / region
+    lat,lon=dF["latitude_center"].to_numpy(float),dF["longitude_center"].to_numpy(float)
+    inv,uxy=pd.factorize(lat+1j*lon) # hash (lat,lon) pairs as one complex key
+    uxy=np.column_stack([uxy.real,uxy.imag])
+    if n_jobs>1 and len(uxy)>chunk_size: # optional process pool over coordinate chunks
+        from concurrent.futures import ProcessPoolExecutor
+        parts=range(0,len(uxy),chunk_size)
+        with ProcessPoolExecutor(n_jobs) as ex:cells=[c for part in ex.map(_latlng_cells,[uxy[s:s+chunk_size,0] for s in parts],[uxy[s:s+chunk_size,1] for s in parts],[res_region]*len(parts)) for c in part]
+    else:cells=_latlng_cells(uxy[:,0],uxy[:,1],res_region)
+    rinv,regions=pd.factorize(np.array(cells,dtype=object))
+    regions=np.asarray(regions,dtype=object)
+    rcode=rinv[inv] # row -> unique region
+    folds=np.array([h3.cell_to_parent(c,res_fold) for c in regions],dtype=object)
+    dF["region_id"]=regions[rcode].tolist()
+    dF["fold_id"]=folds[rcode].tolist()
+
+    # counts per region (a region sits in exactly one fold, its parent)
+    counts=dict(zip(regions.tolist(),np.bincount(rcode,minlength=len(regions)).tolist()))
+    parent=dict(zip(regions.tolist(),folds.tolist()))
+
+    # small regions join the first big-enough region of the same fold in their grid_disk(max_neighbor_k), if ring 1 already has one
+    # (that is where the ring-by-ring search always ends up), otherwise a per-fold OTHER bucket
+    mapping={}
+    for region,cnt in counts.items():
+        if cnt>=min_events_per_region:continue
+        fold=parent[region]
+        ok=lambda nb:nb!=region and parent.get(nb)==fold and counts[nb]>=min_events_per_region
         replacement=None
-        # search outward in H3 rings & join to meet minimum events per region
-        for k in range(1,max_neighbor_k+1):
-            for nb in h3.grid_disk(region,k):
-                if nb==region or nb not in fold_regions.get(fold,()): continue
-                if counts.get((fold,nb),0)>=min_events_per_region:
-                    replacement=nb
-                    break
-            if replacement==None:break
-        if replacement==None:replacement=f"{fold}-OTHER"
-        mapping[(fold,region)]=replacement
-
-    if mapping:dF["region_id"]=dF.apply(lambda r:mapping.get((r["fold_id"],r["region_id"]),r["region_id"]),axis=1)
+        if max_neighbor_k>=1 and any(ok(nb) for nb in h3.grid_disk(region,1)):replacement=next(nb for nb in h3.grid_disk(region,max_neighbor_k) if ok(nb))
+        mapping[region]=replacement if replacement is not None else f"{fold}-OTHER"
+
+    # remap through the unique regions instead of row by row
+    if mapping:dF["region_id"]=np.array([mapping.get(r,r) for r in regions.tolist()],dtype=object)[rcode]
     return dF
 
 def add_index(dataframe:pd.DataFrame):
@@ -1,19 +1,22 @@
-import numpy as np, pandas as pd, datetime as dt
+import numpy as np, pandas as pd
 
-def coolr_filter(dataframe:pd.DataFrame):
+COOLR_TRIGGERS=['Downpour','Heavy Rain','Heavy Rainfall','Rain','Rainfall','continuous_rain','rain','downpour']
+UNKNOWN_VALUES=[' ','','unknown','Unknown']
+
+def _coolr_valid(dF:pd.DataFrame):
     # set all empty or unknown values for date, lon, lat, and location accuracy to nan values for removal (time uncertainty is acceptable)
-    dF=dataframe.copy()
-    dF['event_date']=dF['event_date'].replace(' ',np.nan).replace('',np.nan).replace('unknown',np.nan).replace('Unknown',np.nan)
-    dF['longitude']=[float(val) for val in dF['longitude'].replace(' ',np.nan).replace('',np.nan).replace('unknown',np.nan).replace('Unknown',np.nan)]
-    dF['latitude']=[float(val) for val in dF['latitude'].replace(' ',np.nan).replace('',np.nan).replace('unknown',np.nan).replace('Unknown',np.nan)]
-    dF['location_accuracy']=dF['location_accuracy'].replace(' ',np.nan).replace('',np.nan).replace('unknown',np.nan).replace('Unknown',np.nan)
+    for col in ('event_date','longitude','latitude','location_accuracy'):dF[col]=dF[col].replace(UNKNOWN_VALUES,np.nan)
+    dF['longitude']=dF['longitude'].astype(float)
+    dF['latitude']=dF['latitude'].astype(float)
 
     # remove all nan values from all relevant subsets
-    [dF.dropna(how='any',subset=subset,inplace=True) for subset in ['event_date','longitude','latitude','location_accuracy']]
-    dF=dF.drop_duplicates(subset='source_link')
+    return dF.dropna(how='any',subset=['event_date','longitude','latitude','location_accuracy'])
+
+def coolr_filter(dataframe:pd.DataFrame):
+    dF=_coolr_valid(dataframe.copy()).drop_duplicates(subset='source_link')
     
     # return only meteorologically related landslides
-    return dF[dF['landslide_trigger'].isin(['Downpour','Heavy Rain','Heavy Rainfall','Rain','Rainfall','continuous_rain','rain','downpour'])].reset_index(drop=True)
+    return dF[dF['landslide_trigger'].isin(COOLR_TRIGGERS)].reset_index(drop=True)
 
 def coolr_clean(dataframe:pd.DataFrame):
     # remove all columns that arent those shown below
@@ -39,15 +42,15 @@ def coolr_loc_map(dataframe:pd.DataFrame):
 def coolr_time_column(dataframe:pd.DataFrame):
     dF=dataframe.copy()
     mask_unknown=~dF['event_time'].astype(str).str.contains(r'^\s*\d{1,2}:\d{2}\s*[APap]M\s*$',na=False) # masking to flag non-time strings (ie. unknown/nan)
-    dF.loc[mask_unknown,'event_time']='12:00 AM' # set it to a default of 12:00AM (safe, wont interfere)
-    dates=[datestring.split(' ')[0] for datestring in dF['event_date']]
-    dF['event_time']=dF['event_time'].str.replace(r'^(\d):',r'0\1:',regex=True)
-    times=[
-    f"{(int(t.split()[0].split(':')[0])%12+(12 if 'PM' in t.upper() else 0)):02d}"
-    f":{t.split()[0].split(':')[1].zfill(2)}"
-    for t in dF['event_time']]
-
-    dF.insert(0,'time_start',[1000*dt.datetime.combine(dt.datetime.strptime(date.split(' ')[0],'%m/%d/%Y'),dt.time.fromisoformat(time)).replace(tzinfo=dt.timezone.utc).timestamp() for date,time in zip(dates,times)])
+    times=dF['event_time'].astype(str).where(~mask_unknown,'12:00 AM') # set it to a default of 12:00AM (safe, wont interfere)
+
+    # vectorized 12h -> 24h clock & m/d/Y date parsing (utc)
+    hm=times.str.extract(r'^\s*(\d{1,2}):(\d{2})').astype('int64')
+    hours=hm[0]%12+np.where(times.str.upper().str.contains('PM'),12,0)
+    dates=pd.to_datetime(dF['event_date'].astype(str).str.split(' ').str[0],format='%m/%d/%Y',utc=True)
+    stamps=dates+pd.to_timedelta(hours*60+hm[1],unit='min')
+
+    dF.insert(0,'time_start',((stamps-pd.Timestamp(0,tz='UTC'))//pd.Timedelta(milliseconds=1)).astype(float))
     dF.insert(1,'time_end',dF['time_start']+mask_unknown.astype('int64')*(24*60*60*1000)) # time_start=time_end because exact times are specified. for gfld (and some coolr points w/ unknown time), the timedelta between start and end would be a day since only date is specified, not time
     dF.drop(['event_time','event_date'],axis=1,inplace=True)
     
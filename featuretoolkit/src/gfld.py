@@ -1,19 +1,21 @@
 import numpy as np, pandas as pd, math
 
-def gfld_filter(dataframe:pd.DataFrame):
+GFLD_TRIGGERS=['rainfall']
+UNKNOWN_VALUES=[' ','','unknown','Unknown']
+
+def _gfld_valid(dF:pd.DataFrame):
     # set all empty or unknown values for date, lon, lat, and precision to nan values for removal
-    dF=dataframe.copy()
-    dF['Date']=dF['Date'].replace(' ',np.nan).replace('',np.nan).replace('unknown',np.nan).replace('Unknown',np.nan)
-    dF['Longitude']=[float(val) for val in dF['Longitude'].replace(' ',np.nan).replace('',np.nan).replace('unknown',np.nan).replace('Unknown',np.nan)]
-    dF['Latitude']=[float(val) for val in dF['Latitude'].replace(' ',np.nan).replace('',np.nan).replace('unknown',np.nan).replace('Unknown',np.nan)]
-    dF['Precision']=[float(val) for val in dF['Precision'].replace(' ',np.nan).replace('',np.nan).replace('unknown',np.nan).replace('Unknown',np.nan)]
+    for col in ('Date','Longitude','Latitude','Precision'):dF[col]=dF[col].replace(UNKNOWN_VALUES,np.nan)
+    for col in ('Longitude','Latitude','Precision'):dF[col]=dF[col].astype(float)
 
     # remove all nan values from all relevant subsets
-    [dF.dropna(how='any',subset=subset,inplace=True) for subset in ['Date','Longitude','Latitude','Precision']]
-    dF=dF.drop_duplicates(subset='Source 1')
+    return dF.dropna(how='any',subset=['Date','Longitude','Latitude','Precision'])
+
+def gfld_filter(dataframe:pd.DataFrame):
+    dF=_gfld_valid(dataframe.copy()).drop_duplicates(subset='Source 1')
     
     # make sure filtered landslides are rain-triggered, return
-    return dF[dF['Trigger'].isin(['rainfall'])].reset_index(drop=True)
+    return dF[dF['Trigger'].isin(GFLD_TRIGGERS)].reset_index(drop=True)
 
 def gfld_clean(dataframe:pd.DataFrame):
     # cleans dataset, dropping all non-relevant columns
@@ -29,7 +31,7 @@ def gfld_precision_to_radius(dataframe:pd.DataFrame):
 def gfld_time_column(dataframe:pd.DataFrame):
     # add time start & end columns, standardize to utc
     dF=dataframe.copy()
-    dF.insert(0,'time_start',[1000*date.tz_localize('UTC').timestamp() for date in dF['Date']])
+    dF.insert(0,'time_start',(pd.to_datetime(dF['Date']).dt.tz_localize('UTC')-pd.Timestamp(0,tz='UTC'))/pd.Timedelta(milliseconds=1))
     dF.insert(1,'time_end',dF['time_start']+(24*60*60*1000)) # time_start=time_end+(1 day) (in ms)
     dF.drop(['Date'],axis=1,inplace=True)
     return dF
@@ -0,0 +1,174 @@
+import os, json
+import numpy as np, pandas as pd
+from .coolr import _coolr_valid, COOLR_TRIGGERS, coolr_clean, coolr_loc_map, coolr_time_column, coolr_rename
+from .gfld import _gfld_valid, GFLD_TRIGGERS, gfld_clean, gfld_precision_to_radius, gfld_time_column, gfld_rename
+from .common import deduplicate
+
+# chunked & incremental catalog ingestion
+# ingest() reads a raw catalog chunk by chunk and returns the same standardized frame as process_coolr/process_gfld (source-link dedupe spans chunks)
+# CatalogStore keeps the standardized records of both catalogs on disk w/ a per-source watermark (latest time_start ingested); a refresh only parses
+# the raw date column of older rows to drop them, standardizes what can be newer than the watermark and re-runs deduplicate on the window it can touch,
+# so history is never reprocessed (records that show up later w/ a time_start at or below the watermark are skipped, that is what the watermark is for)
+# source links seen so far are kept as 64-bit hashes, so the first-occurrence dedupe also holds when a refresh is fed only the new rows
+# (first in ingestion order: a link already stored wins over a copy further up the file, which a one-shot process_* would keep instead)
+# a refresh writes new files (records are appended, but state.json records how many rows are committed) and switches over by replacing state.json last,
+# so a crash midway leaves the previous state intact
+DEFAULT_INGEST_CHUNK=100_000
+DAY_MS=24*60*60*1000
+MATCH_COLUMNS=["coolr_id","gfld_id","date","distance_m","coolr_rad_m","gfld_rad_m","time_start_coolr","time_end_coolr","time_start_gfld","time_end_gfld"]
+
+# per source: validity filter, dedupe key, trigger filter, standardization (everything in process_* after the filter)
+SOURCES={
+    'coolr':(_coolr_valid,'source_link','landslide_trigger',COOLR_TRIGGERS,lambda dF:coolr_rename(coolr_time_column(coolr_loc_map(coolr_clean(dF))))),
+    'gfld':(_gfld_valid,'Source 1','Trigger',GFLD_TRIGGERS,lambda dF:gfld_rename(gfld_time_column(gfld_precision_to_radius(gfld_clean(dF))))),
+}
+
+def _coolr_upper_ms(dF:pd.DataFrame):
+    # latest possible time_start of each raw row (event day + 1 day, the time of day is below that); nan if the date doesnt parse
+    day=pd.to_datetime(dF['event_date'].astype(str).str.split(' ').str[0],format='%m/%d/%Y',utc=True,errors='coerce')
+    return (day-pd.Timestamp(0,tz='UTC'))/pd.Timedelta(milliseconds=1)+DAY_MS
+
+def _gfld_upper_ms(dF:pd.DataFrame):
+    day=pd.to_datetime(dF['Date'],errors='coerce')
+    day=day.dt.tz_localize('UTC') if day.dt.tz is None else day.dt.tz_convert('UTC')
+    return (day-pd.Timestamp(0,tz='UTC'))/pd.Timedelta(milliseconds=1)
+
+UPPER_MS={'coolr':_coolr_upper_ms,'gfld':_gfld_upper_ms}
+
+def link_hashes(links:pd.Series):
+    # stable uint64 hash per source link (nan links all hash alike, they count as one link)
+    return pd.util.hash_pandas_object(links.astype(object).where(links.notna(),'\x00nan').astype(str),index=False).to_numpy(np.uint64)
+
+def _raw_chunks(src,chunksize:int):
+    # raw catalog as row chunks: dataframe, csv (streamed) or excel (read whole, gfld ships as xlsx)
+    if isinstance(src,pd.DataFrame):
+        for s in range(0,len(src),chunksize):yield src.iloc[s:s+chunksize].copy()
+    elif str(src).lower().endswith(('.xlsx','.xls')):yield pd.read_excel(src)
+    else:yield from pd.read_csv(src,chunksize=chunksize)
+
+def ingest(src,source:str,watermark:float=None,chunksize:int=DEFAULT_INGEST_CHUNK,seen:set=None):
+    # standardized records of a raw coolr/gfld catalog; w/ a watermark (ms) only records w/ time_start > watermark are kept, and rows that
+    # cannot be newer are dropped on their raw date alone (never validated, standardized or counted as seen)
+    # seen: link hashes of earlier ingests, updated in place w/ every link kept here
+    valid,key,trigger_col,triggers,standardize=SOURCES[source]
+    seen=set() if seen is None else seen;out=[]
+    for chunk in _raw_chunks(src,chunksize):
+        if watermark is not None:
+            upper=UPPER_MS[source](chunk)
+            chunk=chunk[(upper.isna()|(upper>watermark)).to_numpy()] # unparseable dates are left to the validity filter
+        dF=valid(chunk)
+        # first occurrence of a source link wins across the whole file (and across refreshes), like drop_duplicates on the full frame
+        h=link_hashes(dF[key])
+        dup=pd.Series(h).duplicated().to_numpy()|np.fromiter((x in seen for x in h.tolist()),bool,len(h))
+        seen.update(h[~dup].tolist())
+        dF=dF[~dup]
+        dF=standardize(dF[dF[trigger_col].isin(triggers)].reset_index(drop=True))
+        if watermark is not None:dF=dF[dF['time_start']>watermark]
+        out.append(dF)
+    return pd.concat(out,ignore_index=True) if out else pd.DataFrame()
+
+def _read_csv(path:str):return pd.read_csv(path,index_col=0,float_precision='round_trip')
+
+def _write_csv(df:pd.DataFrame,path:str,append:bool=False,index:bool=True):
+    # appends go straight to the file; rewrites are atomic
+    if append and os.path.exists(path):
+        df.to_csv(path,mode='a',header=False,index=index)
+        return
+    tmp=f'{path}.tmp'
+    df.to_csv(tmp,index=index)
+    os.replace(tmp,path)
+
+class CatalogStore:
+    # <root>/coolr.csv & gfld.csv: standardized records (index = stable record id, in ingestion order; rows past state's count are uncommitted)
+    # <root>/matches.<gen>.csv: deduplicate's match table over everything ingested, <root>/<source>_links.<gen>.npy: hashes of the source links seen
+    # <root>/state.json: generation, per-source watermark, committed row count & file names
+    def __init__(self,root:str):
+        self.root=root
+        os.makedirs(root,exist_ok=True)
+
+    def path(self,name:str):return os.path.join(self.root,name)
+
+    def state(self):
+        try:
+            with open(self.path('state.json'),'r') as f:return json.load(f)
+        except FileNotFoundError:return {}
+
+    def watermark(self,source:str):return self.state().get(source,{}).get('watermark')
+
+    def _committed(self,source:str,state:dict):
+        # (committed records or None, whether the file holds an uncommitted tail from a refresh that died before state.json)
+        p=self.path(f'{source}.csv')
+        if not os.path.exists(p):return None,False
+        dF=_read_csv(p);n=state.get(source,{}).get('rows',len(dF))
+        return (dF.iloc[:n] if n else None),len(dF)>n
+
+    def records(self,source:str,state:dict=None):return self._committed(source,state if state is not None else self.state())[0]
+
+    def links(self,source:str,state:dict=None):
+        name=(state if state is not None else self.state()).get(source,{}).get('links')
+        return set(np.load(self.path(name)).tolist()) if name else set()
+
+    def matches(self,state:dict=None):
+        p=self.path((state if state is not None else self.state()).get('matches','matches.csv'))
+        if not os.path.exists(p):return pd.DataFrame(columns=MATCH_COLUMNS)
+        m=pd.read_csv(p,float_precision='round_trip')
+        for c in ('date','time_start_coolr','time_end_coolr','time_start_gfld','time_end_gfld'):m[c]=pd.to_datetime(m[c],utc=True)
+        return m
+
+    def refresh(self,coolr_src=None,gfld_src=None,chunksize:int=DEFAULT_INGEST_CHUNK):
+        # ingest what is newer than each watermark, append it, re-match the affected window; returns the number of new records per source
+        state=self.state();new={};stored={};seen={};dirty={}
+        for source,src in (('coolr',coolr_src),('gfld',gfld_src)):
+            stored[source],dirty[source]=self._committed(source,state)
+            if src is None:continue
+            seen[source]=self.links(source,state)
+            df=ingest(src,source,state.get(source,{}).get('watermark'),chunksize,seen[source])
+            start=0 if stored[source] is None or stored[source].empty else int(stored[source].index.max())+1
+            df.index=pd.RangeIndex(start,start+len(df))
+            new[source]=df
+        counts={s:len(df) for s,df in new.items()}
+        fresh=[df['time_start'].min() for df in new.values() if len(df)]
+        if not fresh:return counts
+
+        # pairs need overlapping intervals, so only coolr rows ending at/after the earliest new start can gain or lose a match,
+        # and those can only pair w/ gfld rows ending at/after the earliest of their starts; their matches are recomputed, the rest stand
+        both={source:pd.concat([df for df in (stored[source],new.get(source)) if df is not None]) for source in ('coolr','gfld') if stored[source] is not None or source in new}
+        matches=self.matches(state)
+        if 'coolr' in both:
+            cw=both['coolr'][both['coolr']['time_end']>=min(fresh)]
+            matches=matches[~matches['coolr_id'].isin(cw.index)]
+            if len(cw) and 'gfld' in both:
+                gw=both['gfld'][both['gfld']['time_end']>=cw['time_start'].min()]
+                if len(gw):matches=pd.concat([matches,deduplicate(cw,gw)[2]],ignore_index=True)
+            matches=matches.sort_values('coolr_id',kind='stable').reset_index(drop=True)
+
+        # new generation: fresh links/matches files, records appended past the committed count, then state.json switches over
+        old=dict(state);gen=int(state.get('generation',0))+1
+        for source,df in new.items():
+            np.save(self.path(f'{source}_links.{gen}.npy'),np.fromiter(seen[source],np.uint64,len(seen[source])))
+            state[source]={**state.get(source,{}),'links':f'{source}_links.{gen}.npy'}
+            if not len(df):continue
+            p=self.path(f'{source}.csv')
+            if dirty[source] and stored[source] is not None:_write_csv(stored[source],p) # drop the uncommitted tail
+            _write_csv(df,p,append=stored[source] is not None)
+            state[source].update(watermark=float(df['time_start'].max()),rows=len(df)+(0 if stored[source] is None else len(stored[source])))
+        _write_csv(matches,self.path(f'matches.{gen}.csv'),index=False)
+        state.update(generation=gen,matches=f'matches.{gen}.csv')
+        tmp=self.path('state.json.tmp')
+        with open(tmp,'w') as f:json.dump(state,f,indent=2)
+        os.replace(tmp,self.path('state.json'))
+        for name in {old.get('matches'),*(old.get(s,{}).get('links') for s in new)}-{state.get('matches'),*(state.get(s,{}).get('links') for s in new)}-{None}:
+            try:os.remove(self.path(name))
+            except FileNotFoundError:pass
+        return counts
+
+    def catalog(self):
+        # same (coolr, gfld, matches) as deduplicate() over every ingested record, w/o any pair search
+        state=self.state()
+        coolr,gfld,matches=self.records('coolr',state),self.records('gfld',state),self.matches(state)
+        if coolr is None or gfld is None or matches.empty:return coolr,gfld,matches
+        cool_updated=coolr.copy()
+        cool_updated['spatial_uncertainty']=cool_updated['spatial_uncertainty'].astype(float)
+        smaller=matches[matches['gfld_rad_m']<matches['coolr_rad_m']]
+        cool_updated.loc[smaller['coolr_id'].to_numpy(),'spatial_uncertainty']=gfld.loc[smaller['gfld_id'].to_numpy(),'spatial_uncertainty'].to_numpy()
+        return cool_updated,gfld.drop(index=matches['gfld_id'].unique()),matches